@@ -0,0 +1,220 @@
+"""
+Background analysis runs that outlive their SSE subscribers.
+
+A streaming analysis is started as an `AnalysisRun`: a background task
+drains the analysis event generator to completion (so the result is always
+cached, even if every client disconnected) and records the events it
+produced in a bounded log. SSE responses only subscribe to a run: they
+replay the logged events and then follow new ones. Concurrent requests for
+the same URL join the run already in flight instead of paying for a second
+LLM call.
+
+Every event is sent with an `id: <run_id>:<seq>` line and finished runs are
+kept for SSE_EVENT_LOG_TTL seconds, so a client that reconnects with
+`Last-Event-ID` resumes right after the last event it saw. Events carry the
+`request_id` of the request that started the run; each subscriber gets them
+restamped with its own.
+"""
+import asyncio
+import json
+import time
+import uuid
+from collections import deque
+from typing import AsyncGenerator, AsyncIterator, Callable, Deque, Dict, Optional, Tuple
+
+from config import settings
+from logger import analysis_logger, current_request_id
+from models import AnalysisError
+from serialization import sse_event
+
+
+class AnalysisRun:
+    """One in-flight analysis and the events it has produced so far."""
+
+    def __init__(self, url: str, max_events: int = settings.SSE_EVENT_LOG_MAX_EVENTS):
+        self.run_id = uuid.uuid4().hex[:16]
+        self.url = url
+        self.request_id = current_request_id()  # Stamped on the events the run produces
+        self.started_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.events: Deque[str] = deque(maxlen=max_events)
+        self.first_seq = 0  # Sequence number of events[0]
+        self.next_seq = 0
+        self.done = False
+        self.task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Condition()
+
+    async def run(self, event_source: AsyncIterator[str]) -> None:
+        """
+        Drain an analysis event generator, recording every event.
+
+        Args:
+            event_source: Async iterator of SSE-formatted analysis events
+        """
+        try:
+            async for event in event_source:
+                await self._append(event)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            analysis_logger.error(f"Background analysis failed for {self.url}", error=e)
+            error_event = AnalysisError(
+                error_code="STREAMING_ERROR",
+                error_details=str(e),
+                message="Streaming analysis failed"
+            )
+            await self._append(sse_event(error_event))
+        finally:
+            async with self._changed:
+                self.done = True
+                self.finished_at = time.time()
+                self._changed.notify_all()
+
+    async def subscribe(self, after_seq: Optional[int] = None) -> AsyncGenerator[str, None]:
+        """
+        Yield the run's events with SSE ids, replaying those already logged.
+
+        Closing the generator (e.g. on client disconnect) only ends the
+        subscription; the run itself keeps going.
+
+        Args:
+            after_seq: Sequence number of the last event the client received,
+                to resume after it; None to start from the beginning
+
+        Yields:
+            str: SSE-formatted analysis events, each with an id line
+        """
+        position = 0 if after_seq is None else after_seq + 1
+        run_stamp = _request_id_field(self.request_id)
+        own_stamp = _request_id_field(current_request_id())
+        while True:
+            async with self._changed:
+                await self._changed.wait_for(lambda: position < self.next_seq or self.done)
+                # Events that fell out of the bounded log are skipped
+                position = max(position, self.first_seq)
+                pending = list(self.events)[position - self.first_seq:]
+                finished = self.done
+            for event in pending:
+                if own_stamp != run_stamp:
+                    event = event.replace(run_stamp, own_stamp)
+                yield f"id: {self.event_id(position)}\n{event}"
+                position += 1
+            if finished and position >= self.next_seq:
+                return
+
+    def event_id(self, seq: int) -> str:
+        """SSE event id of the event with the given sequence number."""
+        return f"{self.run_id}:{seq}"
+
+    async def _append(self, event: str) -> None:
+        async with self._changed:
+            if len(self.events) == self.events.maxlen:
+                self.first_seq += 1
+            self.events.append(event)
+            self.next_seq += 1
+            self._changed.notify_all()
+
+
+def _request_id_field(request_id: Optional[str]) -> str:
+    # As serialized in an event's JSON; quotes inside string values are escaped, so this only matches the key
+    return '"request_id":' + json.dumps(request_id)
+
+
+class AnalysisRunRegistry:
+    """Tracks in-flight analysis runs by article URL, and recent runs by id."""
+
+    def __init__(self, event_log_ttl: float = settings.SSE_EVENT_LOG_TTL):
+        self.event_log_ttl = event_log_ttl
+        self._runs: Dict[str, AnalysisRun] = {}
+        self._runs_by_id: Dict[str, AnalysisRun] = {}
+
+    def get(self, url: str) -> Optional[AnalysisRun]:
+        """Get the in-flight run for a URL, if any."""
+        return self._runs.get(url)
+
+    def resume(self, last_event_id: Optional[str], url: str) -> Optional[Tuple[AnalysisRun, int]]:
+        """
+        Find the run a reconnecting client was subscribed to.
+
+        Args:
+            last_event_id: Value of the client's Last-Event-ID header
+            url: Article URL of the request, which must match the run
+
+        Returns:
+            Optional[Tuple[AnalysisRun, int]]: Run and last received sequence number,
+            or None if the id is malformed, unknown or expired
+        """
+        if not last_event_id:
+            return None
+        run_id, _, seq = last_event_id.partition(":")
+        if not seq.isdigit():
+            return None
+        self._purge_expired()
+        run = self._runs_by_id.get(run_id)
+        if run is None or run.url != url:
+            return None
+        return run, int(seq)
+
+    def start(self, url: str, event_source_factory: Callable[[], AsyncIterator[str]]) -> AnalysisRun:
+        """
+        Start a background run for a URL, or return the one already in flight.
+
+        Args:
+            url: Article URL
+            event_source_factory: Callable creating the analysis event generator;
+                only called if a new run is started
+
+        Returns:
+            AnalysisRun: Run to subscribe to
+        """
+        run = self._runs.get(url)
+        if run is not None:
+            analysis_logger.info(f"Joining in-flight analysis for {url}")
+            return run
+
+        self._purge_expired()
+        run = AnalysisRun(url)
+        self._runs[url] = run
+        self._runs_by_id[run.run_id] = run
+        run.task = asyncio.create_task(run.run(event_source_factory()))
+        run.task.add_done_callback(lambda _: self._forget(run))
+        return run
+
+    @property
+    def active_count(self) -> int:
+        """Number of analyses currently running in the background."""
+        return len(self._runs)
+
+    async def drain(self, timeout: float = settings.ANALYSIS_RUN_SHUTDOWN_GRACE) -> None:
+        """
+        Give in-flight runs time to finish (and cache their results), then cancel the rest.
+
+        Args:
+            timeout: Seconds to wait before cancelling
+        """
+        tasks = [run.task for run in self._runs.values() if run.task is not None]
+        if not tasks:
+            return
+        analysis_logger.info(f"Waiting up to {timeout:.0f}s for {len(tasks)} in-flight analyses")
+        _, pending = await asyncio.wait(tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    def _forget(self, run: AnalysisRun) -> None:
+        # The run stays resumable by id until its event log expires
+        if self._runs.get(run.url) is run:
+            del self._runs[run.url]
+
+    def _purge_expired(self) -> None:
+        cutoff = time.time() - self.event_log_ttl
+        expired = [
+            run_id for run_id, run in self._runs_by_id.items()
+            if run.finished_at is not None and run.finished_at < cutoff
+        ]
+        for run_id in expired:
+            del self._runs_by_id[run_id]
+
+
+# Global registry of background analysis runs
+analysis_runs = AnalysisRunRegistry()
@@ -0,0 +1,376 @@
+"""
+Verbatim span anchoring for fact-checking issues.
+
+The LLM is asked to copy each issue's text verbatim from the article. This
+module checks that server-side: every issue is located in the article
+content, first exactly and then after whitespace/quote normalization, and
+gets character offsets so clients can highlight it without searching.
+Paraphrased issue text that still cannot be found is re-anchored to the
+most similar window of article sentences using hashed character n-grams.
+"""
+import re
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import settings
+from logger import analysis_logger
+from models import Issue
+
+
+# Typographic characters mapped to their plain equivalents during normalization
+CHARACTER_NORMALIZATION = {
+    "“": '"', "”": '"', "„": '"', "‟": '"', "″": '"', "«": '"', "»": '"',
+    "‘": "'", "’": "'", "‚": "'", "‛": "'", "′": "'",
+    "–": "-", "—": "-", "−": "-",
+    "…": "...",
+    "\u00a0": " ",  # Non-breaking space
+}
+NORMALIZATION_TABLE = str.maketrans(CHARACTER_NORMALIZATION)
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+# A sentence runs up to terminal punctuation followed by whitespace, or to the end of the paragraph
+SENTENCE_PATTERN = re.compile(r"\S.*?(?:[.!?]+(?=\s|$)|$)", re.DOTALL)
+NGRAM_HASH_MULTIPLIERS = (73856093, 19349663, 83492791, 50331653, 12582917)
+
+
+class AhoCorasick:
+    """Multi-pattern string matcher finding every pattern in a single pass over the text."""
+
+    def __init__(self, patterns: Sequence[str]):
+        """
+        Build the automaton.
+
+        Args:
+            patterns: Patterns to search for; empty patterns never match
+        """
+        self.patterns = list(patterns)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._output: List[List[int]] = [[]]
+
+        for index, pattern in enumerate(self.patterns):
+            if not pattern:
+                continue
+            node = 0
+            for char in pattern:
+                next_node = self._goto[node].get(char)
+                if next_node is None:
+                    next_node = len(self._goto)
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append([])
+                    self._goto[node][char] = next_node
+                node = next_node
+            self._output[node].append(index)
+
+        # Breadth-first construction of failure links
+        queue = list(self._goto[0].values())
+        for node in queue:
+            for char, child in self._goto[node].items():
+                queue.append(child)
+                fallback = self._fail[node]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(char, 0)
+                self._fail[child] = target if target != child else 0
+                self._output[child].extend(self._output[self._fail[child]])
+
+    def find_first(self, text: str) -> Dict[int, int]:
+        """
+        Find the first occurrence of each pattern.
+
+        Args:
+            text: Text to search
+
+        Returns:
+            Dict[int, int]: Pattern index mapped to the start offset of its first match
+        """
+        wanted = sum(1 for pattern in self.patterns if pattern)
+        matches: Dict[int, int] = {}
+        if not wanted:
+            return matches
+
+        goto, fail, output, patterns = self._goto, self._fail, self._output, self.patterns
+        node = 0
+        for position, char in enumerate(text):
+            while node and char not in goto[node]:
+                node = fail[node]
+            node = goto[node].get(char, 0)
+            for index in output[node]:
+                if index not in matches:
+                    matches[index] = position - len(patterns[index]) + 1
+            if output[node] and len(matches) == wanted:
+                break
+        return matches
+
+
+def normalize_with_offsets(text: str) -> Tuple[str, List[int]]:
+    """
+    Normalize text for tolerant matching while tracking original positions.
+
+    Curly quotes, dashes and non-breaking spaces become their plain forms,
+    whitespace runs collapse to a single space and letters are case-folded.
+
+    Args:
+        text: Text to normalize
+
+    Returns:
+        Tuple[str, List[int]]: Normalized text and, for each of its characters,
+        the index of the original character it came from
+    """
+    normalized: List[str] = []
+    offsets: List[int] = []
+    previous_was_space = False
+
+    for index, char in enumerate(text):
+        replacement = CHARACTER_NORMALIZATION.get(char, char)
+        if replacement.isspace():
+            if previous_was_space:
+                continue
+            normalized.append(" ")
+            offsets.append(index)
+            previous_was_space = True
+            continue
+        previous_was_space = False
+        for normalized_char in replacement.casefold():
+            normalized.append(normalized_char)
+            offsets.append(index)
+
+    return "".join(normalized), offsets
+
+
+def normalize_text(text: str) -> str:
+    """Normalize text the same way as normalize_with_offsets, without offsets."""
+    return normalize_with_offsets(text.strip())[0]
+
+
+def fast_normalize_text(text: str) -> str:
+    """Equivalent of normalize_text built from C-level string operations, for bulk use."""
+    return WHITESPACE_PATTERN.sub(" ", text.strip().translate(NORMALIZATION_TABLE)).casefold()
+
+
+def is_general_context(issue: Issue) -> bool:
+    """Whether an issue applies to the whole article rather than a specific span."""
+    return issue.text.strip().upper() == settings.GENERAL_CONTEXT_MARKER
+
+
+def find_spans(texts: Sequence[str], content: str) -> List[Optional[Tuple[int, int]]]:
+    """
+    Locate each text in the content, exactly first and then normalized.
+
+    Args:
+        texts: Texts to locate
+        content: Article content to search
+
+    Returns:
+        List[Optional[Tuple[int, int]]]: (start, end) offsets in content for
+        each text, or None if it could not be found
+    """
+    spans: List[Optional[Tuple[int, int]]] = [None] * len(texts)
+    exact_patterns = [text.strip() for text in texts]
+
+    for index, start in AhoCorasick(exact_patterns).find_first(content).items():
+        spans[index] = (start, start + len(exact_patterns[index]))
+
+    missing = [index for index, span in enumerate(spans) if span is None]
+    if not missing:
+        return spans
+
+    normalized_content, offsets = normalize_with_offsets(content)
+    normalized_patterns = [normalize_text(texts[index]) for index in missing]
+    matches = AhoCorasick(normalized_patterns).find_first(normalized_content)
+    for pattern_index, start in matches.items():
+        end = start + len(normalized_patterns[pattern_index])
+        spans[missing[pattern_index]] = (offsets[start], offsets[end - 1] + 1)
+
+    return spans
+
+
+def split_sentences(paragraphs: Sequence[str]) -> Tuple[List[str], List[int]]:
+    """
+    Split paragraphs into sentences, remembering which paragraph each came from.
+
+    Args:
+        paragraphs: Paragraphs as returned by utils.split_into_paragraphs
+
+    Returns:
+        Tuple[List[str], List[int]]: Sentences (verbatim slices of their
+        paragraph) and the paragraph index of each sentence
+    """
+    sentences: List[str] = []
+    paragraph_ids: List[int] = []
+    for paragraph_id, paragraph in enumerate(paragraphs):
+        for match in SENTENCE_PATTERN.finditer(paragraph):
+            sentences.append(match.group())
+            paragraph_ids.append(paragraph_id)
+    return sentences, paragraph_ids
+
+
+def hashed_ngram_counts(texts: Sequence[str]) -> np.ndarray:
+    """
+    Count hashed character n-grams of each normalized text.
+
+    All texts are concatenated and hashed in one NumPy pass; n-grams
+    crossing a text boundary are discarded.
+
+    Args:
+        texts: Texts to vectorize
+
+    Returns:
+        np.ndarray: Matrix of shape (len(texts), FUZZY_ANCHOR_HASH_DIMENSIONS)
+    """
+    n = settings.FUZZY_ANCHOR_NGRAM_SIZE
+    dimensions = settings.FUZZY_ANCHOR_HASH_DIMENSIONS
+
+    normalized = [fast_normalize_text(text) for text in texts]
+    joined = "".join(normalized)
+    if len(joined) < n:
+        return np.zeros((len(texts), dimensions), dtype=np.float32)
+
+    ends = np.cumsum([len(text) for text in normalized])
+    codes = np.frombuffer(joined.encode("utf-32-le"), dtype=np.uint32).astype(np.int64)
+    hash_count = len(codes) - n + 1
+    hashes = np.zeros(hash_count, dtype=np.int64)
+    for shift in range(n):
+        hashes ^= codes[shift:hash_count + shift] * NGRAM_HASH_MULTIPLIERS[shift % len(NGRAM_HASH_MULTIPLIERS)]
+    hashes %= dimensions
+
+    positions = np.arange(hash_count)
+    owners = np.searchsorted(ends, positions, side="right")
+    valid = positions + n <= ends[np.minimum(owners, len(ends) - 1)]
+    counts = np.bincount(owners[valid] * dimensions + hashes[valid], minlength=len(texts) * dimensions)
+    return counts.reshape(len(texts), dimensions).astype(np.float32)
+
+
+def l2_normalize(vectors: np.ndarray) -> np.ndarray:
+    """Scale each row to unit length, leaving all-zero rows untouched."""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return np.divide(vectors, norms, out=np.zeros_like(vectors), where=norms > 0)
+
+
+def find_fuzzy_replacements(texts: Sequence[str], paragraphs: Sequence[str]) -> List[Optional[str]]:
+    """
+    Find the verbatim sentence window most similar to each (paraphrased) text.
+
+    Sentences are vectorized once and scored against all texts with a
+    single matrix product; scores for windows of up to
+    FUZZY_ANCHOR_MAX_SENTENCES consecutive sentences within a paragraph are
+    then derived from prefix sums.
+
+    Args:
+        texts: Issue texts that could not be anchored
+        paragraphs: Article paragraphs to draw sentence windows from
+
+    Returns:
+        List[Optional[str]]: Best matching window per text, or None if no
+        window reaches FUZZY_ANCHOR_THRESHOLD
+    """
+    sentences, paragraph_ids = split_sentences(paragraphs)
+    if not texts or not sentences:
+        return [None] * len(texts)
+
+    max_size = settings.FUZZY_ANCHOR_MAX_SENTENCES
+    sentence_counts = hashed_ngram_counts(sentences)
+    query_vectors = l2_normalize(hashed_ngram_counts(texts))
+    paragraph_ids_array = np.asarray(paragraph_ids)
+
+    window_firsts: List[np.ndarray] = []
+    window_lasts: List[np.ndarray] = []
+    for size in range(1, max_size + 1):
+        firsts = np.arange(len(sentences) - size + 1)
+        lasts = firsts + size - 1
+        same_paragraph = paragraph_ids_array[firsts] == paragraph_ids_array[lasts]
+        window_firsts.append(firsts[same_paragraph])
+        window_lasts.append(lasts[same_paragraph])
+    firsts = np.concatenate(window_firsts)
+    lasts = np.concatenate(window_lasts)
+
+    # A window vector is the sum of its sentence vectors, so its dot product with a
+    # query is a sum of sentence dot products, and its squared norm is a sum of
+    # sentence self products plus twice the products of sentences 1..max_size-1 apart.
+    # Prefix sums over both give every window's cosine without building window vectors.
+    dot_prefix = np.vstack([np.zeros((1, len(texts))), np.cumsum(sentence_counts @ query_vectors.T, axis=0)])
+    window_dots = dot_prefix[lasts + 1] - dot_prefix[firsts]
+
+    window_norms = np.zeros(len(firsts))
+    for distance in range(max_size):
+        pair_products = np.einsum("ij,ij->i", sentence_counts[:len(sentences) - distance], sentence_counts[distance:])
+        pair_prefix = np.concatenate([[0.0], np.cumsum(pair_products)])
+        has_pairs = lasts - firsts >= distance
+        pair_sums = pair_prefix[lasts[has_pairs] - distance + 1] - pair_prefix[firsts[has_pairs]]
+        window_norms[has_pairs] += pair_sums * (1 if distance == 0 else 2)
+    window_norms = np.sqrt(window_norms)
+
+    similarities = np.divide(
+        window_dots, window_norms[:, None],
+        out=np.zeros_like(window_dots), where=window_norms[:, None] > 0
+    )
+    best_windows = similarities.argmax(axis=0)
+
+    replacements: List[Optional[str]] = []
+    for query_index, window_index in enumerate(best_windows):
+        if similarities[window_index, query_index] < settings.FUZZY_ANCHOR_THRESHOLD:
+            replacements.append(None)
+            continue
+        first, last = firsts[window_index], lasts[window_index]
+        paragraph = paragraphs[paragraph_ids[first]]
+        # Take the verbatim paragraph slice so original spacing between sentences is kept
+        start = paragraph.find(sentences[first])
+        end = paragraph.find(sentences[last], start) + len(sentences[last])
+        replacements.append(paragraph[start:end])
+    return replacements
+
+
+def anchor_issues(issues: List[Issue], content: str, paragraphs: Optional[Sequence[str]] = None) -> List[Issue]:
+    """
+    Attach article offsets to each issue and drop issues that cannot be anchored.
+
+    Issues matched after normalization get their text replaced with the
+    verbatim span from the article. When paragraphs are given, issues that
+    still don't match are re-anchored to the most similar sentence window.
+    General context issues are kept without offsets.
+
+    Args:
+        issues: Issues returned by the LLM
+        content: Article content the issues refer to
+        paragraphs: Article paragraphs for fuzzy re-anchoring, if enabled
+
+    Returns:
+        List[Issue]: Anchored issues in their original order
+    """
+    candidates = [issue for issue in issues if not is_general_context(issue)]
+    spans = find_spans([issue.text for issue in candidates], content)
+
+    missing = [index for index, span in enumerate(spans) if span is None]
+    if missing and paragraphs and settings.ENABLE_FUZZY_ANCHORING:
+        replacements = find_fuzzy_replacements([candidates[index].text for index in missing], paragraphs)
+        resolved = [(index, text) for index, text in zip(missing, replacements) if text is not None]
+        if resolved:
+            fuzzy_spans = find_spans([text for _, text in resolved], content)
+            for (index, _), span in zip(resolved, fuzzy_spans):
+                spans[index] = span
+            analysis_logger.debug("Fuzzy re-anchored %d of %d unmatched issues", len(fuzzy_spans) - fuzzy_spans.count(None), len(missing))
+    span_by_issue = {id(issue): span for issue, span in zip(candidates, spans)}
+
+    anchored: List[Issue] = []
+    dropped = 0
+    for issue in issues:
+        if is_general_context(issue):
+            anchored.append(issue)
+            continue
+        span = span_by_issue[id(issue)]
+        if span is None:
+            dropped += 1
+            analysis_logger.debug("Dropping unanchorable issue: %.80s", issue.text)
+            continue
+        start, end = span
+        anchored.append(issue.model_copy(update={
+            "text": content[start:end],
+            "start_offset": start,
+            "end_offset": end,
+        }))
+
+    if dropped:
+        analysis_logger.info(f"Dropped {dropped} of {len(issues)} issues whose text was not found in the article")
+    return anchored
@@ -5,18 +5,20 @@ import jwt
 import hashlib
 import hmac
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import List, Optional
 from passlib.context import CryptContext
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from models import User, UserDocument, AccountType
 import os
 from pymongo.collection import Collection
+from tracing import traced
 
 # Configuration
 SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-secret-key-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 60 * 24 * 7  # 7 days
+FREE_MONTHLY_ARTICLE_LIMIT = 10
 
 # Password hashing
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
@@ -67,6 +69,7 @@ def verify_token(token: str) -> dict:
         )
 
 
+@traced()
 async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
     users_collection: Collection = None
@@ -140,7 +143,15 @@ def can_user_analyze_article(user_doc: dict) -> bool:
     
     # Free users are limited to 10 articles per month
     user_doc = reset_monthly_usage_if_needed(user_doc)
-    return user_doc.get("monthly_usage", 0) < 10
+    return user_doc.get("monthly_usage", 0) < FREE_MONTHLY_ARTICLE_LIMIT
+
+
+def remaining_article_allowance(user_doc: dict) -> Optional[int]:
+    """Get how many more new articles the user may analyze this month (None if unlimited)."""
+    if user_doc.get("account_type") == AccountType.PREMIUM:
+        return None
+    user_doc = reset_monthly_usage_if_needed(user_doc)
+    return max(0, FREE_MONTHLY_ARTICLE_LIMIT - user_doc.get("monthly_usage", 0))
 
 
 def has_user_analyzed_article(user_doc: dict, article_url: str) -> bool:
@@ -149,6 +160,7 @@ def has_user_analyzed_article(user_doc: dict, article_url: str) -> bool:
     return article_url in analyzed_articles
 
 
+@traced()
 def increment_user_usage(users_collection: Collection, user_email: str, article_url: str) -> bool:
     """
     Increment user's monthly usage counter only if they haven't analyzed this article before.
@@ -197,6 +209,38 @@ def increment_user_usage(users_collection: Collection, user_email: str, article_
         return False
 
 
+def increment_user_usage_bulk(users_collection: Collection, user_email: str, article_urls: List[str]) -> int:
+    """
+    Record several analyzed articles with a single update.
+    Same accounting as increment_user_usage: only articles new to the user count toward free usage.
+    
+    Returns:
+        int: Number of articles that were new to the user
+    """
+    try:
+        user_doc = users_collection.find_one({"email": user_email})
+        if not user_doc:
+            return 0
+        
+        user_doc = reset_monthly_usage_if_needed(user_doc)
+        analyzed_articles = user_doc.get("analyzed_articles", [])
+        already_analyzed = set(analyzed_articles)
+        new_articles = [url for url in dict.fromkeys(article_urls) if url not in already_analyzed]
+        
+        update_data = {
+            "usage_reset_date": user_doc["usage_reset_date"],
+            "analyzed_articles": analyzed_articles + new_articles
+        }
+        if new_articles and user_doc.get("account_type") == AccountType.FREE:
+            update_data["monthly_usage"] = user_doc.get("monthly_usage", 0) + len(new_articles)
+        
+        users_collection.update_one({"email": user_email}, {"$set": update_data})
+        return len(new_articles)
+    except Exception as e:
+        print(f"Error incrementing user usage: {e}")
+        return 0
+
+
 def verify_paddle_webhook(signature: str, request_body: bytes) -> bool:
     """Verify Paddle webhook signature."""
     paddle_webhook_secret = os.getenv("PADDLE_WEBHOOK_SECRET")
@@ -210,4 +254,13 @@ def verify_paddle_webhook(signature: str, request_body: bytes) -> bool:
         hashlib.sha256
     ).hexdigest()
     
-    return hmac.compare_digest(signature, expected_signature) 
\ No newline at end of file
+    return hmac.compare_digest(signature, expected_signature) 
+
+
+def verify_admin_key(key: Optional[str]) -> bool:
+    """Verify an admin API key against the ADMIN_API_KEY environment variable."""
+    admin_api_key = os.getenv("ADMIN_API_KEY")
+    if not admin_api_key or not key:
+        return False
+    
+    return hmac.compare_digest(key.encode(), admin_api_key.encode())
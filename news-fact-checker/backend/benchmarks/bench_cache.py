@@ -0,0 +1,72 @@
+"""
+Benchmark get_cached_analysis against mongomock and a local mongod.
+
+The mongod benchmarks use BENCH_MONGODB_URL (default
+mongodb://localhost:27017) and are skipped when no server answers. They
+write to a throwaway database that is dropped on exit.
+
+Run from the backend directory:
+    python benchmarks/run.py -k cached_analysis
+"""
+import atexit
+import os
+from datetime import datetime, timezone
+from typing import List
+
+import mongomock
+from pymongo import MongoClient
+from pymongo.errors import PyMongoError
+
+from harness import Benchmark
+from fixtures import issues_payload
+from utils import get_cached_analysis
+
+
+CACHED_ARTICLES = 1000
+ISSUES_PER_ARTICLE = 5
+BENCH_DATABASE = "bench_news_fact_checker"
+
+
+def populate(collection) -> None:
+    """Fill a collection with cached analyses shaped like save_analysis_to_cache's documents."""
+    issues = issues_payload(ISSUES_PER_ARTICLE)["issues"]
+    collection.create_index("url")
+    collection.insert_many([
+        {
+            "url": f"https://news.example/article/{index}",
+            "title": f"Article {index}",
+            "content": "Article body. " * 200,
+            "issues": issues,
+            "created_at": datetime.now(timezone.utc),
+        }
+        for index in range(CACHED_ARTICLES)
+    ])
+
+
+def cache_benchmarks(prefix: str, collection) -> List[Benchmark]:
+    hit_url = f"https://news.example/article/{CACHED_ARTICLES // 2}"
+    return [
+        Benchmark(f"{prefix}.hit", lambda: get_cached_analysis(collection, hit_url)),
+        Benchmark(f"{prefix}.miss", lambda: get_cached_analysis(collection, "https://news.example/missing")),
+    ]
+
+
+def benchmarks() -> List[Benchmark]:
+    """Cache hits and misses on mongomock and, when reachable, a local mongod."""
+    mock_collection = mongomock.MongoClient()[BENCH_DATABASE].article_analyses
+    populate(mock_collection)
+    found = cache_benchmarks("cached_analysis.mongomock", mock_collection)
+
+    client = MongoClient(os.getenv("BENCH_MONGODB_URL", "mongodb://localhost:27017"), serverSelectionTimeoutMS=500)
+    try:
+        client.admin.command("ping")
+    except PyMongoError:
+        reason = "no mongod at BENCH_MONGODB_URL"
+        found.extend(Benchmark(benchmark.name.replace("mongomock", "mongod"), benchmark.func, skip=reason) for benchmark in found[:])
+        return found
+
+    client.drop_database(BENCH_DATABASE)
+    atexit.register(client.drop_database, BENCH_DATABASE)
+    populate(client[BENCH_DATABASE].article_analyses)
+    found.extend(cache_benchmarks("cached_analysis.mongod", client[BENCH_DATABASE].article_analyses))
+    return found
@@ -0,0 +1,68 @@
+"""
+Benchmark SSE event serialization: json.dumps(model_dump()) vs model_dump_json().
+
+Run from the backend directory:
+    python benchmarks/bench_serialization.py
+
+The suite (python benchmarks/run.py) times the current serializers only.
+"""
+import json
+import os
+import sys
+import timeit
+from typing import List
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from fastapi.responses import JSONResponse  # noqa: E402
+
+from harness import Benchmark  # noqa: E402
+from models import AnalysisProgress, AnalysisReplay, AnalysisResponse, Issue, StreamedIssue  # noqa: E402
+from serialization import FastJSONResponse, sse_event  # noqa: E402
+
+ISSUE = Issue(
+    text="The plan includes a twelve percent increase in spending on buses and light rail lines.",
+    explanation="The approved budget raises transit spending by 10%, not 12%, according to the council minutes.",
+    confidence_score=0.85,
+    source_urls=["https://example.com/minutes", "https://example.com/budget"],
+    start_offset=120,
+    end_offset=205,
+)
+EVENTS = {
+    "progress": AnalysisProgress(progress_percentage=0.4, current_step="Processing issue 2 of 5", message="Found potential concern"),
+    "issue": StreamedIssue(issue=ISSUE, issue_index=1, message="Issue 2 of 5"),
+}
+EVENTS["replay"] = AnalysisReplay(article_url="https://example.com/article", issues=[ISSUE] * 20, total_issues=20)
+RESPONSE = AnalysisResponse(issues=[ISSUE] * 20).model_dump(mode="json")
+
+
+def legacy_sse_event(event) -> str:
+    return f"data: {json.dumps(event.model_dump(mode='json'))}\n\n"
+
+
+def bench(label: str, func, number: int = 20000) -> float:
+    seconds = min(timeit.repeat(func, number=number, repeat=5)) / number
+    print(f"{label:<40} {seconds * 1e6:8.2f} us")
+    return seconds
+
+
+def benchmarks() -> List[Benchmark]:
+    """sse_event per event type and the default JSON response class."""
+    found = [Benchmark(f"sse_event.{name}", lambda event=event: sse_event(event)) for name, event in EVENTS.items()]
+    found.append(Benchmark("json_response.analysis_20_issues", lambda: FastJSONResponse(RESPONSE).body))
+    return found
+
+
+def main() -> None:
+    for name, event in EVENTS.items():
+        legacy = bench(f"{name}: json.dumps(model_dump())", lambda: legacy_sse_event(event))
+        fast = bench(f"{name}: sse_event()", lambda: sse_event(event))
+        print(f"{name}: {legacy / fast:.1f}x faster\n")
+
+    legacy = bench("response: JSONResponse", lambda: JSONResponse(RESPONSE).body, number=5000)
+    fast = bench(f"response: {FastJSONResponse.__name__}", lambda: FastJSONResponse(RESPONSE).body, number=5000)
+    print(f"response: {legacy / fast:.1f}x faster")
+
+
+if __name__ == "__main__":
+    main()
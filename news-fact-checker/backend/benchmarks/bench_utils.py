@@ -0,0 +1,25 @@
+"""
+Benchmark the text-processing hot paths in utils.py.
+
+Run from the backend directory:
+    python benchmarks/run.py -k extract_json
+    python benchmarks/run.py -k split_paragraphs
+"""
+from typing import List
+
+from harness import Benchmark
+from fixtures import article_formats, llm_responses
+from utils import extract_json_from_llm_response, split_into_paragraphs
+
+
+def benchmarks() -> List[Benchmark]:
+    """extract_json_from_llm_response per response shape, split_into_paragraphs per article format."""
+    found = [
+        Benchmark(f"extract_json.{shape}", lambda text=text: extract_json_from_llm_response(text))
+        for shape, text in llm_responses().items()
+    ]
+    found.extend(
+        Benchmark(f"split_paragraphs.{article_format}", lambda text=text: split_into_paragraphs(text))
+        for article_format, text in article_formats().items()
+    )
+    return found
@@ -0,0 +1,86 @@
+"""
+Deterministic inputs for the benchmarks: LLM responses shaped like the
+reasoning model's output, and one article rendered in each format the
+extension sends (HTML paragraphs, blank-line separated, one line per
+sentence pair, and a single block of sentences).
+"""
+import json
+from typing import Dict, List
+
+
+SENTENCES = [
+    "The city council approved a transit budget of $2.4 billion on Tuesday.",
+    "Officials said the plan includes a twelve percent increase in spending on buses and light rail lines.",
+    "Council member Ortiz argued that ridership has doubled since 2019, citing figures from the transit authority.",
+    "Critics noted that the authority's own report shows ridership still below pre-pandemic levels.",
+    "The mayor described the vote as the largest investment in public transport in the city's history.",
+    "A similar package in 2008 was larger when adjusted for inflation, according to the budget office.",
+    "Construction on the first new line is expected to begin next spring and finish within three years.",
+    "Independent engineers have estimated that comparable projects typically take five to seven years.",
+]
+
+
+def article_sentences(count: int = 48) -> List[str]:
+    """Get `count` article sentences (about 18 words each)."""
+    return [SENTENCES[index % len(SENTENCES)] for index in range(count)]
+
+
+def article_formats(count: int = 48) -> Dict[str, str]:
+    """
+    Render one article in each input format split_into_paragraphs handles.
+
+    Args:
+        count: Number of sentences
+
+    Returns:
+        Dict[str, str]: Article text keyed by format name
+    """
+    sentences = article_sentences(count)
+    paragraphs = [" ".join(sentences[index:index + 4]) for index in range(0, count, 4)]
+    return {
+        "html": "<div class=\"article\">" + "".join(f"<p class=\"body\">{p}</p>\n" for p in paragraphs) + "</div>",
+        "double_newline": "\n\n".join(paragraphs),
+        "single_newline": "\n".join(" ".join(sentences[index:index + 2]) for index in range(0, count, 2)),
+        "sentences": " ".join(sentences),
+    }
+
+
+def issues_payload(count: int) -> Dict[str, list]:
+    """Build an issues object like the one the prompt asks for."""
+    return {"issues": [
+        {
+            "text": SENTENCES[index % len(SENTENCES)],
+            "explanation": "The budget office figures contradict this claim; see the cited minutes for the adopted numbers.",
+            "confidence_score": round(0.55 + 0.05 * (index % 8), 2),
+            "source_urls": [f"https://example.com/source/{index}", "https://example.com/budget-office/2024"],
+        }
+        for index in range(count)
+    ]}
+
+
+def reasoning(paragraphs: int) -> str:
+    """Reasoning text with the stray braces and brackets real reasoning contains."""
+    thought = (
+        "Let me check the claim about ridership. The authority's report {2023 annual} lists "
+        "weekday boardings [table 4] below the 2019 figure, so the claim that it doubled is not supported. "
+        "I should also compare the budget against the 2008 package adjusted for inflation. "
+    )
+    return "\n\n".join(thought for _ in range(paragraphs))
+
+
+def llm_responses() -> Dict[str, str]:
+    """
+    Responses in the shapes the analysis pipeline has to parse.
+
+    Returns:
+        Dict[str, str]: Response text keyed by shape name
+    """
+    small = json.dumps(issues_payload(3), indent=2)
+    large = json.dumps(issues_payload(15), indent=2)
+    return {
+        "fenced_after_reasoning": f"<think>\n{reasoning(6)}\n</think>\n\n```json\n{small}\n```",
+        "bare_after_reasoning": f"<think>\n{reasoning(6)}\n</think>\n{small}",
+        "prose_then_fence": f"Here is my analysis {{see below}}.\n\n```json\n{small}\n```\n",
+        "long_reasoning_many_issues": f"<think>\n{reasoning(40)}\n</think>\n\n```json\n{large}\n```",
+        "no_issues": "<think>\nEverything checks out.\n</think>\n{\"issues\": []}",
+    }
@@ -0,0 +1,212 @@
+"""
+Timing, baseline storage and regression checks for the benchmark suite.
+
+Each benchmark is timed with `timeit`: the call count per repeat is chosen
+so a repeat takes about TARGET_REPEAT_SECONDS, and the fastest repeat is
+kept as the per-call time (the least disturbed by the rest of the machine).
+
+Absolute timings depend on the machine, so a fixed pure-Python calibration
+workload is timed right before each benchmark, and results are compared as
+multiples of it ("relative"). A baseline recorded on a laptop can then still flag a
+regression measured on a CI runner, within TOLERANCE.
+"""
+import importlib.util
+import json
+import os
+import platform
+import statistics
+import sys
+import timeit
+from typing import Any, Callable, Dict, List, Optional
+
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+BACKEND_DIR = os.path.dirname(BENCHMARK_DIR)
+BASELINE_PATH = os.path.join(BENCHMARK_DIR, "baselines.json")
+
+REPEAT = 5
+TARGET_REPEAT_SECONDS = 0.1
+TOLERANCE = 0.3  # Slowdown (relative to the baseline) reported as a regression
+
+# Backend modules use flat imports (e.g. `from config import settings`)
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+
+class Benchmark:
+    """One timed callable."""
+
+    def __init__(self, name: str, func: Callable[[], Any], skip: Optional[str] = None):
+        """
+        Args:
+            name: Dotted name, e.g. "extract_json.fenced_after_reasoning"
+            func: Zero-argument callable to time
+            skip: Reason the benchmark cannot run here (e.g. no local mongod)
+        """
+        self.name = name
+        self.func = func
+        self.skip = skip
+
+
+def calibration_workload() -> None:
+    """Fixed mix of interpreter, dict, string and JSON work used to normalise timings."""
+    values = {f"key{i}": i * i for i in range(1000)}
+    text = json.dumps(values)
+    sum(len(part) for part in text.split(","))
+    json.loads(text)
+
+
+def measure(func: Callable[[], Any], repeat: int = REPEAT, number: Optional[int] = None) -> Dict[str, float]:
+    """
+    Time a callable.
+
+    Args:
+        func: Callable to time
+        repeat: Number of timed repeats
+        number: Calls per repeat; chosen automatically when None
+
+    Returns:
+        Dict[str, float]: Fastest and median per-call time in seconds, and the calls per repeat
+    """
+    timer = timeit.Timer(func)
+    if number is None:
+        number, elapsed = timer.autorange()
+        number = max(1, int(number * TARGET_REPEAT_SECONDS / max(elapsed, 1e-9)))
+    per_call = [total / number for total in timer.repeat(repeat=repeat, number=number)]
+    return {"seconds": min(per_call), "median_seconds": statistics.median(per_call), "number": number}
+
+
+def discover(pattern: Optional[str] = None) -> List[Benchmark]:
+    """
+    Collect the benchmarks defined by every bench_*.py module.
+
+    Each module exposes `benchmarks() -> List[Benchmark]`.
+
+    Args:
+        pattern: Only keep benchmarks whose name contains this substring
+
+    Returns:
+        List[Benchmark]: Benchmarks in module and definition order
+    """
+    found: List[Benchmark] = []
+    for filename in sorted(os.listdir(BENCHMARK_DIR)):
+        if not (filename.startswith("bench_") and filename.endswith(".py")):
+            continue
+        module_name = filename[:-3]
+        module = sys.modules.get(module_name)
+        if module is None:
+            spec = importlib.util.spec_from_file_location(module_name, os.path.join(BENCHMARK_DIR, filename))
+            module = importlib.util.module_from_spec(spec)
+            sys.modules[module_name] = module
+            spec.loader.exec_module(module)
+        if hasattr(module, "benchmarks"):
+            found.extend(module.benchmarks())
+    return [benchmark for benchmark in found if not pattern or pattern in benchmark.name]
+
+
+def run(benchmarks: List[Benchmark], repeat: int = REPEAT, number: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Time the calibration workload and every benchmark.
+
+    Args:
+        benchmarks: Benchmarks to run
+        repeat: Timed repeats per benchmark
+        number: Calls per repeat; chosen automatically when None
+
+    Returns:
+        Dict[str, Any]: Environment, calibration time and results keyed by benchmark name
+    """
+    calibration_number = measure(calibration_workload, repeat=1, number=number)["number"]
+    calibrations: List[float] = []
+    results: Dict[str, Any] = {}
+    for benchmark in benchmarks:
+        if benchmark.skip:
+            results[benchmark.name] = {"skipped": benchmark.skip}
+            continue
+        # Calibrate next to each benchmark so drift in machine speed during the run cancels out
+        calibration = measure(calibration_workload, repeat=repeat, number=calibration_number)["seconds"]
+        calibrations.append(calibration)
+        timing = measure(benchmark.func, repeat=repeat, number=number)
+        timing["relative"] = timing["seconds"] / calibration
+        results[benchmark.name] = timing
+    return {
+        "environment": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "machine": platform.machine(),
+            "system": platform.system(),
+        },
+        "calibration_seconds": statistics.median(calibrations) if calibrations else None,
+        "results": results,
+    }
+
+
+def load_baseline(path: str = BASELINE_PATH) -> Optional[Dict[str, Any]]:
+    """Load stored baselines, or None if there are none."""
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as baseline_file:
+        return json.load(baseline_file)
+
+
+def save_baseline(report: Dict[str, Any], path: str = BASELINE_PATH) -> None:
+    """
+    Store a run as the baseline, keeping entries for benchmarks skipped in this run.
+
+    Args:
+        report: Result of run()
+        path: Baseline file
+    """
+    previous = (load_baseline(path) or {}).get("results", {})
+    results = {
+        name: previous[name] if "skipped" in result and name in previous else result
+        for name, result in report["results"].items()
+    }
+    results.update({name: result for name, result in previous.items() if name not in results})
+    stored = dict(report, results={
+        name: {key: value for key, value in result.items() if key != "number"}
+        for name, result in sorted(results.items()) if "skipped" not in result
+    })
+    with open(path, "w", encoding="utf-8") as baseline_file:
+        json.dump(stored, baseline_file, indent=2, sort_keys=True)
+        baseline_file.write("\n")
+
+
+def compare(report: Dict[str, Any], baseline: Optional[Dict[str, Any]], tolerance: float = TOLERANCE) -> List[Dict[str, Any]]:
+    """
+    Compare a run against the baseline.
+
+    Args:
+        report: Result of run()
+        baseline: Result of load_baseline()
+        tolerance: Relative slowdown reported as a regression
+
+    Returns:
+        List[Dict[str, Any]]: One row per benchmark with its status: "ok", "regression",
+        "improvement", "new" (no baseline) or "skipped"
+    """
+    baseline_results = (baseline or {}).get("results", {})
+    rows = []
+    for name, result in report["results"].items():
+        row = {"name": name}
+        if "skipped" in result:
+            row.update(status="skipped", detail=result["skipped"])
+        elif name not in baseline_results:
+            row.update(status="new", seconds=result["seconds"])
+        else:
+            change = result["relative"] / baseline_results[name]["relative"] - 1
+            status = "regression" if change > tolerance else "improvement" if change < -tolerance else "ok"
+            row.update(status=status, seconds=result["seconds"], change=change)
+        rows.append(row)
+    return rows
+
+
+def format_rows(rows: List[Dict[str, Any]]) -> str:
+    """Render comparison rows as a text table."""
+    lines = [f"{'benchmark':<52} {'time':>12} {'vs baseline':>12}  status"]
+    for row in rows:
+        seconds = f"{row['seconds'] * 1e6:10.2f}us" if "seconds" in row else ""
+        change = f"{row['change']:+11.1%}" if "change" in row else ""
+        status = row["status"] + (f" ({row['detail']})" if "detail" in row else "")
+        lines.append(f"{row['name']:<52} {seconds:>12} {change:>12}  {status}")
+    return "\n".join(lines)
@@ -0,0 +1,63 @@
+"""
+Run the benchmark suite and compare it with the stored baselines.
+
+Run from the backend directory:
+    python benchmarks/run.py                  # run everything, compare with baselines.json
+    python benchmarks/run.py -k extract_json  # only benchmarks whose name contains "extract_json"
+    python benchmarks/run.py --check          # exit with status 1 if anything regressed
+    python benchmarks/run.py --save           # record this run as the new baseline
+
+The regression gate is not part of the default test run, because timings
+depend on the machine. Run it before merging a change to a hot path, or via
+pytest (this is what a CI benchmark job should run):
+    RUN_BENCHMARKS=1 python -m pytest tests/test_benchmarks.py
+
+Re-record the baseline (--save) in the same change as an intentional
+performance change, so the next comparison starts from it.
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import harness  # noqa: E402
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the analysis hot paths.")
+    parser.add_argument("-k", dest="pattern", help="only run benchmarks whose name contains this")
+    parser.add_argument("--check", action="store_true", help="exit with status 1 on regressions")
+    parser.add_argument("--save", action="store_true", help="store this run as the baseline")
+    parser.add_argument("--tolerance", type=float, default=harness.TOLERANCE, help="slowdown reported as a regression")
+    parser.add_argument("--repeat", type=int, default=harness.REPEAT, help="timed repeats per benchmark")
+    parser.add_argument("--baseline", default=harness.BASELINE_PATH, help="baseline file")
+    parser.add_argument("--output", help="also write this run's results to a JSON file")
+    args = parser.parse_args()
+
+    benchmarks = harness.discover(args.pattern)
+    if not benchmarks:
+        print(f"No benchmarks match {args.pattern!r}")
+        return 1
+
+    report = harness.run(benchmarks, repeat=args.repeat)
+    rows = harness.compare(report, harness.load_baseline(args.baseline), args.tolerance)
+    print(harness.format_rows(rows))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as output_file:
+            json.dump(report, output_file, indent=2)
+    if args.save:
+        harness.save_baseline(report, args.baseline)
+        print(f"\nSaved baseline to {args.baseline}")
+
+    regressions = [row["name"] for row in rows if row["status"] == "regression"]
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}: {', '.join(regressions)}")
+        return 1 if args.check else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
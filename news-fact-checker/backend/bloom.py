@@ -0,0 +1,231 @@
+"""
+Downloadable Bloom filter of the canonical URLs that have a cached analysis.
+
+Clients (e.g. for "already fact-checked" badges on index pages) download the
+filter once and test links locally, then keep it fresh with small deltas.
+The filter is rebuilt from MongoDB every BLOOM_REFRESH_INTERVAL seconds.
+
+Hashing, so clients can test membership themselves: take the SHA-256 of the
+UTF-8 canonical URL, read h1 and h2 as big-endian unsigned 32-bit integers
+from bytes 0-3 and 4-7, set h2 |= 1, and check bits (h1 + i * h2) mod
+num_bits for i in 0..num_hashes-1. Bit p is (bits[p >> 3] >> (p & 7)) & 1.
+
+Versions look like "<num_bits>.<num_hashes>.<watermark_ms>.<sequence>". The
+sequence increases whenever a refresh sets new bits, including bits for
+analyses committed out of order behind the watermark; it starts at the
+build time in milliseconds so it keeps increasing across restarts. A filter
+only ever gains bits while its size stays the same, so a client holding an
+older version of the same size can apply a delta; once the filter is resized
+(its capacity doubles as the cache grows) clients must download it again.
+"""
+import asyncio
+import hashlib
+import math
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Iterable, List, Optional, Set, Tuple
+
+from config import settings
+from logger import db_logger
+from utils import canonicalize_url
+
+
+CACHED_ANALYSIS_QUERY = {"issues.0": {"$exists": True}}
+
+
+def bloom_positions(item: str, num_bits: int, num_hashes: int) -> List[int]:
+    """
+    Get the bit positions of an item, using the double hashing scheme described above.
+
+    Args:
+        item: Item to hash (a canonical URL)
+        num_bits: Size of the filter in bits
+        num_hashes: Number of hash functions
+
+    Returns:
+        List[int]: Bit positions
+    """
+    digest = hashlib.sha256(item.encode("utf-8")).digest()
+    h1 = int.from_bytes(digest[0:4], "big")
+    h2 = int.from_bytes(digest[4:8], "big") | 1
+    return [(h1 + i * h2) % num_bits for i in range(num_hashes)]
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter sized for a capacity and false positive rate."""
+
+    def __init__(self, capacity: int, error_rate: float = settings.BLOOM_ERROR_RATE):
+        self.capacity = capacity
+        self.num_bits = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_bits += -self.num_bits % 8  # Whole bytes
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray(self.num_bits // 8)
+        self.count = 0
+
+    def add(self, item: str) -> bool:
+        """
+        Add an item.
+
+        Returns:
+            bool: True if any bit was newly set
+        """
+        changed = False
+        for position in bloom_positions(item, self.num_bits, self.num_hashes):
+            mask = 1 << (position & 7)
+            if not self.bits[position >> 3] & mask:
+                self.bits[position >> 3] |= mask
+                changed = True
+        self.count += 1
+        return changed
+
+    def __contains__(self, item: str) -> bool:
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in bloom_positions(item, self.num_bits, self.num_hashes)
+        )
+
+
+def capacity_for(count: int) -> int:
+    """Filter capacity for a number of URLs: BLOOM_MIN_CAPACITY doubled until it has headroom."""
+    capacity = settings.BLOOM_MIN_CAPACITY
+    while capacity < count * 2:
+        capacity *= 2
+    return capacity
+
+
+def _as_utc(value: datetime) -> datetime:
+    # PyMongo returns naive UTC datetimes unless the client is tz_aware
+    return value if value.tzinfo is not None else value.replace(tzinfo=timezone.utc)
+
+
+class CachedUrlFilter:
+    """Keeps a Bloom filter of cached canonical URLs in sync with MongoDB."""
+
+    def __init__(self):
+        self.collection = None
+        self.filter: Optional[BloomFilter] = None
+        self.watermark: Optional[datetime] = None  # Newest created_at included in the filter
+        self.sequence = 0  # Bumped whenever a refresh sets new bits
+        self._task: Optional[asyncio.Task] = None
+
+    def initialize(self, collection) -> None:
+        """
+        Attach the article analyses collection.
+
+        Args:
+            collection: MongoDB collection of cached analyses
+        """
+        self.collection = collection
+        collection.create_index("created_at")
+
+    @property
+    def version(self) -> Optional[str]:
+        """Version of the current filter, or None before the first build."""
+        if self.filter is None:
+            return None
+        watermark_ms = int(self.watermark.timestamp() * 1000) if self.watermark else 0
+        return f"{self.filter.num_bits}.{self.filter.num_hashes}.{watermark_ms}.{self.sequence}"
+
+    def refresh(self) -> None:
+        """Add analyses cached since the last refresh, or rebuild when the filter needs to grow."""
+        capacity = capacity_for(self.collection.count_documents(CACHED_ANALYSIS_QUERY))
+        if self.filter is None or self.filter.capacity != capacity:
+            bloom = BloomFilter(capacity)
+            watermark, _ = self._add_urls(bloom, self._cached_urls())
+            self.filter, self.watermark, self.sequence = bloom, watermark, max(self.sequence + 1, int(time.time() * 1000))
+            db_logger.info(f"Built Bloom filter of {bloom.count} cached URLs ({bloom.num_bits // 8} bytes)")
+            return
+
+        # Re-scanning the overlap window catches analyses committed out of created_at order
+        watermark, changed = self._add_urls(self.filter, self._cached_urls(after=self._overlap_start(self.watermark)))
+        if watermark is not None and (self.watermark is None or watermark > self.watermark):
+            self.watermark = watermark
+        if changed:
+            self.sequence += 1
+
+    def delta(self, since_version: str) -> Optional[Tuple[str, List[int]]]:
+        """
+        Get the bits set since an earlier version of the current filter.
+
+        Args:
+            since_version: Version the client holds
+
+        Returns:
+            Optional[Tuple[str, List[int]]]: Current version and the bit positions to set,
+            or None if the client must download the full filter
+        """
+        try:
+            num_bits, num_hashes, watermark_ms, _ = (int(part) for part in since_version.split("."))
+        except ValueError:
+            return None
+        bloom, watermark, version = self.filter, self.watermark, self.version
+        if bloom is None or (num_bits, num_hashes) != (bloom.num_bits, bloom.num_hashes):
+            return None
+        if since_version == version:
+            return version, []
+
+        since = datetime.fromtimestamp(watermark_ms / 1000, tz=timezone.utc)
+        query = {**CACHED_ANALYSIS_QUERY, "created_at": {"$gt": self._overlap_start(since)}}
+        if watermark is not None:
+            query["created_at"]["$lte"] = watermark
+        if self.collection.count_documents(query, limit=settings.BLOOM_MAX_DELTA_URLS + 1) > settings.BLOOM_MAX_DELTA_URLS:
+            return None
+
+        positions: Set[int] = set()
+        for url, _ in self._iter_urls(self.collection.find(query, {"url": 1, "canonical_url": 1, "created_at": 1})):
+            positions.update(bloom_positions(url, num_bits, num_hashes))
+        return version, sorted(positions)
+
+    def start(self) -> None:
+        """Start refreshing the filter in the background."""
+        self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        """Stop the background refresh."""
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.to_thread(self.refresh)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                db_logger.error("Failed to refresh Bloom filter of cached URLs", error=e)
+            await asyncio.sleep(settings.BLOOM_REFRESH_INTERVAL)
+
+    def _cached_urls(self, after: Optional[datetime] = None) -> Iterable[Tuple[str, Optional[datetime]]]:
+        query = dict(CACHED_ANALYSIS_QUERY)
+        if after is not None:
+            query["created_at"] = {"$gt": after}
+        return self._iter_urls(self.collection.find(query, {"url": 1, "canonical_url": 1, "created_at": 1}))
+
+    @staticmethod
+    def _iter_urls(docs) -> Iterable[Tuple[str, Optional[datetime]]]:
+        for doc in docs:
+            created_at = doc.get("created_at")
+            # Analyses cached before canonical URLs were stored are canonicalized here
+            yield doc.get("canonical_url") or canonicalize_url(doc["url"]), _as_utc(created_at) if created_at else None
+
+    @staticmethod
+    def _add_urls(bloom: BloomFilter, urls: Iterable[Tuple[str, Optional[datetime]]]) -> Tuple[Optional[datetime], bool]:
+        """Add URLs; returns their newest created_at and whether any new bit was set."""
+        watermark, changed = None, False
+        for url, created_at in urls:
+            changed = bloom.add(url) or changed
+            if created_at is not None and (watermark is None or created_at > watermark):
+                watermark = created_at
+        return watermark, changed
+
+    @staticmethod
+    def _overlap_start(watermark: Optional[datetime]) -> Optional[datetime]:
+        if watermark is None:
+            return None
+        return watermark - timedelta(seconds=settings.BLOOM_REFRESH_OVERLAP)
+
+
+# Global filter of cached analysis URLs
+cached_url_filter = CachedUrlFilter()
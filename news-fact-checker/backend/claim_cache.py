@@ -0,0 +1,281 @@
+"""
+Cross-article claim-level verdict cache.
+
+Every anchored issue is stored under a fingerprint of the sentence(s) that
+contain it. New articles are split into the same sentence windows and looked
+up in one query, so claims that were already verified elsewhere can be fed
+to the LLM as context, or reused outright when an article is mostly made of
+known claims.
+"""
+import hashlib
+import re
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from pymongo import UpdateOne
+
+from anchoring import fast_normalize_text, is_general_context, split_sentences
+from config import settings
+from logger import db_logger
+from models import AnalysisRoute, ClaimVerdict, Issue
+
+
+FINGERPRINT_STRIP_PATTERN = re.compile(r"[^\w%$]+")
+
+# Route tier recorded on analyses answered from the claim cache without an LLM call
+CLAIM_CACHE_TIER = "claim_cache"
+
+
+def claim_fingerprint(text: str) -> str:
+    """
+    Fingerprint a claim so trivially different renderings collide.
+
+    Args:
+        text: Claim text
+
+    Returns:
+        str: Hex digest of the case-folded, punctuation-free claim
+    """
+    canonical = FINGERPRINT_STRIP_PATTERN.sub(" ", fast_normalize_text(text)).strip()
+    return hashlib.sha1(canonical.encode("utf-8")).hexdigest()
+
+
+def build_sentence_windows(paragraphs: Sequence[str]) -> List[Tuple[str, int, int]]:
+    """
+    Build claim-sized windows of consecutive sentences, smallest windows first.
+
+    Args:
+        paragraphs: Paragraphs as returned by utils.split_into_paragraphs
+
+    Returns:
+        List[Tuple[str, int, int]]: Window text with the indices of its first
+        and last sentence
+    """
+    sentences, paragraph_ids = split_sentences(paragraphs)
+    windows: List[Tuple[str, int, int]] = []
+    for size in range(1, settings.FUZZY_ANCHOR_MAX_SENTENCES + 1):
+        for first in range(len(sentences) - size + 1):
+            last = first + size - 1
+            if paragraph_ids[first] == paragraph_ids[last]:
+                windows.append((" ".join(sentences[first:last + 1]), first, last))
+    return windows
+
+
+class ClaimLookupResult:
+    """Prior verdicts matching the sentences of an article."""
+
+    def __init__(
+        self,
+        matches: List[Tuple[str, ClaimVerdict]],
+        sentence_count: int,
+        covered_sentences: int,
+        spans: Optional[List[Tuple[int, int]]] = None
+    ):
+        """
+        Args:
+            matches: Matched window text and its verdict
+            sentence_count: Number of sentences in the article
+            covered_sentences: Number of sentences inside some matched window
+            spans: First and last sentence index of each match, in the same order
+        """
+        self.matches = matches
+        self.sentence_count = sentence_count
+        self.covered_sentences = covered_sentences
+        self.spans = spans if spans is not None else [(index, index) for index in range(len(matches))]
+
+    @property
+    def coverage(self) -> float:
+        """Fraction of the article's sentences that are known claims."""
+        return self.covered_sentences / self.sentence_count if self.sentence_count else 0.0
+
+    @property
+    def can_short_circuit(self) -> bool:
+        """Whether the prior verdicts cover enough of the article to skip the LLM."""
+        return (
+            settings.ENABLE_CLAIM_SHORT_CIRCUIT
+            and len(self.matches) >= settings.CLAIM_SHORT_CIRCUIT_MIN_MATCHES
+            and self.coverage >= settings.CLAIM_SHORT_CIRCUIT_COVERAGE
+        )
+
+    def short_circuit_route(self) -> AnalysisRoute:
+        """Route recorded for analyses answered entirely from prior verdicts."""
+        return AnalysisRoute(
+            tier=CLAIM_CACHE_TIER,
+            model="none",
+            max_tokens=0,
+            reason=f"{len(self.matches)} prior verdicts cover {self.coverage:.0%} of sentences",
+        )
+
+    def to_issues(self) -> List[Issue]:
+        """
+        Turn the matched verdicts into issues quoting this article's text.
+
+        Overlapping windows (e.g. a sentence and the two-sentence window
+        containing it) would report the same claim twice; the smallest
+        window wins.
+
+        Returns:
+            List[Issue]: One issue per non-overlapping match, in article order
+        """
+        taken: List[Tuple[int, int]] = []
+        selected: List[Tuple[int, str, ClaimVerdict]] = []
+        by_size = sorted(zip(self.spans, self.matches), key=lambda item: (item[0][1] - item[0][0], item[0][0]))
+        for (first, last), (window_text, verdict) in by_size:
+            if any(first <= other_last and other_first <= last for other_first, other_last in taken):
+                continue
+            taken.append((first, last))
+            selected.append((first, window_text, verdict))
+        return [
+            Issue(
+                text=window_text,
+                explanation=verdict.explanation,
+                confidence_score=verdict.confidence_score,
+                source_urls=verdict.source_urls,
+            )
+            for _, window_text, verdict in sorted(selected, key=lambda item: item[0])
+        ]
+
+    def to_prompt_context(self) -> str:
+        """Render the matched verdicts as a prompt section, or an empty string."""
+        if not self.matches:
+            return ""
+        lines = [
+            "PREVIOUSLY VERIFIED CLAIMS (verdicts from earlier analyses of other articles):"
+        ]
+        for window_text, verdict in self.matches[:settings.CLAIM_CONTEXT_MAX_VERDICTS]:
+            sources = ", ".join(verdict.source_urls or []) or "none"
+            checked = verdict.updated_at.strftime("%Y-%m-%d")
+            lines.append(
+                f'- "{window_text}" -> {verdict.explanation} '
+                f"(confidence {verdict.confidence_score:.2f}; checked {checked}; sources: {sources})"
+            )
+        return "\n".join(lines) + "\n"
+
+
+class ClaimVerdictCache:
+    """MongoDB-backed store of claim verdicts keyed by claim fingerprint."""
+
+    def __init__(self):
+        self.collection = None
+
+    def initialize(self, collection) -> None:
+        """
+        Attach the claim collection and make sure its indexes exist.
+
+        Args:
+            collection: MongoDB collection for claim verdicts
+        """
+        self.collection = collection
+        collection.create_index("fingerprint", unique=True)
+        collection.create_index("updated_at", expireAfterSeconds=settings.CLAIM_VERDICT_MAX_AGE_DAYS * 24 * 60 * 60)
+        db_logger.info("Claim verdict cache initialized")
+
+    @property
+    def is_enabled(self) -> bool:
+        """Whether lookups and writes should be performed."""
+        return settings.ENABLE_CLAIM_CACHE and self.collection is not None
+
+    def lookup(self, paragraphs: Sequence[str]) -> ClaimLookupResult:
+        """
+        Find prior verdicts for the sentences of an article with a single query.
+
+        Args:
+            paragraphs: Article paragraphs
+
+        Returns:
+            ClaimLookupResult: Matching verdicts and how much of the article they cover
+        """
+        windows = build_sentence_windows(paragraphs)
+        sentence_count = len(split_sentences(paragraphs)[0])
+        if not self.is_enabled or not windows:
+            return ClaimLookupResult([], sentence_count, 0)
+
+        windows_by_fingerprint: Dict[str, Tuple[str, int, int]] = {}
+        for window in windows:
+            windows_by_fingerprint.setdefault(claim_fingerprint(window[0]), window)
+
+        try:
+            cutoff = datetime.now(timezone.utc) - timedelta(days=settings.CLAIM_VERDICT_MAX_AGE_DAYS)
+            documents = list(self.collection.find({
+                "fingerprint": {"$in": list(windows_by_fingerprint)},
+                "updated_at": {"$gte": cutoff},
+            }))
+        except Exception as e:
+            db_logger.error("Claim verdict lookup failed", error=e)
+            return ClaimLookupResult([], sentence_count, 0)
+
+        matches: List[Tuple[str, ClaimVerdict]] = []
+        spans: List[Tuple[int, int]] = []
+        covered = set()
+        for document in documents:
+            document.pop("_id", None)
+            window_text, first, last = windows_by_fingerprint[document["fingerprint"]]
+            matches.append((window_text, ClaimVerdict(**document)))
+            spans.append((first, last))
+            covered.update(range(first, last + 1))
+
+        return ClaimLookupResult(matches, sentence_count, len(covered), spans)
+
+    def record_issues(self, issues: List[Issue], paragraphs: Sequence[str], article_url: str) -> int:
+        """
+        Store the verdict of every issue under its enclosing sentence window.
+
+        Args:
+            issues: Anchored issues of an analysis
+            paragraphs: Paragraphs of the analyzed article
+            article_url: URL of the analyzed article
+
+        Returns:
+            int: Number of verdicts written
+        """
+        if not self.is_enabled or not issues:
+            return 0
+
+        windows = [(fast_normalize_text(text), text) for text, _, _ in build_sentence_windows(paragraphs)]
+        now = datetime.now(timezone.utc)
+        operations = []
+        for issue in issues:
+            if is_general_context(issue):
+                continue
+            claim_text = self._enclosing_window(fast_normalize_text(issue.text), windows)
+            if claim_text is None:
+                continue
+            operations.append(UpdateOne(
+                {"fingerprint": claim_fingerprint(claim_text)},
+                {
+                    "$set": {
+                        "claim_text": claim_text,
+                        "explanation": issue.explanation,
+                        "confidence_score": issue.confidence_score,
+                        "source_urls": issue.source_urls,
+                        "article_url": article_url,
+                        "updated_at": now,
+                    },
+                    "$setOnInsert": {"created_at": now},
+                    "$inc": {"seen_count": 1},
+                },
+                upsert=True,
+            ))
+
+        if not operations:
+            return 0
+        try:
+            self.collection.bulk_write(operations, ordered=False)
+            return len(operations)
+        except Exception as e:
+            db_logger.error(f"Failed to record claim verdicts for URL {article_url}", error=e)
+            return 0
+
+    @staticmethod
+    def _enclosing_window(normalized_text: str, windows: List[Tuple[str, str]]) -> Optional[str]:
+        """Find the smallest sentence window containing the (normalized) issue text."""
+        if not normalized_text:
+            return None
+        for normalized_window, window_text in windows:
+            if normalized_text in normalized_window:
+                return window_text
+        return None
+
+
+# Global claim verdict cache instance
+claim_cache = ClaimVerdictCache()
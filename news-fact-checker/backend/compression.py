@@ -0,0 +1,302 @@
+"""
+HTTP compression for responses and request bodies.
+
+`CompressionMiddleware` negotiates brotli or gzip from `Accept-Encoding`
+for JSON, NDJSON and SSE responses. Streaming responses are flushed after
+every chunk so SSE events are not held back by the compressor. Responses
+that already carry a `Content-Encoding` (e.g. precompressed cached
+analyses) are passed through untouched.
+
+Request bodies sent with `Content-Encoding: gzip` are decompressed before
+they reach the endpoint; both the compressed and the decompressed body are
+held to the path's request body limit (see limits.py).
+
+Brotli is used when the `brotli` package is installed; gzip always works.
+"""
+import gzip
+import zlib
+from typing import Dict, List, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from config import settings
+from limits import body_limit_for, request_size_stats
+from serialization import FastJSONResponse
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - brotli is optional
+    brotli = None
+
+
+# Response encodings in order of preference
+SUPPORTED_ENCODINGS: List[str] = (["br"] if brotli is not None else []) + ["gzip"]
+REQUEST_ENCODINGS = ("gzip",)
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """
+    Pick the response encoding for an Accept-Encoding header.
+
+    Args:
+        accept_encoding: Value of the Accept-Encoding header
+
+    Returns:
+        Optional[str]: "br" or "gzip", or None to send the response uncompressed
+    """
+    if not accept_encoding:
+        return None
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.lower().split(","):
+        coding, _, params = part.strip().partition(";")
+        weight = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                weight = float(params[2:])
+            except ValueError:
+                weight = 0.0
+        weights[coding.strip()] = weight
+
+    best, best_weight = None, 0.0
+    for encoding in SUPPORTED_ENCODINGS:
+        weight = weights.get(encoding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+def compress(data: bytes, encoding: str, level: Optional[int] = None) -> bytes:
+    """
+    Compress a complete payload.
+
+    Args:
+        data: Payload to compress
+        encoding: "br" or "gzip"
+        level: Brotli quality or gzip level; defaults to the streaming settings
+
+    Returns:
+        bytes: Compressed payload
+    """
+    if encoding == "br":
+        return brotli.compress(data, quality=settings.BROTLI_QUALITY if level is None else level)
+    return gzip.compress(data, compresslevel=settings.GZIP_COMPRESSION_LEVEL if level is None else level, mtime=0)
+
+
+def precompress(data: bytes) -> Dict[str, bytes]:
+    """
+    Compress a payload once, at the highest level, with every supported encoding.
+
+    Used for cached analyses, which are compressed when stored and served as-is.
+
+    Args:
+        data: Payload to compress
+
+    Returns:
+        Dict[str, bytes]: Compressed payloads keyed by encoding
+    """
+    levels = {"br": settings.PRECOMPRESSED_BROTLI_QUALITY, "gzip": settings.PRECOMPRESSED_GZIP_LEVEL}
+    return {encoding: compress(data, encoding, levels[encoding]) for encoding in SUPPORTED_ENCODINGS}
+
+
+class StreamCompressor:
+    """Incremental compressor that flushes after every chunk."""
+
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self._compressor = brotli.Compressor(quality=settings.BROTLI_QUALITY)
+        else:
+            self._compressor = zlib.compressobj(settings.GZIP_COMPRESSION_LEVEL, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        """Compress a chunk and flush it so the client can decode it immediately."""
+        if self.encoding == "br":
+            return self._compressor.process(data) + self._compressor.flush()
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        """End the compressed stream."""
+        if self.encoding == "br":
+            return self._compressor.finish()
+        return self._compressor.flush()
+
+
+class RequestBodyError(Exception):
+    """A compressed request body that cannot be accepted."""
+
+    def __init__(self, status_code: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+
+
+def decompress_request_body(body: bytes, encoding: str, max_size: int) -> bytes:
+    """
+    Decompress a request body, refusing bodies that inflate past max_size.
+
+    Args:
+        body: Compressed body
+        encoding: Value of the request's Content-Encoding header
+        max_size: Largest decompressed size accepted
+
+    Returns:
+        bytes: Decompressed body
+
+    Raises:
+        RequestBodyError: If the encoding is unsupported, the data is corrupt or too large
+    """
+    if encoding not in REQUEST_ENCODINGS:
+        raise RequestBodyError(415, f"Unsupported Content-Encoding: {encoding}")
+    decompressor = zlib.decompressobj(31)
+    try:
+        data = decompressor.decompress(body, max_size + 1)
+    except zlib.error:
+        raise RequestBodyError(400, "Request body is not valid gzip data")
+    if len(data) > max_size:
+        raise RequestBodyError(413, "Decompressed request body is too large")
+    if not decompressor.eof:
+        raise RequestBodyError(400, "Request body is truncated gzip data")
+    return data
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing responses and decompressing request bodies."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = settings.COMPRESSION_MIN_SIZE,
+        max_request_size: Optional[int] = None
+    ):
+        """
+        Args:
+            app: ASGI application
+            minimum_size: Complete responses smaller than this are sent uncompressed
+            max_request_size: Request body limit; defaults to the path's limit from limits.py
+        """
+        self.app = app
+        self.minimum_size = minimum_size
+        self.max_request_size = max_request_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        request_encoding = headers.get("content-encoding", "").strip().lower()
+        if request_encoding and request_encoding != "identity":
+            try:
+                scope, receive = await self._decompressed_request(scope, receive, request_encoding)
+            except RequestBodyError as e:
+                if e.status_code == 413:
+                    request_size_stats.rejected_while_streaming += 1
+                response = FastJSONResponse({"detail": e.detail}, status_code=e.status_code)
+                await response(scope, receive, send)
+                return
+
+        encoding = negotiate_encoding(headers.get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        await self.app(scope, receive, _CompressingSend(send, encoding, self.minimum_size))
+
+    async def _decompressed_request(self, scope: Scope, receive: Receive, encoding: str):
+        max_size = self.max_request_size or body_limit_for(scope["path"])
+        chunks = []
+        received = 0
+        more_body = True
+        while more_body:
+            message = await receive()
+            if message["type"] != "http.request":
+                break
+            chunks.append(message.get("body", b""))
+            received += len(chunks[-1])
+            if received > max_size:
+                raise RequestBodyError(413, "Compressed request body is too large")
+            more_body = message.get("more_body", False)
+        body = decompress_request_body(b"".join(chunks), encoding, max_size)
+
+        scope = dict(scope)
+        request_headers = MutableHeaders(scope=scope)
+        del request_headers["content-encoding"]
+        request_headers["content-length"] = str(len(body))
+
+        sent = False
+
+        async def decompressed_receive() -> Message:
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        return scope, decompressed_receive
+
+
+def _is_compressible(content_type: str) -> bool:
+    media_type = content_type.split(";")[0].strip().lower()
+    return media_type in settings.COMPRESSIBLE_MEDIA_TYPES or media_type.startswith("text/")
+
+
+class _CompressingSend:
+    """Wraps an ASGI send callable to compress one response."""
+
+    def __init__(self, send: Send, encoding: str, minimum_size: int):
+        self.send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.start_message: Optional[Message] = None
+        self.compressor: Optional[StreamCompressor] = None
+        self.passthrough = False
+
+    async def __call__(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            headers = Headers(raw=message["headers"])
+            self.passthrough = (
+                "content-encoding" in headers
+                or not _is_compressible(headers.get("content-type", ""))
+            )
+            if self.passthrough:
+                await self.send(message)
+            else:
+                self.start_message = message
+            return
+
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.start_message is not None:
+            start, self.start_message = self.start_message, None
+            if not more_body and len(body) < self.minimum_size:
+                # Too small to be worth compressing
+                self.passthrough = True
+                await self.send(start)
+                await self.send(message)
+                return
+
+            headers = MutableHeaders(raw=start["headers"])
+            headers["content-encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            if not more_body:
+                compressed = compress(body, self.encoding)
+                headers["content-length"] = str(len(compressed))
+                await self.send(start)
+                await self.send({"type": "http.response.body", "body": compressed})
+                return
+
+            # Streaming response: compress incrementally, flushing every chunk
+            del headers["content-length"]
+            self.compressor = StreamCompressor(self.encoding)
+            await self.send(start)
+
+        chunk = self.compressor.compress(body) if body else b""
+        if not more_body:
+            chunk += self.compressor.finish()
+        await self.send({"type": "http.response.body", "body": chunk, "more_body": more_body})
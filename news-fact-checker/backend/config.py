@@ -2,7 +2,7 @@
 Configuration settings for the News Fact-Checker API.
 """
 import os
-from typing import List
+from typing import Any, Dict, List, Optional, Tuple
 
 
 class Settings:
@@ -27,6 +27,51 @@ class Settings:
     TEMPERATURE: float = 0.1
     MAX_TOKENS: int = 8000
     
+    # Model Routing Configuration
+    ENABLE_MODEL_ROUTING: bool = True
+    MODEL_TIERS: Dict[str, Dict[str, Any]] = {
+        "fast": {"model": "sonar", "max_tokens": 2000},
+        "standard": {"model": "sonar-pro", "max_tokens": 4000},
+        "deep": {"model": PERPLEXITY_MODEL, "max_tokens": MAX_TOKENS},
+    }
+    MODEL_TIER_ORDER: List[str] = ["fast", "standard", "deep"]
+    DEFAULT_MODEL_TIER: str = "deep"
+    ROUTING_SHORT_ARTICLE_WORDS: int = 600  # At or below this, the fast tier is enough
+    ROUTING_LONG_ARTICLE_WORDS: int = 2500  # Above this, every account gets the deep tier
+    LATENCY_SLO_SECONDS: float = 60.0  # Target p90 latency per model tier
+    LATENCY_WINDOW_SIZE: int = 50  # Recent calls kept per tier for latency estimates
+    LATENCY_MIN_SAMPLES: int = 5  # Observations needed before latency influences routing
+    
+    # LLM Resilience Configuration
+    LLM_CALL_DEADLINE: float = 110.0  # Budget per analysis for the slot queue wait plus all retries, below the advertised 120s request timeout
+    LLM_ATTEMPT_TIMEOUT: float = 90.0  # Timeout for a single upstream attempt
+    LLM_MAX_RETRIES: int = 2
+    LLM_RETRY_BASE_BACKOFF: float = 1.0  # Seconds, doubled per attempt with full jitter
+    LLM_RETRY_MAX_BACKOFF: float = 8.0
+    ENABLE_LLM_HEDGING: bool = False  # Hedged requests duplicate paid LLM calls
+    LLM_HEDGE_PERCENTILE: float = 0.95  # Send a hedged request once a call runs past this latency percentile
+    LLM_BREAKER_FAILURE_THRESHOLD: int = 5  # Consecutive failures before the breaker opens
+    LLM_BREAKER_RESET_TIMEOUT: float = 30.0  # Seconds the breaker stays open before a probe call
+    LLM_MAX_WORKERS: int = 32  # Threads available for blocking LLM calls
+    
+    # LLM Scheduler Configuration
+    LLM_SCHEDULER_CONCURRENCY: int = 8  # Analyses allowed to call the LLM at once
+    LLM_SCHEDULER_WEIGHTS: Dict[str, int] = {"premium": 4, "free": 1}  # Share of slots per account type under saturation
+    LLM_SCHEDULER_PER_USER_LIMIT: int = 2  # Concurrent LLM slots a single user may hold
+    LLM_SCHEDULER_MAX_QUEUE_PER_CLASS: int = 200
+    LLM_SCHEDULER_QUEUE_TIMEOUT: float = 60.0  # Longest wait for a slot; also bounded by what is left of LLM_CALL_DEADLINE
+    LLM_SCHEDULER_POSITION_INTERVAL: float = 2.0  # Seconds between queue position updates on streams
+    LLM_SCHEDULER_RETRY_AFTER: int = 15  # Retry-After sent when the queue is full or timed out
+    
+    # Fake LLM Backend Configuration (LLM_BACKEND=fake, overridable via FAKE_LLM_* env vars)
+    FAKE_LLM_LATENCY_MEDIAN: float = 20.0  # Median seconds per call, log-normally distributed
+    FAKE_LLM_LATENCY_SIGMA: float = 0.5
+    FAKE_LLM_ERROR_RATE: float = 0.0  # Fraction of calls failing with a connection error
+    FAKE_LLM_HANG_RATE: float = 0.0  # Fraction of calls hanging past the attempt timeout
+    FAKE_LLM_TOKENS_PER_SECOND: float = 50.0
+    FAKE_LLM_SEED: Optional[int] = None
+    FAKE_LLM_SYNTHETIC_ISSUES: int = 3  # Issues synthesized per article when no recordings are loaded
+    
     # Analysis Configuration
     MIN_PARAGRAPH_LENGTH: int = 30
     MIN_MEANINGFUL_PARAGRAPH_LENGTH: int = 50
@@ -34,6 +79,14 @@ class Settings:
     MIN_PARAGRAPH_CHAR_LENGTH: int = 100
     MAX_PARAGRAPH_CHAR_LENGTH: int = 300
     MIN_CONTENT_LENGTH: int = 100
+    MAX_BATCH_ARTICLES: int = 50  # Articles accepted by /analyze/batch per request
+    ENABLE_ISSUE_ANCHORING: bool = True  # Locate each issue's text in the article and drop unanchorable issues
+    GENERAL_CONTEXT_MARKER: str = "GENERAL CONTEXT"  # Issue text used for article-wide issues, never anchored
+    ENABLE_FUZZY_ANCHORING: bool = True  # Re-anchor paraphrased issue text to the closest article sentences
+    FUZZY_ANCHOR_THRESHOLD: float = 0.6  # Minimum cosine similarity of character n-gram vectors
+    FUZZY_ANCHOR_MAX_SENTENCES: int = 3  # Largest sentence window compared against an issue
+    FUZZY_ANCHOR_NGRAM_SIZE: int = 3
+    FUZZY_ANCHOR_HASH_DIMENSIONS: int = 2048
     
     # Streaming Configuration
     ENABLE_STREAMING: bool = True
@@ -41,10 +94,90 @@ class Settings:
     STREAM_TIMEOUT: int = 300  # 5 minutes for streaming
     STREAM_KEEPALIVE_INTERVAL: int = 30  # Send keepalive every 30 seconds
     MAX_CONCURRENT_STREAMS: int = 10  # Limit concurrent streaming connections
+    STREAM_RETRY_AFTER: int = 5  # Retry-After sent when the stream limit is reached
+    WS_MAX_STREAMS_PER_CONNECTION: int = 8  # Concurrent analyses multiplexed over one WebSocket
+    WS_SEND_QUEUE_SIZE: int = 64  # Outgoing WebSocket messages buffered before streams are paused
+    WS_AUTH_TIMEOUT: float = 10.0  # Seconds a new WebSocket has to send its auth message
+    CACHED_REPLAY_MODE: str = "instant"  # Cached results on /analyze/stream: "instant", "coalesced" or "paced"
+    SSE_EVENT_LOG_MAX_EVENTS: int = 500  # Events kept per analysis for Last-Event-ID resumption
+    SSE_EVENT_LOG_TTL: int = 600  # Seconds a finished analysis stays resumable
+    ANALYSIS_RUN_SHUTDOWN_GRACE: float = 30.0  # Seconds in-flight background analyses get to finish on shutdown
+    
+    # Request Size Limits
+    MAX_REQUEST_BODY_BYTES: int = 2 * 1024 * 1024  # Larger bodies are rejected with 413 while still streaming in
+    REQUEST_BODY_LIMITS: Dict[str, int] = {"/analyze/batch": 20 * 1024 * 1024}  # Per-path overrides
+    MAX_ARTICLE_CONTENT_CHARS: int = 200_000  # Article content beyond this is truncated or rejected
+    OVERSIZED_CONTENT_POLICY: str = "truncate"  # "truncate" or "reject" (422)
+    
+    # Compression Configuration
+    ENABLE_COMPRESSION: bool = True
+    COMPRESSION_MIN_SIZE: int = 1024  # Complete responses smaller than this are sent uncompressed
+    COMPRESSIBLE_MEDIA_TYPES: List[str] = ["application/json", "application/x-ndjson", "text/event-stream"]
+    GZIP_COMPRESSION_LEVEL: int = 6  # Per-response compression, including streams
+    BROTLI_QUALITY: int = 5
+    PRECOMPRESSED_GZIP_LEVEL: int = 9  # Cached analyses are compressed once, so use the best ratio
+    PRECOMPRESSED_BROTLI_QUALITY: int = 11
+    
+    # Metrics Configuration
+    ENABLE_METRICS: bool = os.getenv("ENABLE_METRICS", "false").lower() == "true"  # Serve Prometheus metrics at /metrics (admin key required)
+    METRICS_LATENCY_BUCKETS: List[float] = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 90, 120, 300]
+    METRICS_DB_BUCKETS: List[float] = [0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5]
+    
+    # Logging Configuration
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "json")  # "json" (one object per line) or "text"
+    LOG_QUEUE_SIZE: int = 10000  # Records waiting for the writer thread; more are dropped
+    LOG_SAMPLE_RATES: Dict[str, float] = {}  # Logger name -> fraction of DEBUG/INFO records kept, e.g. {"database": 0.1}
+    
+    # Tracing Configuration
+    ENABLE_TRACING: bool = True
+    TRACE_SAMPLE_RATE: float = 0.05  # Fraction of ordinary traces exported
+    TRACE_SLOW_THRESHOLD: float = 5.0  # Seconds; slower (and failed) traces are always exported
+    TRACE_EXPORT_FILE: Optional[str] = os.getenv("TRACE_EXPORT_FILE")  # e.g. logs/otlp-traces.jsonl; export is off unless this or the endpoint is set
+    TRACE_EXPORT_ENDPOINT: Optional[str] = os.getenv("TRACE_EXPORT_ENDPOINT")  # OTLP/HTTP JSON, e.g. http://localhost:4318/v1/traces
+    TRACE_EXPORT_QUEUE_SIZE: int = 1000  # Traces waiting for export; more are dropped
+    TRACE_MAX_OPEN_TRACES: int = 10000  # Traces buffered until their last span ends
+    
+    # Profiler Configuration (admin endpoints require the ADMIN_API_KEY environment variable)
+    PROFILER_INTERVAL: float = 0.01  # Seconds between stack samples
+    PROFILER_MIN_INTERVAL: float = 0.001
+    PROFILER_DEFAULT_DURATION: float = 10.0
+    PROFILER_MAX_DURATION: float = 120.0  # Worker profiles are capped at this; request profiles stop sampling after it
+    PROFILER_RESULTS_KEPT: int = 20  # Finished profiles kept for GET /admin/profile/{profile_id}
     
     # Database Configuration
     DATABASE_NAME: str = "news_fact_checker_db"
     COLLECTION_NAME: str = "article_analyses"
+    CLAIM_COLLECTION_NAME: str = "claim_verdicts"
+    JOB_COLLECTION_NAME: str = "analysis_jobs"
+    
+    # Cache Probe Configuration
+    TRACKING_QUERY_PREFIXES: Tuple[str, ...] = ("utm_",)  # Query parameters ignored by canonical URLs
+    TRACKING_QUERY_PARAMS: Tuple[str, ...] = ("fbclid", "gclid", "mc_cid", "mc_eid", "ref", "cmpid", "ocid")
+    
+    MAX_BULK_PROBE_URLS: int = 500  # URLs accepted by /analyze/probe/bulk per request
+    BLOOM_ERROR_RATE: float = 0.01  # False positive rate of the downloadable filter of cached URLs
+    BLOOM_MIN_CAPACITY: int = 16384  # Capacity doubles whenever the cache reaches half of it
+    BLOOM_REFRESH_INTERVAL: float = 300.0  # Seconds between filter refreshes
+    BLOOM_REFRESH_OVERLAP: float = 60.0  # Seconds of analyses re-scanned per refresh to catch late commits
+    BLOOM_MAX_DELTA_URLS: int = 5000  # Larger deltas make the client download the full filter
+    
+    # Claim Verdict Cache Configuration
+    ENABLE_CLAIM_CACHE: bool = True
+    CLAIM_VERDICT_MAX_AGE_DAYS: int = 30  # Verdicts older than this are re-verified (and expire via TTL index)
+    CLAIM_CONTEXT_MAX_VERDICTS: int = 20  # Prior verdicts included in the prompt
+    ENABLE_CLAIM_SHORT_CIRCUIT: bool = False  # Skip the LLM for articles almost entirely made of known claims
+    CLAIM_SHORT_CIRCUIT_MIN_MATCHES: int = 5
+    CLAIM_SHORT_CIRCUIT_COVERAGE: float = 0.9  # Fraction of article sentences that must be known claims
+    
+    # Analysis Job Configuration
+    ENABLE_JOB_WORKERS: bool = True  # Run job workers in this process
+    JOB_WORKER_COUNT: int = 8  # Capped at LLM_SCHEDULER_CONCURRENCY; each worker holds a job thread
+    JOB_LEASE_SECONDS: int = 300  # A running job is re-claimed by another worker after this
+    JOB_MAX_ATTEMPTS: int = 3
+    JOB_POLL_INTERVAL: float = 1.0  # Seconds between queue polls by idle workers and long-polling clients
+    JOB_MAX_WAIT_SECONDS: int = 30  # Longest long-poll a client may request
+    JOB_RESULT_TTL_HOURS: int = 24  # Finished jobs are deleted after this
     
     @property
     def perplexity_api_key(self) -> str:
@@ -54,6 +187,11 @@ class Settings:
             raise ValueError("PERPLEXITY_API_KEY must be set in environment variables")
         return api_key
     
+    @property
+    def llm_backend(self) -> str:
+        """Get the LLM backend name ("perplexity" or "fake") from environment variables."""
+        return os.getenv("LLM_BACKEND", "perplexity").lower()
+    
     @property
     def mongodb_connection_string(self) -> str:
         """Get MongoDB connection string from environment variables."""
@@ -0,0 +1,315 @@
+"""
+Asynchronous analysis jobs backed by MongoDB.
+
+`POST /analyze/jobs` stores a job document and returns immediately; a pool
+of worker tasks claims queued jobs with a time-limited lease, runs the
+analysis and stores the result. Because jobs and leases live in Mongo, a
+job whose worker died (or whose process restarted) is picked up again by
+any worker once its lease expires.
+"""
+import asyncio
+import contextvars
+import os
+import socket
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from pymongo import ReturnDocument
+
+from config import settings
+from logger import analysis_logger, db_logger
+from models import AccountType, AnalysisJobResponse, AnalysisJobStatus, ArticleRequest, Issue
+from resilience import LLMUnavailableError
+from scheduler import llm_scheduler
+
+
+FINISHED_STATUSES = (AnalysisJobStatus.COMPLETED.value, AnalysisJobStatus.FAILED.value)
+ACTIVE_STATUSES = (AnalysisJobStatus.QUEUED.value, AnalysisJobStatus.RUNNING.value)
+
+
+def job_to_response(job: Dict[str, Any]) -> AnalysisJobResponse:
+    """
+    Convert a job document into the client-facing response model.
+
+    Args:
+        job: Job document from MongoDB
+
+    Returns:
+        AnalysisJobResponse: Job status, plus issues or error when finished
+    """
+    return AnalysisJobResponse(
+        job_id=job["job_id"],
+        status=job["status"],
+        article_url=job["article"]["url"],
+        issues=[Issue(**issue) for issue in job["issues"]] if job.get("issues") is not None else None,
+        error=job.get("error"),
+        attempts=job.get("attempts", 0),
+        created_at=job["created_at"],
+        updated_at=job["updated_at"],
+    )
+
+
+class AnalysisJobQueue:
+    """MongoDB-backed job queue plus the worker tasks that drain it."""
+
+    def __init__(self):
+        self.collection = None
+        self._handler: Optional[Callable[[Dict[str, Any]], List[Issue]]] = None
+        self._workers: List[asyncio.Task] = []
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._finished: Dict[str, asyncio.Event] = {}
+        self._worker_prefix = f"{socket.gethostname()}-{os.getpid()}"
+
+    def initialize(self, collection) -> None:
+        """
+        Attach the jobs collection and make sure its indexes exist.
+
+        Args:
+            collection: MongoDB collection for analysis jobs
+        """
+        self.collection = collection
+        collection.create_index("job_id", unique=True)
+        collection.create_index([("status", 1), ("created_at", 1)])
+        collection.create_index([("user_email", 1), ("article.url", 1), ("status", 1)])
+        collection.create_index("expires_at", expireAfterSeconds=0)
+        db_logger.info("Analysis job queue initialized")
+
+    def create_job(
+        self,
+        article: ArticleRequest,
+        user_email: str,
+        account_type: AccountType = AccountType.FREE,
+        issues: Optional[List[Issue]] = None
+    ) -> Dict[str, Any]:
+        """
+        Create a job, or return the user's active job for the same article.
+
+        Args:
+            article: Article to analyze
+            user_email: Email of the requesting user
+            account_type: Account type of the requesting user
+            issues: Already known issues (e.g. a cache hit); the job is created completed
+
+        Returns:
+            Dict[str, Any]: Job document
+        """
+        if issues is None:
+            existing = self.collection.find_one({
+                "user_email": user_email,
+                "article.url": article.url,
+                "status": {"$in": list(ACTIVE_STATUSES)},
+            })
+            if existing:
+                return existing
+
+        now = datetime.now(timezone.utc)
+        job = {
+            "job_id": uuid.uuid4().hex,
+            "status": AnalysisJobStatus.QUEUED.value,
+            "user_email": user_email,
+            "account_type": AccountType(account_type).value,
+            "article": article.model_dump(),
+            "issues": None,
+            "error": None,
+            "attempts": 0,
+            "not_before": now,
+            "lease_owner": None,
+            "lease_expires_at": None,
+            "created_at": now,
+            "updated_at": now,
+        }
+        if issues is not None:
+            job.update({
+                "status": AnalysisJobStatus.COMPLETED.value,
+                "issues": [issue.model_dump() for issue in issues],
+                "expires_at": now + timedelta(hours=settings.JOB_RESULT_TTL_HOURS),
+            })
+        self.collection.insert_one(job)
+        return job
+
+    def get_job(self, job_id: str, user_email: str) -> Optional[Dict[str, Any]]:
+        """Get a job owned by a user, or None."""
+        return self.collection.find_one({"job_id": job_id, "user_email": user_email})
+
+    async def wait_for_job(self, job_id: str, user_email: str, timeout: float) -> Optional[Dict[str, Any]]:
+        """
+        Long-poll a job until it finishes or the timeout passes.
+
+        Jobs finished by this process wake the waiter immediately; jobs run by
+        other processes are noticed on the next poll.
+
+        Args:
+            job_id: Job identifier
+            user_email: Email of the job owner
+            timeout: Seconds to wait at most
+
+        Returns:
+            Optional[Dict[str, Any]]: Latest job document, or None if not found
+        """
+        loop = asyncio.get_running_loop()
+        expires_at = loop.time() + timeout
+        event = self._finished.setdefault(job_id, asyncio.Event())
+        try:
+            while True:
+                job = await asyncio.to_thread(self.get_job, job_id, user_email)
+                remaining = expires_at - loop.time()
+                if job is None or job["status"] in FINISHED_STATUSES or remaining <= 0:
+                    return job
+                try:
+                    await asyncio.wait_for(event.wait(), min(settings.JOB_POLL_INTERVAL, remaining))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._finished.pop(job_id, None)
+
+    def claim_next(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Lease the oldest runnable job: queued ones, or running ones whose lease expired.
+
+        Args:
+            worker_id: Identifier of the claiming worker
+
+        Returns:
+            Optional[Dict[str, Any]]: Claimed job document, or None if there is nothing to do
+        """
+        now = datetime.now(timezone.utc)
+        return self.collection.find_one_and_update(
+            {
+                "$or": [
+                    {"status": AnalysisJobStatus.QUEUED.value, "not_before": {"$lte": now}},
+                    {"status": AnalysisJobStatus.RUNNING.value, "lease_expires_at": {"$lt": now}},
+                ],
+                "attempts": {"$lt": settings.JOB_MAX_ATTEMPTS},
+            },
+            {
+                "$set": {
+                    "status": AnalysisJobStatus.RUNNING.value,
+                    "lease_owner": worker_id,
+                    "lease_expires_at": now + timedelta(seconds=settings.JOB_LEASE_SECONDS),
+                    "updated_at": now,
+                },
+                "$inc": {"attempts": 1},
+            },
+            sort=[("created_at", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    def fail_abandoned_jobs(self) -> int:
+        """Fail running jobs whose lease expired after their last allowed attempt."""
+        now = datetime.now(timezone.utc)
+        result = self.collection.update_many(
+            {
+                "status": AnalysisJobStatus.RUNNING.value,
+                "lease_expires_at": {"$lt": now},
+                "attempts": {"$gte": settings.JOB_MAX_ATTEMPTS},
+            },
+            {"$set": {
+                "status": AnalysisJobStatus.FAILED.value,
+                "error": "Analysis did not finish within its lease",
+                "updated_at": now,
+                "expires_at": now + timedelta(hours=settings.JOB_RESULT_TTL_HOURS),
+            }},
+        )
+        return result.modified_count
+
+    def complete_job(self, job: Dict[str, Any], worker_id: str, issues: List[Issue]) -> None:
+        """Store a job's result, unless another worker has taken over its lease."""
+        self._finish(job, worker_id, {
+            "status": AnalysisJobStatus.COMPLETED.value,
+            "issues": [issue.model_dump() for issue in issues],
+        })
+
+    def fail_job(self, job: Dict[str, Any], worker_id: str, error: Exception) -> None:
+        """Requeue a job after a transient LLM failure, or mark it failed."""
+        now = datetime.now(timezone.utc)
+        if isinstance(error, LLMUnavailableError) and job["attempts"] < settings.JOB_MAX_ATTEMPTS:
+            retry_after = error.retry_after or settings.LLM_SCHEDULER_RETRY_AFTER
+            self.collection.update_one(
+                {"job_id": job["job_id"], "lease_owner": worker_id},
+                {"$set": {
+                    "status": AnalysisJobStatus.QUEUED.value,
+                    "not_before": now + timedelta(seconds=retry_after),
+                    "lease_owner": None,
+                    "lease_expires_at": None,
+                    "updated_at": now,
+                }},
+            )
+            return
+        self._finish(job, worker_id, {"status": AnalysisJobStatus.FAILED.value, "error": str(error)})
+
+    def _finish(self, job: Dict[str, Any], worker_id: str, fields: Dict[str, Any]) -> None:
+        now = datetime.now(timezone.utc)
+        fields.update({
+            "lease_owner": None,
+            "lease_expires_at": None,
+            "updated_at": now,
+            "expires_at": now + timedelta(hours=settings.JOB_RESULT_TTL_HOURS),
+        })
+        self.collection.update_one({"job_id": job["job_id"], "lease_owner": worker_id}, {"$set": fields})
+
+    def start_workers(self, handler: Callable[[Dict[str, Any]], List[Issue]]) -> None:
+        """
+        Start the worker tasks on the running event loop.
+
+        Args:
+            handler: Blocking callable running the analysis for a job document
+                and returning its issues; it is executed on the queue's own thread pool
+        """
+        # Workers beyond the scheduler's slots would only hold a thread while queued for one
+        worker_count = max(1, min(settings.JOB_WORKER_COUNT, llm_scheduler.capacity))
+        self._handler = handler
+        # Handlers block for a whole analysis; keep them off the loop's default executor,
+        # which asyncio.to_thread shares with every other endpoint
+        self._executor = ThreadPoolExecutor(max_workers=worker_count, thread_name_prefix="analysis-job")
+        self._workers = [
+            asyncio.create_task(self._worker_loop(f"{self._worker_prefix}-{index}"))
+            for index in range(worker_count)
+        ]
+        analysis_logger.info(f"Started {len(self._workers)} analysis job workers")
+
+    async def stop_workers(self) -> None:
+        """Cancel the worker tasks; leased jobs are picked up again after their lease expires."""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+        if self._executor is not None:
+            # Handlers already running finish in the background; their jobs' leases cover them
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    async def _worker_loop(self, worker_id: str) -> None:
+        while True:
+            try:
+                job = await asyncio.to_thread(self.claim_next, worker_id)
+                if job is None:
+                    await asyncio.to_thread(self.fail_abandoned_jobs)
+                    await asyncio.sleep(settings.JOB_POLL_INTERVAL)
+                    continue
+                await self._run_job(job, worker_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                analysis_logger.error(f"Analysis job worker {worker_id} error", error=e)
+                await asyncio.sleep(settings.JOB_POLL_INTERVAL)
+
+    async def _run_job(self, job: Dict[str, Any], worker_id: str) -> None:
+        analysis_logger.info(f"Worker {worker_id} running job {job['job_id']} (attempt {job['attempts']})")
+        try:
+            context = contextvars.copy_context()
+            issues = await asyncio.get_running_loop().run_in_executor(
+                self._executor, context.run, self._handler, job
+            )
+            await asyncio.to_thread(self.complete_job, job, worker_id, issues)
+        except Exception as e:
+            analysis_logger.warning(f"Analysis job {job['job_id']} failed: {e}")
+            await asyncio.to_thread(self.fail_job, job, worker_id, e)
+        event = self._finished.get(job["job_id"])
+        if event is not None:
+            event.set()
+
+
+# Global job queue instance
+job_queue = AnalysisJobQueue()
@@ -0,0 +1,140 @@
+"""
+Request size limits.
+
+`BodySizeLimitMiddleware` rejects request bodies over the limit for their
+path (MAX_REQUEST_BODY_BYTES, or REQUEST_BODY_LIMITS overrides) while they
+are still being received: a too-large Content-Length is refused before any
+of the body is read, and chunked bodies are cut off as soon as they pass the
+limit, instead of being buffered and parsed in full.
+
+Within accepted bodies, `enforce_content_limit` caps article content at
+MAX_ARTICLE_CONTENT_CHARS, truncating or rejecting it according to
+OVERSIZED_CONTENT_POLICY, so oversized pages are never stored or sent to
+the LLM in full.
+
+Rejections and truncations are counted in `request_size_stats`.
+"""
+from typing import Any, Dict
+
+from fastapi import HTTPException
+from starlette.datastructures import Headers
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from config import settings
+from logger import app_logger
+from serialization import FastJSONResponse
+
+
+def body_limit_for(path: str) -> int:
+    """
+    Get the largest request body accepted on a path.
+
+    Args:
+        path: Request path
+
+    Returns:
+        int: Limit in bytes
+    """
+    return settings.REQUEST_BODY_LIMITS.get(path, settings.MAX_REQUEST_BODY_BYTES)
+
+
+class RequestSizeStats:
+    """Counts requests rejected or truncated for their size."""
+
+    def __init__(self):
+        self.rejected_by_content_length = 0
+        self.rejected_while_streaming = 0
+        self.truncated_content = 0
+        self.rejected_content = 0
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Get cumulative counts."""
+        return {
+            "max_body_bytes": settings.MAX_REQUEST_BODY_BYTES,
+            "max_content_chars": settings.MAX_ARTICLE_CONTENT_CHARS,
+            "oversized_content_policy": settings.OVERSIZED_CONTENT_POLICY,
+            "rejected_by_content_length": self.rejected_by_content_length,
+            "rejected_while_streaming": self.rejected_while_streaming,
+            "truncated_content": self.truncated_content,
+            "rejected_content": self.rejected_content,
+        }
+
+
+# Global request size counters
+request_size_stats = RequestSizeStats()
+
+
+def enforce_content_limit(content: str) -> str:
+    """
+    Apply MAX_ARTICLE_CONTENT_CHARS to article content.
+
+    Truncation cuts at the last paragraph or sentence break in the final
+    tenth of the allowed length, so the LLM never sees half a sentence.
+
+    Args:
+        content: Article content
+
+    Returns:
+        str: The content, truncated if it was too long and the policy is "truncate"
+
+    Raises:
+        ValueError: If the content is too long and the policy is "reject"
+    """
+    limit = settings.MAX_ARTICLE_CONTENT_CHARS
+    if len(content) <= limit:
+        return content
+
+    if settings.OVERSIZED_CONTENT_POLICY == "reject":
+        request_size_stats.rejected_content += 1
+        raise ValueError(f"Article content exceeds {limit} characters")
+
+    request_size_stats.truncated_content += 1
+    app_logger.warning(f"Truncating article content from {len(content)} to at most {limit} characters")
+    truncated = content[:limit]
+    floor = int(limit * 0.9)
+    for boundary in ("\n\n", "\n", ". "):
+        cut = truncated.rfind(boundary)
+        if cut >= floor:
+            return truncated[:cut + len(boundary)].rstrip()
+    return truncated
+
+
+class BodySizeLimitMiddleware:
+    """ASGI middleware rejecting oversized request bodies before they are buffered."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        limit = body_limit_for(scope["path"])
+        content_length = Headers(scope=scope).get("content-length")
+        if content_length is not None and content_length.isdigit() and int(content_length) > limit:
+            request_size_stats.rejected_by_content_length += 1
+            app_logger.warning(f"Rejected {content_length}-byte request to {scope['path']} (limit {limit})")
+            response = FastJSONResponse({"detail": self._detail(limit)}, status_code=413, headers={"Connection": "close"})
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive() -> Message:
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    request_size_stats.rejected_while_streaming += 1
+                    app_logger.warning(f"Rejected streamed request to {scope['path']} after {received} bytes (limit {limit})")
+                    # Raised from inside body parsing, so FastAPI answers with a 413
+                    raise HTTPException(status_code=413, detail=self._detail(limit), headers={"Connection": "close"})
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+    @staticmethod
+    def _detail(limit: int) -> str:
+        return f"Request body exceeds the {limit}-byte limit"
@@ -0,0 +1,259 @@
+"""
+LLM backend abstraction for fact-checking analyses.
+
+Analysis code talks to an `LLMBackend` instead of a concrete LangChain
+client. The Perplexity backend is used in production; the fake backend
+replays recorded (or synthesized) responses with configurable latency,
+token streaming and error injection so the server can be load tested
+without network access.
+"""
+import asyncio
+import json
+import os
+import random
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, List, Optional
+
+from config import settings
+from logger import analysis_logger
+
+
+TOKEN_PATTERN = re.compile(r"\S+\s*|\s+")
+ARTICLE_MARKER = "FULL ARTICLE TO ANALYZE:\n"
+
+
+class FakeLLMError(ConnectionError):
+    """Error injected by the fake backend to simulate upstream failures."""
+
+
+class LLMBackend(ABC):
+    """Interface every LLM backend implements."""
+
+    def __init__(self, model: str, max_tokens: int):
+        self.model = model
+        self.max_tokens = max_tokens
+
+    @property
+    @abstractmethod
+    def name(self) -> str:
+        """Short backend name used in logs and health checks."""
+
+    @abstractmethod
+    def invoke(self, prompt_text: str) -> str:
+        """
+        Run the prompt and return the complete response text (blocking).
+
+        Args:
+            prompt_text: Fully rendered prompt
+
+        Returns:
+            str: Raw response text
+        """
+
+    async def astream(self, prompt_text: str) -> AsyncIterator[str]:
+        """
+        Stream the response text chunk by chunk.
+
+        The default implementation runs invoke() in a thread and yields the
+        whole response as one chunk.
+
+        Args:
+            prompt_text: Fully rendered prompt
+
+        Yields:
+            str: Response text chunks
+        """
+        yield await asyncio.to_thread(self.invoke, prompt_text)
+
+
+class PerplexityBackend(LLMBackend):
+    """Backend calling the Perplexity API through LangChain's ChatPerplexity."""
+
+    def __init__(self, client: Any, model: str, max_tokens: int, record_path: Optional[str] = None):
+        """
+        Args:
+            client: Configured ChatPerplexity instance (see utils.setup_perplexity_llm)
+            model: Model name the client was built for
+            max_tokens: Completion token limit the client was built with
+            record_path: Optional JSON lines file every response is appended to
+        """
+        super().__init__(model, max_tokens)
+        self.client = client
+        self.record_path = record_path
+        self._record_lock = threading.Lock()
+
+    @property
+    def name(self) -> str:
+        return "perplexity"
+
+    def invoke(self, prompt_text: str) -> str:
+        response = self.client.invoke(prompt_text)
+        content = response.content if hasattr(response, "content") else str(response)
+        self._record(content)
+        return content
+
+    async def astream(self, prompt_text: str) -> AsyncIterator[str]:
+        chunks: List[str] = []
+        async for chunk in self.client.astream(prompt_text):
+            text = chunk.content if hasattr(chunk, "content") else str(chunk)
+            chunks.append(text)
+            yield text
+        self._record("".join(chunks))
+
+    def _record(self, content: str) -> None:
+        """Append a response to the recording file used to feed the fake backend."""
+        if not self.record_path:
+            return
+        try:
+            with self._record_lock, open(self.record_path, "a", encoding="utf-8") as record_file:
+                record_file.write(json.dumps({"model": self.model, "content": content}) + "\n")
+        except OSError as e:
+            analysis_logger.warning(f"Could not record LLM response to {self.record_path}: {e}")
+
+
+class FakeLLMBackend(LLMBackend):
+    """
+    Deterministic offline backend for load testing.
+
+    Responses come from a recording file (JSON lines or a JSON array of
+    strings / {"content": ...} objects) and are replayed round-robin. Without
+    recordings, a response flagging the first sentences of the article in
+    the prompt is synthesized, so anchoring and caching behave as in
+    production. Latency follows a log-normal distribution around a median,
+    and a fraction of calls can fail or hang.
+    """
+
+    def __init__(
+        self,
+        model: str,
+        max_tokens: int,
+        responses: Optional[List[str]] = None,
+        latency_median: float = settings.FAKE_LLM_LATENCY_MEDIAN,
+        latency_sigma: float = settings.FAKE_LLM_LATENCY_SIGMA,
+        error_rate: float = settings.FAKE_LLM_ERROR_RATE,
+        hang_rate: float = settings.FAKE_LLM_HANG_RATE,
+        tokens_per_second: float = settings.FAKE_LLM_TOKENS_PER_SECOND,
+        seed: Optional[int] = settings.FAKE_LLM_SEED
+    ):
+        super().__init__(model, max_tokens)
+        self.responses = responses or []
+        self.latency_median = latency_median
+        self.latency_sigma = latency_sigma
+        self.error_rate = error_rate
+        self.hang_rate = hang_rate
+        self.tokens_per_second = tokens_per_second
+        self._random = random.Random(seed)
+        self._next_response = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_environment(cls, model: str, max_tokens: int) -> "FakeLLMBackend":
+        """Build a fake backend configured by FAKE_LLM_* environment variables."""
+        def env_float(name: str, default: float) -> float:
+            value = os.getenv(name)
+            return float(value) if value not in (None, "") else default
+
+        seed = os.getenv("FAKE_LLM_SEED")
+        return cls(
+            model=model,
+            max_tokens=max_tokens,
+            responses=load_recorded_responses(os.getenv("FAKE_LLM_RESPONSES_PATH")),
+            latency_median=env_float("FAKE_LLM_LATENCY_MEDIAN", settings.FAKE_LLM_LATENCY_MEDIAN),
+            latency_sigma=env_float("FAKE_LLM_LATENCY_SIGMA", settings.FAKE_LLM_LATENCY_SIGMA),
+            error_rate=env_float("FAKE_LLM_ERROR_RATE", settings.FAKE_LLM_ERROR_RATE),
+            hang_rate=env_float("FAKE_LLM_HANG_RATE", settings.FAKE_LLM_HANG_RATE),
+            tokens_per_second=env_float("FAKE_LLM_TOKENS_PER_SECOND", settings.FAKE_LLM_TOKENS_PER_SECOND),
+            seed=int(seed) if seed else settings.FAKE_LLM_SEED,
+        )
+
+    @property
+    def name(self) -> str:
+        return "fake"
+
+    def invoke(self, prompt_text: str) -> str:
+        latency, failure = self._plan_call()
+        time.sleep(latency)
+        if failure:
+            raise FakeLLMError(failure)
+        return self._pick_response(prompt_text)
+
+    async def astream(self, prompt_text: str) -> AsyncIterator[str]:
+        latency, failure = self._plan_call()
+        response = self._pick_response(prompt_text)
+        tokens = TOKEN_PATTERN.findall(response)
+        token_delay = 1.0 / self.tokens_per_second if self.tokens_per_second > 0 else 0.0
+        # Time to first token takes whatever part of the latency token generation does not
+        await asyncio.sleep(max(0.0, latency - token_delay * len(tokens)))
+        if failure:
+            raise FakeLLMError(failure)
+        for token in tokens:
+            yield token
+            if token_delay:
+                await asyncio.sleep(token_delay)
+
+    def _plan_call(self):
+        """Draw this call's latency and injected failure, if any."""
+        with self._lock:
+            latency = self.latency_median * self._random.lognormvariate(0.0, self.latency_sigma)
+            roll = self._random.random()
+        if roll < self.hang_rate:
+            return settings.LLM_ATTEMPT_TIMEOUT * 2, "Injected upstream hang"
+        if roll < self.hang_rate + self.error_rate:
+            return latency * self._random.random(), "Injected upstream error"
+        return latency, None
+
+    def _pick_response(self, prompt_text: str) -> str:
+        if not self.responses:
+            return synthesize_response(prompt_text)
+        with self._lock:
+            response = self.responses[self._next_response % len(self.responses)]
+            self._next_response += 1
+        return response
+
+
+def load_recorded_responses(path: Optional[str]) -> List[str]:
+    """
+    Load recorded LLM responses for the fake backend.
+
+    Args:
+        path: JSON lines file or JSON array file; None for no recordings
+
+    Returns:
+        List[str]: Raw response texts
+    """
+    if not path:
+        return []
+    with open(path, encoding="utf-8") as recording_file:
+        raw = recording_file.read().strip()
+    if not raw:
+        return []
+    entries = json.loads(raw) if raw.startswith("[") else [json.loads(line) for line in raw.splitlines() if line.strip()]
+    return [entry["content"] if isinstance(entry, dict) else entry for entry in entries]
+
+
+def synthesize_response(prompt_text: str) -> str:
+    """
+    Build a plausible reasoning-model response for the article in a prompt.
+
+    Args:
+        prompt_text: Rendered analysis prompt
+
+    Returns:
+        str: Response with a <think> block followed by an issues JSON object
+    """
+    marker = prompt_text.rfind(ARTICLE_MARKER)
+    article = prompt_text[marker + len(ARTICLE_MARKER):] if marker != -1 else prompt_text
+    sentences = [sentence.strip() for sentence in re.split(r"(?<=[.!?])\s+", article) if len(sentence.strip()) > 40]
+    issues = [
+        {
+            "text": sentence,
+            "explanation": "Synthetic issue generated by the fake LLM backend.",
+            "confidence_score": 0.5,
+            "source_urls": ["https://example.com/fake-source"],
+        }
+        for sentence in sentences[:settings.FAKE_LLM_SYNTHETIC_ISSUES]
+    ]
+    return "<think>Synthetic reasoning.</think>\n" + json.dumps({"issues": issues})
@@ -1,68 +1,198 @@
 """
 Logging configuration for the News Fact-Checker API.
+
+Log calls never write to stdout themselves. A record is filtered (level,
+per-logger sampling) and tagged with the current request id in the calling
+thread, then put on a queue; a background listener thread formats it and
+writes it out. Messages take %-style arguments, which are only interpolated
+by the listener, and only for records that are actually emitted:
+
+    analysis_logger.debug("Content length: %d", len(content), url=url)
+
+Keyword arguments are kept as structured fields. Output is one JSON object
+per line (LOG_FORMAT="json") or the classic text format with the fields
+appended (LOG_FORMAT="text"). Every record carries the id of the request
+being handled (set by the tracing middleware), or "-" outside of a request.
 """
+import atexit
+import json
 import logging
+import queue
+import random
 import sys
-from typing import Optional
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict, Optional
+
+from config import settings
+
+
+# Id of the request being handled in the current context
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+
+
+def current_request_id() -> Optional[str]:
+    """Get the id of the request being handled, or None outside of a request."""
+    request_id = request_id_var.get()
+    return None if request_id == "-" else request_id
+
+
+class RequestIdFilter(logging.Filter):
+    """Adds the current request id to every record."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps a fraction of DEBUG and INFO records; warnings and errors are always kept."""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno >= logging.WARNING or random.random() < self.rate
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as single-line JSON objects, including their structured fields."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", "-"),
+        }
+        for key, value in (getattr(record, "fields", None) or {}).items():
+            entry.setdefault(key, value)
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Classic text format with the structured fields appended as key=value pairs."""
+
+    def __init__(self):
+        super().__init__('%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s] %(message)s')
+
+    def format(self, record: logging.LogRecord) -> str:
+        if not hasattr(record, "request_id"):
+            record.request_id = "-"
+        text = super().format(record)
+        fields = getattr(record, "fields", None)
+        if fields:
+            text += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        return text
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    Queue handler that leaves formatting to the listener thread.
+
+    The standard QueueHandler formats the message in the calling thread;
+    this one enqueues the record as-is and drops it if the queue is full.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def _create_output_handler() -> logging.Handler:
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(JsonFormatter() if settings.LOG_FORMAT == "json" else TextFormatter())
+    return handler
+
+
+# Shared queue, handler and background writer for every application logger
+log_queue: queue.Queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+queue_handler = DeferredQueueHandler(log_queue)
+queue_handler.addFilter(RequestIdFilter())
+log_listener = QueueListener(log_queue, _create_output_handler())
+log_listener.start()
+atexit.register(log_listener.stop)
 
 
 class Logger:
     """Custom logger for the application."""
-    
-    def __init__(self, name: str, level: str = "INFO"):
+
+    def __init__(self, name: str, level: Optional[str] = None):
         """
         Initialize logger with specified name and level.
-        
+
         Args:
             name: Logger name
-            level: Logging level (DEBUG, INFO, WARNING, ERROR, CRITICAL)
+            level: Logging level (DEBUG, INFO, WARNING, ERROR, CRITICAL); defaults to settings.LOG_LEVEL
         """
         self.logger = logging.getLogger(name)
-        self.logger.setLevel(getattr(logging, level.upper()))
-        
+        self.logger.setLevel(getattr(logging, (level or settings.LOG_LEVEL).upper()))
+
         # Avoid adding handlers multiple times
-        if not self.logger.handlers:
-            # Create console handler
-            console_handler = logging.StreamHandler(sys.stdout)
-            console_handler.setLevel(getattr(logging, level.upper()))
-            
-            # Create formatter
-            formatter = logging.Formatter(
-                '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-            )
-            console_handler.setFormatter(formatter)
-            
-            # Add handler to logger
-            self.logger.addHandler(console_handler)
-    
-    def debug(self, message: str, **kwargs):
+        if queue_handler not in self.logger.handlers:
+            sample_rate = settings.LOG_SAMPLE_RATES.get(name, 1.0)
+            if sample_rate < 1.0:
+                self.logger.addFilter(SamplingFilter(sample_rate))
+            self.logger.addHandler(queue_handler)
+
+    def _log(self, level: int, message: str, args: tuple, fields: Dict[str, Any], error: Optional[Exception] = None):
+        if not self.logger.isEnabledFor(level):
+            return
+        if error is not None:
+            if args:
+                # Keep the caller's format string intact; the error goes in a field instead
+                fields = dict(fields, error=str(error))
+            else:
+                # Messages without args are usually f-strings and may contain a literal "%" (e.g. in URLs)
+                message, args = message.replace("%", "%%") + ": %s", (error,)
+        self.logger.log(
+            level, message, *args,
+            exc_info=error,
+            extra={"fields": fields} if fields else None,
+            stacklevel=3
+        )
+
+    def debug(self, message: str, *args, **kwargs):
         """Log debug message."""
-        self.logger.debug(message, extra=kwargs)
-    
-    def info(self, message: str, **kwargs):
+        self._log(logging.DEBUG, message, args, kwargs)
+
+    def info(self, message: str, *args, **kwargs):
         """Log info message."""
-        self.logger.info(message, extra=kwargs)
-    
-    def warning(self, message: str, **kwargs):
+        self._log(logging.INFO, message, args, kwargs)
+
+    def warning(self, message: str, *args, **kwargs):
         """Log warning message."""
-        self.logger.warning(message, extra=kwargs)
-    
-    def error(self, message: str, error: Optional[Exception] = None, **kwargs):
+        self._log(logging.WARNING, message, args, kwargs)
+
+    def error(self, message: str, *args, error: Optional[Exception] = None, **kwargs):
         """Log error message with optional exception."""
-        if error:
-            self.logger.error(f"{message}: {str(error)}", extra=kwargs, exc_info=True)
-        else:
-            self.logger.error(message, extra=kwargs)
-    
-    def critical(self, message: str, error: Optional[Exception] = None, **kwargs):
+        self._log(logging.ERROR, message, args, kwargs, error)
+
+    def critical(self, message: str, *args, error: Optional[Exception] = None, **kwargs):
         """Log critical message with optional exception."""
-        if error:
-            self.logger.critical(f"{message}: {str(error)}", extra=kwargs, exc_info=True)
-        else:
-            self.logger.critical(message, extra=kwargs)
+        self._log(logging.CRITICAL, message, args, kwargs, error)
+
+
+def logging_snapshot() -> Dict[str, Any]:
+    """Get the log queue depth and the number of records dropped because it was full."""
+    return {"format": settings.LOG_FORMAT, "queued": log_queue.qsize(), "dropped": queue_handler.dropped}
 
 
 # Create application loggers
 app_logger = Logger("news_fact_checker")
 analysis_logger = Logger("analysis")
-db_logger = Logger("database") 
\ No newline at end of file
+db_logger = Logger("database")
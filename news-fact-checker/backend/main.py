@@ -1,18 +1,24 @@
-from fastapi import FastAPI, HTTPException, Depends, Request, Response
+from fastapi import FastAPI, HTTPException, Depends, Header, Query, Request, Response, WebSocket
 from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from contextlib import asynccontextmanager
+import asyncio
+import contextvars
+import json
 import time
 import traceback
 from datetime import datetime, timedelta
+from typing import Any, AsyncIterator, Dict, List, Optional
 from dotenv import load_dotenv
 import os
 
 from config import settings
-from logger import app_logger, analysis_logger
+from logger import app_logger, analysis_logger, logging_snapshot
 from models import (
-    Issue, ArticleRequest, AnalysisResponse, 
+    Issue, ArticleRequest, AnalysisResponse, AnalysisJobResponse, AnalysisProbeResponse,
+    BulkProbeRequest, BulkProbeResponse, BloomFilterDelta,
+    BatchAnalysisRequest, BatchAnalysisResult,
     UserCreate, UserLogin, User, Token, UsageInfo,
     SubscriptionRequest, SubscriptionResponse, WebhookEvent,
     SubscriptionConfirmation, SubscriptionConfirmationResponse,
@@ -20,20 +26,44 @@ from models import (
 )
 from utils import (
     setup_database_connection,
-    setup_perplexity_llm,
+    setup_llm_pool,
     create_analysis_prompt,
     get_cached_analysis,
+    get_cached_analyses,
+    get_precompressed_analysis,
+    find_cached_analysis,
+    find_cached_urls,
     save_analysis_to_cache,
+    lookup_prior_claims,
     perform_fact_check_analysis,
     perform_fact_check_analysis_stream,
     simulate_streaming_analysis
 )
 from auth import (
     hash_password, verify_password, create_access_token, get_current_user,
-    can_user_analyze_article, increment_user_usage, reset_monthly_usage_if_needed,
-    verify_paddle_webhook
+    can_user_analyze_article, has_user_analyzed_article, increment_user_usage, reset_monthly_usage_if_needed,
+    remaining_article_allowance, increment_user_usage_bulk,
+    verify_paddle_webhook, verify_admin_key
 )
 from paddle_integration import paddle_billing
+from routing import model_router
+from resilience import Deadline, llm_invoker, LLMUnavailableError
+from claim_cache import ClaimLookupResult, claim_cache
+from scheduler import SchedulerTicket, llm_scheduler
+from jobs import job_queue, job_to_response
+from analysis_runs import analysis_runs
+from streams import stream_manager
+from serialization import FastJSONResponse, ndjson_line
+from compression import CompressionMiddleware, negotiate_encoding
+from limits import BodySizeLimitMiddleware, request_size_stats
+from metrics import (
+    CONTENT_TYPE as METRICS_CONTENT_TYPE, CallbackMetric, metrics_registry,
+    analysis_stage_seconds, record_cache_lookup, register_mongo_listener, time_stage
+)
+from multiplex import MultiplexSession
+from bloom import cached_url_filter
+from tracing import TracingMiddleware, tracer
+from profiler import ProfilerBusyError, ProfilingMiddleware, sampling_profiler
 
 # Load environment variables
 load_dotenv()
@@ -47,6 +77,10 @@ async def lifespan(app: FastAPI):
     # Startup
     try:
         initialize_services()
+        if settings.ENABLE_JOB_WORKERS:
+            job_queue.start_workers(run_analysis_job)
+        cached_url_filter.start()
+        tracer.start()
         app_logger.info("Application startup completed successfully")
     except Exception as e:
         app_logger.critical("Failed to initialize services", error=e)
@@ -54,7 +88,11 @@ async def lifespan(app: FastAPI):
     
     yield
     
-    # Shutdown (if needed)
+    # Shutdown
+    await cached_url_filter.stop()
+    await job_queue.stop_workers()
+    await analysis_runs.drain()
+    tracer.stop()
     app_logger.info("Application shutdown")
 
 # Initialize FastAPI app
@@ -62,7 +100,8 @@ app = FastAPI(
     title=settings.APP_TITLE,
     description=settings.APP_DESCRIPTION,
     version=settings.VERSION,
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=FastJSONResponse
 )
 
 # Add CORS middleware
@@ -74,6 +113,48 @@ app.add_middleware(
     allow_headers=settings.ALLOWED_HEADERS,
 )
 
+# Reject oversized request bodies while they are still streaming in
+app.add_middleware(BodySizeLimitMiddleware)
+
+# Compress responses (and accept gzip request bodies) for clients that support it
+if settings.ENABLE_COMPRESSION:
+    app.add_middleware(CompressionMiddleware)
+
+# Profile requests tagged with an admin X-Profile header
+app.add_middleware(ProfilingMiddleware)
+
+# Give every request a request id and a root trace span (outermost, so it covers everything)
+app.add_middleware(TracingMiddleware)
+
+# Export state other components already track as scrape-time metrics
+metrics_registry.register(CallbackMetric(
+    "sse_streams_active", "Analysis streams currently open", "gauge",
+    lambda: [((), stream_manager.snapshot()["active"])],
+))
+metrics_registry.register(CallbackMetric(
+    "analysis_runs_active", "Background analysis runs currently in progress", "gauge",
+    lambda: [((), analysis_runs.active_count)],
+))
+metrics_registry.register(CallbackMetric(
+    "llm_scheduler_running", "LLM slots in use per priority class", "gauge",
+    lambda: [((name, ), stats["running"]) for name, stats in llm_scheduler.snapshot()["classes"].items()],
+    ["priority_class"],
+))
+metrics_registry.register(CallbackMetric(
+    "llm_scheduler_queued", "Requests waiting for an LLM slot per priority class", "gauge",
+    lambda: [((name, ), stats["queued"]) for name, stats in llm_scheduler.snapshot()["classes"].items()],
+    ["priority_class"],
+))
+metrics_registry.register(CallbackMetric(
+    "requests_rejected_for_size_total", "Requests rejected for an oversized body or article", "counter",
+    lambda: [
+        (("content_length", ), request_size_stats.rejected_by_content_length),
+        (("streaming", ), request_size_stats.rejected_while_streaming),
+        (("content", ), request_size_stats.rejected_content),
+    ],
+    ["reason"],
+))
+
 # Add middleware to set timeout headers
 @app.middleware("http")
 async def add_timeout_headers(request: Request, call_next):
@@ -94,8 +175,17 @@ def initialize_services():
     """Initialize database connection and LLM services."""
     global article_analyses_collection, users_collection, perplexity_llm, analysis_prompt
     
+    # Record Mongo command latency on every client created below
+    register_mongo_listener()
+    
     # Initialize database connection
     article_analyses_collection = setup_database_connection()
+    article_analyses_collection.create_index("url")
+    article_analyses_collection.create_index("canonical_url")
+    article_analyses_collection.create_index("content_hash")
+    claim_cache.initialize(article_analyses_collection.database[settings.CLAIM_COLLECTION_NAME])
+    job_queue.initialize(article_analyses_collection.database[settings.JOB_COLLECTION_NAME])
+    cached_url_filter.initialize(article_analyses_collection)
     
     # Initialize users collection
     from pymongo import MongoClient
@@ -112,10 +202,11 @@ def initialize_services():
     users_collection.create_index("paddle_subscription_id")
     users_collection.create_index("analyzed_articles")
     
-    # Initialize Perplexity LLM
-    perplexity_llm = setup_perplexity_llm()
+    # Initialize the pool of LLM backends used by model routing
+    setup_llm_pool()
+    perplexity_llm = model_router.default_client
     
-    # Create analysis prompt template
+    # Render the static analysis prompt prefix once at startup
     analysis_prompt = create_analysis_prompt()
     
     app_logger.info("All services initialized successfully")
@@ -139,12 +230,49 @@ def handle_cached_analysis(url: str) -> AnalysisResponse:
         return AnalysisResponse(issues=cached_issues)
     return None
 
-def process_new_analysis(article: ArticleRequest) -> AnalysisResponse:
+def handle_precompressed_analysis(url: str, accept_encoding: Optional[str]) -> Optional[Response]:
+    """
+    Return a cached analysis as its stored compressed payload, if the client accepts one.
+    
+    Args:
+        url: Article URL to check for cached analysis
+        accept_encoding: Value of the client's Accept-Encoding header
+        
+    Returns:
+        Optional[Response]: Precompressed JSON response, or None if there is no
+        cached analysis or the client does not accept compression
+    """
+    encoding = negotiate_encoding(accept_encoding) if settings.ENABLE_COMPRESSION else None
+    if encoding is None:
+        return None
+    payload = get_precompressed_analysis(article_analyses_collection, url, encoding)
+    if payload is None:
+        return None
+    analysis_logger.info(f"Found cached analysis for URL: {url} ({encoding} precompressed)")
+    return Response(
+        content=payload,
+        media_type="application/json",
+        headers={"Content-Encoding": encoding, "Vary": "Accept-Encoding"}
+    )
+
+def process_new_analysis(
+    article: ArticleRequest,
+    account_type: AccountType = AccountType.FREE,
+    user_id: Optional[str] = None,
+    claims: Optional[ClaimLookupResult] = None,
+    ticket: Optional[SchedulerTicket] = None,
+    deadline: Optional[Deadline] = None
+) -> AnalysisResponse:
     """
     Process a new article analysis using Perplexity LLM.
     
     Args:
         article: Article data to analyze
+        account_type: Account type of the requesting user, used for model routing and scheduling
+        user_id: Requesting user, used for the scheduler's per-user cap
+        claims: Prior claim verdicts, if already looked up
+        ticket: LLM slot already held by the caller (see run_new_analysis)
+        deadline: Request budget already started by the caller
         
     Returns:
         AnalysisResponse: Analysis results
@@ -152,32 +280,112 @@ def process_new_analysis(article: ArticleRequest) -> AnalysisResponse:
     Raises:
         Exception: If analysis fails
     """
-    analysis_logger.info(f"No cache found for URL: {article.url}. Starting new analysis with Perplexity Sonar Pro")
+    if claims is None:
+        with time_stage("analyze", "claims_lookup"):
+            claims = lookup_prior_claims(article.content)
+    if claims.can_short_circuit:
+        route = claims.short_circuit_route()
+    else:
+        route = model_router.select_route(article.content, account_type)
+    analysis_logger.info(f"No cache found for URL: {article.url}. Starting new analysis with {route.model} ({route.tier} tier: {route.reason})")
     
     # Perform fact-checking analysis
     analysis_result = perform_fact_check_analysis(
-        llm=perplexity_llm,
+        llm=model_router.client_for(route),
         prompt=analysis_prompt,
         title=article.title,
         url=article.url,
-        content=article.content
+        content=article.content,
+        route=route,
+        claims=claims,
+        user_id=user_id,
+        account_type=account_type,
+        ticket=ticket,
+        deadline=deadline
     )
     
     analysis_logger.info(f"Analysis completed for {article.url}, found {len(analysis_result.issues)} issues")
     
-    # Save to cache
-    save_success = save_analysis_to_cache(
-        collection=article_analyses_collection,
-        url=article.url,
-        title=article.title,
-        content=article.content,
-        issues=analysis_result.issues
+    # Save to cache; answers assembled from prior verdicts are not a full analysis of this article
+    if not claims.can_short_circuit:
+        with time_stage("analyze", "cache_write"):
+            save_success = save_analysis_to_cache(
+                collection=article_analyses_collection,
+                url=article.url,
+                title=article.title,
+                content=article.content,
+                issues=analysis_result.issues,
+                route=route
+            )
+        
+        if not save_success:
+            analysis_logger.warning(f"Failed to cache analysis for URL: {article.url}")
+    
+    return AnalysisResponse(issues=analysis_result.issues)
+
+async def run_new_analysis(
+    article: ArticleRequest,
+    account_type: AccountType = AccountType.FREE,
+    user_id: Optional[str] = None
+) -> AnalysisResponse:
+    """
+    Run process_new_analysis from the event loop.
+    
+    The LLM slot is awaited on the loop, so every waiting request is visible to
+    the weighted-fair scheduler and only requests holding a slot occupy a
+    thread; queued requests cannot exhaust the default executor that the
+    probe, Bloom filter and cache-write paths share.
+    
+    Args:
+        article: Article data to analyze
+        account_type: Account type of the requesting user
+        user_id: Requesting user
+        
+    Returns:
+        AnalysisResponse: Analysis results
+        
+    Raises:
+        LLMUnavailableError: If no slot was granted in time or the LLM failed
+    """
+    deadline = Deadline()
+    with time_stage("analyze", "claims_lookup"):
+        claims = await asyncio.to_thread(lookup_prior_claims, article.content)
+    if claims.can_short_circuit:
+        return await asyncio.to_thread(process_new_analysis, article, account_type, user_id, claims)
+    
+    ticket = await llm_scheduler.acquire(
+        user_id, account_type, timeout=min(settings.LLM_SCHEDULER_QUEUE_TIMEOUT, deadline.remaining())
+    )
+    context = contextvars.copy_context()
+    future = asyncio.get_running_loop().run_in_executor(
+        None, context.run, process_new_analysis, article, account_type, user_id, claims, ticket, deadline
     )
     
-    if not save_success:
-        analysis_logger.warning(f"Failed to cache analysis for URL: {article.url}")
+    def finished(done: asyncio.Future) -> None:
+        # Release when the thread is done, not when this request is (it may be cancelled mid-call)
+        llm_scheduler.release(ticket)
+        if not done.cancelled():
+            done.exception()  # Retrieved so an abandoned failure is not reported as unhandled
     
-    return AnalysisResponse(issues=analysis_result.issues)
+    future.add_done_callback(finished)
+    return await asyncio.shield(future)
+
+def run_analysis_job(job: Dict[str, Any]) -> List[Issue]:
+    """
+    Run the analysis for a job claimed by a job worker.
+    
+    Args:
+        job: Job document from the analysis job queue
+        
+    Returns:
+        List[Issue]: Identified issues
+    """
+    article = ArticleRequest(**job["article"])
+    cached_response = handle_cached_analysis(article.url)
+    if cached_response:
+        return cached_response.issues
+    response = process_new_analysis(article, AccountType(job["account_type"]), job["user_email"])
+    return response.issues
 
 
 
@@ -193,11 +401,79 @@ async def health_check():
         "status": "healthy",
         "database": "connected" if article_analyses_collection is not None else "disconnected",
         "llm": "configured" if perplexity_llm else "not configured",
+        "llm_backend": perplexity_llm.name if perplexity_llm else None,
+        "llm_scheduler": llm_scheduler.snapshot(),
+        "streams": stream_manager.snapshot(),
+        "tracing": tracer.snapshot(),
+        "logging": logging_snapshot(),
+        "request_limits": request_size_stats.snapshot(),
         "users_db": "connected" if users_collection is not None else "disconnected"
     }
 
 # Authentication endpoints
 
+def require_admin(x_admin_key: Optional[str] = Header(default=None)) -> None:
+    """Dependency rejecting requests without a valid X-Admin-Key header."""
+    if not verify_admin_key(x_admin_key):
+        raise HTTPException(status_code=401, detail="Invalid admin key")
+
+@app.get("/metrics")
+async def get_metrics(x_admin_key: Optional[str] = Header(default=None)):
+    """Prometheus metrics endpoint (scrapers send the X-Admin-Key header)."""
+    if not settings.ENABLE_METRICS:
+        raise HTTPException(status_code=404, detail="Metrics are disabled")
+    require_admin(x_admin_key)
+    return Response(content=metrics_registry.render(), media_type=METRICS_CONTENT_TYPE)
+
+@app.post("/admin/profile", dependencies=[Depends(require_admin)])
+async def profile_worker(
+    duration: float = Query(default=settings.PROFILER_DEFAULT_DURATION, gt=0, le=settings.PROFILER_MAX_DURATION, description="Seconds to sample for"),
+    interval: float = Query(default=settings.PROFILER_INTERVAL, ge=settings.PROFILER_MIN_INTERVAL, le=1.0, description="Seconds between samples"),
+    include_idle: bool = Query(default=False, description="Keep samples of threads blocked waiting")
+):
+    """
+    Sample this worker's threads for a while and return folded stacks for a flamegraph.
+    
+    Args:
+        duration: Seconds to sample for
+        interval: Seconds between samples
+        include_idle: Keep samples of threads blocked waiting
+        
+    Returns:
+        Response: Folded stacks as text/plain
+    """
+    try:
+        profile = await sampling_profiler.profile_for(duration, interval=interval, include_idle=include_idle)
+    except ProfilerBusyError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return Response(
+        content=profile.folded(),
+        media_type="text/plain",
+        headers={"X-Profile-Id": profile.profile_id, "X-Profile-Samples": str(profile.samples)}
+    )
+
+@app.get("/admin/profile/{profile_id}", dependencies=[Depends(require_admin)])
+async def get_profile(profile_id: str):
+    """
+    Get the folded stacks of a profiled request (see the X-Profile request header).
+    
+    Args:
+        profile_id: Value of the profiled response's X-Profile-Id header
+        
+    Returns:
+        Response: Folded stacks as text/plain
+    """
+    profile = sampling_profiler.get(profile_id)
+    if profile is None:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if not profile.finished:
+        raise HTTPException(status_code=409, detail="Profile is still running")
+    return Response(
+        content=profile.folded(),
+        media_type="text/plain",
+        headers={"X-Profile-Id": profile.profile_id, "X-Profile-Samples": str(profile.samples)}
+    )
+
 @app.post("/auth/register", response_model=Token)
 async def register_user(user_data: UserCreate):
     """Register a new user account."""
@@ -430,10 +706,10 @@ async def cancel_subscription(
 @app.post("/webhooks/paddle")
 async def handle_paddle_webhook(request: Request):
     """Handle Paddle webhook events."""
+    # Read the body outside the try block so an oversized body keeps its 413 from BodySizeLimitMiddleware
+    body = await request.body()
+    
     try:
-        # Get request body
-        body = await request.body()
-        
         # Get signature header
         signature = request.headers.get("paddle-signature", "")
         
@@ -565,6 +841,7 @@ async def confirm_subscription(confirmation: SubscriptionConfirmation):
 @app.post("/analyze", response_model=AnalysisResponse)
 async def analyze_article(
     article: ArticleRequest,
+    accept_encoding: Optional[str] = Header(default=None),
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ):
     """
@@ -573,6 +850,7 @@ async def analyze_article(
     
     Args:
         article: Article data including title, content, and URL
+        accept_encoding: Client's Accept-Encoding, used to serve precompressed cached results
         credentials: JWT token for authentication
         
     Returns:
@@ -585,10 +863,12 @@ async def analyze_article(
     
     try:
         # Get current user
-        user = await get_current_user(credentials, users_collection)
+        with time_stage("analyze", "auth"):
+            user = await get_current_user(credentials, users_collection)
         
         # Get user document for usage checking
-        user_doc = users_collection.find_one({"email": user.email})
+        with time_stage("analyze", "user_lookup"):
+            user_doc = users_collection.find_one({"email": user.email})
         if not user_doc:
             raise HTTPException(status_code=404, detail="User not found")
         
@@ -602,23 +882,30 @@ async def analyze_article(
         analysis_logger.info(f"Starting analysis for URL: {article.url} (User: {user.email})")
         
         # Log request for debugging timeout issues
-        analysis_logger.debug(f"Request details - Title length: {len(article.title) if article.title else 0}, Content length: {len(article.content) if article.content else 0}")
+        analysis_logger.debug(
+            "Request details - Title length: %d, Content length: %d",
+            len(article.title or ""), len(article.content or "")
+        )
         
-        # Check for cached analysis first
-        cached_response = handle_cached_analysis(article.url)
+        # Check for cached analysis first, precompressed when the client accepts it
+        with time_stage("analyze", "cache_read"):
+            cached_response = handle_precompressed_analysis(article.url, accept_encoding) or handle_cached_analysis(article.url)
+        record_cache_lookup("analyze", hit=bool(cached_response))
         if cached_response:
             # Increment usage only if this is a new article for the user
-            increment_user_usage(users_collection, user.email, article.url)
+            with time_stage("analyze", "usage_update"):
+                increment_user_usage(users_collection, user.email, article.url)
             elapsed_time = time.time() - start_time
             analysis_logger.info(f"Returned cached analysis in {elapsed_time:.2f} seconds (User: {user.email})")
             return cached_response
         
-        # Process new analysis
-        response = process_new_analysis(article)
+        # Wait for an LLM slot on the loop, then run the analysis in a thread within the request deadline
+        response = await run_new_analysis(article, user.account_type, user.email)
         
         
         # Increment user usage for new article
-        increment_user_usage(users_collection, user.email, article.url)
+        with time_stage("analyze", "usage_update"):
+            increment_user_usage(users_collection, user.email, article.url)
         
         elapsed_time = time.time() - start_time
         analysis_logger.info(f"Completed new analysis in {elapsed_time:.2f} seconds")
@@ -627,41 +914,348 @@ async def analyze_article(
     
     except HTTPException:
         raise
+    except LLMUnavailableError as e:
+        elapsed_time = time.time() - start_time
+        analysis_logger.warning(f"Analysis unavailable after {elapsed_time:.2f} seconds: {e}")
+        raise HTTPException(
+            status_code=503,
+            detail="Analysis service temporarily unavailable. Please try again shortly.",
+            headers={"Retry-After": str(e.retry_after or int(settings.LLM_BREAKER_RESET_TIMEOUT))}
+        )
     except Exception as e:
         elapsed_time = time.time() - start_time
         analysis_logger.error(f"Analysis failed after {elapsed_time:.2f} seconds", error=e)
         raise HTTPException(status_code=500, detail=str(e))
+    finally:
+        analysis_stage_seconds.labels("analyze", "total").observe(time.time() - start_time)
 
 
-@app.post("/analyze/stream")
-async def analyze_article_stream(
-    article: ArticleRequest,
+@app.get("/analyze/probe", response_model=AnalysisProbeResponse)
+async def probe_cached_analysis(
+    url: Optional[str] = Query(default=None, max_length=2048, description="Article URL, matched exactly or by canonical form"),
+    content_hash: Optional[str] = Query(
+        default=None,
+        pattern="^[0-9a-f]{64}$",
+        description="SHA-256 hex of the article content with whitespace runs collapsed to single spaces and trimmed"
+    ),
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ):
     """
-    Analyze a news article for fact-checking issues with streaming response.
-    Returns Server-Sent Events (SSE) for real-time updates.
+    Look up a cached analysis without uploading the article.
+    Clients call this first and only POST the full content to /analyze on a miss.
+    A hit counts toward usage exactly like a cached /analyze response.
     
     Args:
-        article: Article data including title, content, and URL
+        url: Article URL
+        content_hash: Hash of the article content
         credentials: JWT token for authentication
         
     Returns:
-        StreamingResponse: SSE stream with analysis progress and results
+        AnalysisProbeResponse: Cached issues on a hit, or cached=False
         
     Raises:
-        HTTPException: If analysis fails or usage limit exceeded
+        HTTPException: If neither url nor content_hash is given, or usage limit exceeded
     """
-    start_time = time.time()
+    if not url and not content_hash:
+        raise HTTPException(status_code=422, detail="Provide url, content_hash or both")
     
-    try:
-        # Get current user
-        user = await get_current_user(credentials, users_collection)
+    user = await get_current_user(credentials, users_collection)
+    user_doc = users_collection.find_one({"email": user.email})
+    if not user_doc:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    cached = await asyncio.to_thread(find_cached_analysis, article_analyses_collection, url, content_hash)
+    if cached is None:
+        return AnalysisProbeResponse(cached=False)
+    
+    article_url, issues = cached
+    usage_url = url or article_url
+    if not has_user_analyzed_article(user_doc, usage_url) and not can_user_analyze_article(user_doc):
+        raise HTTPException(
+            status_code=403, 
+            detail="Monthly analysis limit reached. Please upgrade to premium for unlimited access."
+        )
+    increment_user_usage(users_collection, user.email, usage_url)
+    analysis_logger.info(f"Cache probe hit for {usage_url} (User: {user.email})")
+    return AnalysisProbeResponse(cached=True, article_url=article_url, issues=issues)
+
+
+@app.post("/analyze/probe/bulk", response_model=BulkProbeResponse)
+async def probe_cached_analyses_bulk(
+    probe: BulkProbeRequest,
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
+    """
+    Check which of many article URLs have a cached analysis, e.g. for badges on index pages.
+    Only presence is reported, so no usage is counted.
+    
+    Args:
+        probe: Article URLs to check
+        credentials: JWT token for authentication
         
-        # Get user document for usage checking
+    Returns:
+        BulkProbeResponse: The requested URLs that have a cached analysis
+        
+    Raises:
+        HTTPException: If too many URLs are given
+    """
+    await get_current_user(credentials, users_collection)
+    
+    urls = list(dict.fromkeys(probe.urls))
+    if len(urls) > settings.MAX_BULK_PROBE_URLS:
+        raise HTTPException(
+            status_code=422,
+            detail=f"A bulk probe may contain at most {settings.MAX_BULK_PROBE_URLS} URLs"
+        )
+    
+    cached = await asyncio.to_thread(find_cached_urls, article_analyses_collection, urls)
+    return BulkProbeResponse(cached=cached)
+
+
+@app.get("/analyze/bloom")
+async def download_cached_url_filter(
+    if_none_match: Optional[str] = Header(default=None),
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
+    """
+    Download the Bloom filter of cached canonical URLs (see bloom.py for the hashing scheme).
+    
+    Args:
+        if_none_match: ETag of the filter the client already has
+        credentials: JWT token for authentication
+        
+    Returns:
+        Response: Raw filter bits, with the version and parameters in headers,
+        or 304 if the client's copy is current
+        
+    Raises:
+        HTTPException: If the filter has not been built yet
+    """
+    await get_current_user(credentials, users_collection)
+    
+    bloom, version = cached_url_filter.filter, cached_url_filter.version
+    if bloom is None:
+        raise HTTPException(
+            status_code=503,
+            detail="Cached URL filter is being built. Please try again shortly.",
+            headers={"Retry-After": str(settings.STREAM_RETRY_AFTER)}
+        )
+    
+    headers = {
+        "ETag": f'"{version}"',
+        "X-Bloom-Version": version,
+        "X-Bloom-Bits": str(bloom.num_bits),
+        "X-Bloom-Hashes": str(bloom.num_hashes),
+    }
+    if if_none_match and if_none_match.strip('"') == version:
+        return Response(status_code=304, headers=headers)
+    return Response(content=bytes(bloom.bits), media_type="application/octet-stream", headers=headers)
+
+
+@app.get("/analyze/bloom/delta", response_model=BloomFilterDelta)
+async def get_cached_url_filter_delta(
+    since: str = Query(description="Version of the filter the client holds"),
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
+    """
+    Get the bits to set to bring a downloaded Bloom filter up to date.
+    
+    Args:
+        since: Version of the filter the client holds
+        credentials: JWT token for authentication
+        
+    Returns:
+        BloomFilterDelta: Current version and the bit positions to set
+        
+    Raises:
+        HTTPException: 410 if the client must download the full filter again
+    """
+    await get_current_user(credentials, users_collection)
+    
+    delta = await asyncio.to_thread(cached_url_filter.delta, since)
+    if delta is None:
+        raise HTTPException(status_code=410, detail="Filter version is too old or was resized; download /analyze/bloom again")
+    version, set_bits = delta
+    return BloomFilterDelta(version=version, set_bits=set_bits)
+
+
+@app.post("/analyze/batch")
+async def analyze_articles_batch(
+    batch: BatchAnalysisRequest,
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
+    """
+    Analyze several articles in one request.
+    Results are streamed as NDJSON (one BatchAnalysisResult per line) as each article finishes:
+    cached articles first, then new analyses in completion order.
+    
+    Args:
+        batch: Articles to analyze
+        credentials: JWT token for authentication
+        
+    Returns:
+        StreamingResponse: NDJSON stream of per-article results
+        
+    Raises:
+        HTTPException: If the batch is too large or the usage limit is exceeded
+    """
+    user = await get_current_user(credentials, users_collection)
+    
+    if len(batch.articles) > settings.MAX_BATCH_ARTICLES:
+        raise HTTPException(
+            status_code=422,
+            detail=f"A batch may contain at most {settings.MAX_BATCH_ARTICLES} articles"
+        )
+    
+    user_doc = users_collection.find_one({"email": user.email})
+    if not user_doc:
+        raise HTTPException(status_code=404, detail="User not found")
+    user_doc = reset_monthly_usage_if_needed(user_doc)
+    
+    # Keep the first occurrence of each URL
+    articles: Dict[str, Any] = {}
+    for index, article in enumerate(batch.articles):
+        articles.setdefault(article.url, (index, article))
+    
+    # New articles beyond a free user's remaining allowance are rejected individually
+    allowance = remaining_article_allowance(user_doc)
+    already_analyzed = set(user_doc.get("analyzed_articles", []))
+    accepted, rejected = [], []
+    for index, article in articles.values():
+        if allowance is None or article.url in already_analyzed:
+            accepted.append((index, article))
+        elif allowance > 0:
+            allowance -= 1
+            accepted.append((index, article))
+        else:
+            rejected.append((index, article))
+    if not accepted:
+        raise HTTPException(
+            status_code=403, 
+            detail="Monthly analysis limit reached. Please upgrade to premium for unlimited access."
+        )
+    
+    with time_stage("batch", "cache_read"):
+        cached_analyses = get_cached_analyses(article_analyses_collection, [article.url for _, article in accepted])
+    record_cache_lookup("batch", hit=True, count=len(cached_analyses))
+    record_cache_lookup("batch", hit=False, count=len(accepted) - len(cached_analyses))
+    analysis_logger.info(
+        f"Starting batch analysis of {len(accepted)} articles ({len(cached_analyses)} cached) (User: {user.email})"
+    )
+    
+    # Misses run concurrently, but no more at once than the scheduler lets one user hold; items
+    # wait for their LLM slot on the loop, so concurrent batches cannot fill the shared thread pool
+    concurrency = asyncio.Semaphore(llm_scheduler.per_user_limit)
+    
+    async def analyze_one(index: int, article: ArticleRequest) -> BatchAnalysisResult:
+        async with concurrency:
+            try:
+                response = await run_new_analysis(article, user.account_type, user.email)
+                return BatchAnalysisResult(index=index, url=article.url, status="completed", issues=response.issues)
+            except LLMUnavailableError as e:
+                analysis_logger.warning(f"Batch analysis unavailable for {article.url}: {e}")
+                return BatchAnalysisResult(
+                    index=index, url=article.url, status="failed",
+                    error="Analysis service temporarily unavailable. Please try again shortly."
+                )
+            except Exception as e:
+                analysis_logger.error(f"Batch analysis failed for {article.url}", error=e)
+                return BatchAnalysisResult(index=index, url=article.url, status="failed", error=str(e))
+    
+    async def stream_batch_results():
+        analyzed_urls = []
+        tasks = []
+        try:
+            for index, article in rejected:
+                yield ndjson_line(BatchAnalysisResult(
+                    index=index, url=article.url, status="failed",
+                    error="Monthly analysis limit reached. Please upgrade to premium for unlimited access."
+                ))
+            
+            for index, article in accepted:
+                if article.url in cached_analyses:
+                    analyzed_urls.append(article.url)
+                    yield ndjson_line(BatchAnalysisResult(
+                        index=index, url=article.url, status="completed", cached=True,
+                        issues=cached_analyses[article.url]
+                    ))
+            
+            tasks = [
+                asyncio.create_task(analyze_one(index, article))
+                for index, article in accepted
+                if article.url not in cached_analyses
+            ]
+            for next_result in asyncio.as_completed(tasks):
+                result = await next_result
+                if result.status == "completed":
+                    analyzed_urls.append(result.url)
+                yield ndjson_line(result)
+        finally:
+            for task in tasks:
+                task.cancel()
+            # Account usage for everything delivered with a single write
+            if analyzed_urls:
+                await asyncio.to_thread(increment_user_usage_bulk, users_collection, user.email, analyzed_urls)
+    
+    return StreamingResponse(
+        stream_batch_results(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache"}
+    )
+
+
+SSE_RESPONSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "Connection": "keep-alive",
+    "Access-Control-Allow-Origin": "*",
+    "Access-Control-Allow-Headers": "Cache-Control"
+}
+
+
+async def open_analysis_stream(
+    article: ArticleRequest,
+    user: User,
+    replay: Optional[str] = None,
+    last_event_id: Optional[str] = None
+) -> AsyncIterator[str]:
+    """
+    Start (or join, or resume) the streaming analysis of an article.
+    Shared by the SSE endpoint and the WebSocket channel.
+    
+    Args:
+        article: Article data including title, content, and URL
+        user: Authenticated user
+        replay: Delivery mode for cached results ("instant", "coalesced" or "paced")
+        last_event_id: Id of the last event received, when reconnecting to resume a stream
+        
+    Returns:
+        AsyncIterator[str]: SSE-formatted events, managed by stream_manager
+        
+    Raises:
+        HTTPException: If the stream limit or usage limit is reached, or the LLM is unavailable
+    """
+    # Get user document for usage checking
+    with time_stage("analyze_stream", "user_lookup"):
         user_doc = users_collection.find_one({"email": user.email})
-        if not user_doc:
-            raise HTTPException(status_code=404, detail="User not found")
+    if not user_doc:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    # Reserve a stream slot before any usage is counted
+    lease = stream_manager.admit()
+    if lease is None:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many concurrent analysis streams. Please try again shortly.",
+            headers={"Retry-After": str(settings.STREAM_RETRY_AFTER)}
+        )
+    
+    try:
+        # A reconnecting client resumes after the last event it received, without new work or usage
+        resumed = analysis_runs.resume(last_event_id, article.url)
+        if resumed is not None:
+            run, last_seq = resumed
+            analysis_logger.info(f"Resuming stream for {article.url} after event {last_event_id} (User: {user.email})")
+            return stream_manager.stream(lease, run.subscribe(after_seq=last_seq))
         
         # Check if user can analyze another article
         if not can_user_analyze_article(user_doc):
@@ -673,67 +1267,101 @@ async def analyze_article_stream(
         analysis_logger.info(f"Starting streaming analysis for URL: {article.url} (User: {user.email})")
         
         # Check for cached analysis first
-        cached_issues = get_cached_analysis(article_analyses_collection, article.url)
+        with time_stage("analyze_stream", "cache_read"):
+            cached_issues = get_cached_analysis(article_analyses_collection, article.url)
+        record_cache_lookup("analyze_stream", hit=bool(cached_issues))
         if cached_issues and settings.ENABLE_STREAMING:
             analysis_logger.info(f"Found cached analysis for streaming URL: {article.url}")
             
             # Increment usage for cached result
             increment_user_usage(users_collection, user.email, article.url)
             
-            # Stream the cached results for better UX
-            async def stream_cached_results():
-                async for event in simulate_streaming_analysis(cached_issues, article.url):
-                    yield event
-            
-            return StreamingResponse(
-                stream_cached_results(),
-                media_type="text/event-stream",
-                headers={
-                    "Cache-Control": "no-cache",
-                    "Connection": "keep-alive",
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Headers": "Cache-Control"
-                }
-            )
+            # Replay the cached results without delays; any pacing is up to the client
+            return stream_manager.stream(lease, simulate_streaming_analysis(cached_issues, article.url, replay))
         
-        # Perform new streaming analysis
-        async def stream_new_analysis():
-            try:
-                # Use streaming analysis function
-                async for event in perform_fact_check_analysis_stream(
-                    llm=perplexity_llm,
+        # Join an analysis of this URL that is already running, or start a new one
+        run = analysis_runs.get(article.url)
+        if run is None:
+            with time_stage("analyze_stream", "claims_lookup"):
+                claims = lookup_prior_claims(article.content)
+            if claims.can_short_circuit:
+                route = claims.short_circuit_route()
+            else:
+                # Fail fast while the LLM upstream is down instead of queueing a doomed stream
+                if llm_invoker.breaker.is_open:
+                    raise HTTPException(
+                        status_code=503,
+                        detail="Analysis service temporarily unavailable. Please try again shortly.",
+                        headers={"Retry-After": str(llm_invoker.breaker.retry_after)}
+                    )
+                route = model_router.select_route(article.content, user.account_type)
+            analysis_logger.info(f"Routing streaming analysis for {article.url} to {route.model} ({route.tier} tier: {route.reason})")
+            
+            # The analysis runs to completion in the background (and is cached) even if the
+            # client disconnects; the stream only subscribes to its events
+            run = analysis_runs.start(
+                article.url,
+                lambda: perform_fact_check_analysis_stream(
+                    llm=model_router.client_for(route),
                     prompt=analysis_prompt,
                     title=article.title,
                     url=article.url,
                     content=article.content,
-                    collection=article_analyses_collection
-                ):
-                    yield event
-                
-            except Exception as e:
-                analysis_logger.error(f"Streaming analysis error: {e}")
-                import json
-                from models import AnalysisError
-                error_event = AnalysisError(
-                    error_code="STREAMING_ERROR",
-                    error_details=str(e),
-                    message="Streaming analysis failed"
+                    collection=article_analyses_collection,
+                    route=route,
+                    claims=claims,
+                    user_id=user.email,
+                    account_type=user.account_type
                 )
-                yield f"data: {json.dumps(error_event.model_dump())}\n\n"
+            )
         
         # Increment user usage for new analysis (we do this upfront for streaming)
         increment_user_usage(users_collection, user.email, article.url)
         
-        return StreamingResponse(
-            stream_new_analysis(),
-            media_type="text/event-stream",
-            headers={
-                "Cache-Control": "no-cache",
-                "Connection": "keep-alive",
-                "Access-Control-Allow-Origin": "*",
-                "Access-Control-Allow-Headers": "Cache-Control"
-            }
-        )
+        return stream_manager.stream(lease, run.subscribe())
+    
+    except BaseException:
+        lease.release()
+        raise
+
+
+@app.post("/analyze/stream")
+async def analyze_article_stream(
+    article: ArticleRequest,
+    replay: Optional[str] = Query(
+        default=None,
+        pattern="^(instant|coalesced|paced)$",
+        description="How cached results are delivered (defaults to settings.CACHED_REPLAY_MODE)"
+    ),
+    last_event_id: Optional[str] = Header(default=None, alias="Last-Event-ID"),
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
+    """
+    Analyze a news article for fact-checking issues with streaming response.
+    Returns Server-Sent Events (SSE) for real-time updates.
+    
+    Args:
+        article: Article data including title, content, and URL
+        replay: Delivery mode for cached results ("instant", "coalesced" or "paced")
+        last_event_id: Id of the last event received, when reconnecting to resume a stream
+        credentials: JWT token for authentication
+        
+    Returns:
+        StreamingResponse: SSE stream with analysis progress and results
+        
+    Raises:
+        HTTPException: If analysis fails or usage limit exceeded
+    """
+    start_time = time.time()
+    
+    try:
+        # Get current user
+        with time_stage("analyze_stream", "auth"):
+            user = await get_current_user(credentials, users_collection)
+        
+        with time_stage("analyze_stream", "setup"):
+            events = await open_analysis_stream(article, user, replay, last_event_id)
+        return StreamingResponse(events, media_type="text/event-stream", headers=SSE_RESPONSE_HEADERS)
     
     except HTTPException:
         raise
@@ -742,6 +1370,109 @@ async def analyze_article_stream(
         analysis_logger.error(f"Streaming analysis setup failed after {elapsed_time:.2f} seconds", error=e)
         raise HTTPException(status_code=500, detail=str(e))
 
+
+@app.websocket("/ws/analyze")
+async def analyze_websocket(websocket: WebSocket):
+    """
+    Multiplex many streaming analyses over one authenticated WebSocket.
+    See multiplex.py for the message protocol; events are the same as on /analyze/stream.
+    
+    Args:
+        websocket: Incoming WebSocket connection
+    """
+    await websocket.accept()
+    
+    async def authenticate(token: str) -> User:
+        credentials = HTTPAuthorizationCredentials(scheme="Bearer", credentials=token)
+        return await get_current_user(credentials, users_collection)
+    
+    await MultiplexSession(websocket, authenticate, open_analysis_stream).run()
+
+
+@app.post("/analyze/jobs", response_model=AnalysisJobResponse, status_code=202)
+async def create_analysis_job(
+    article: ArticleRequest,
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
+    """
+    Queue an article analysis and return a job id immediately.
+    Poll GET /analyze/jobs/{job_id} (optionally with ?wait=N to long-poll) for the result.
+    
+    Args:
+        article: Article data including title, content, and URL
+        credentials: JWT token for authentication
+        
+    Returns:
+        AnalysisJobResponse: Created job (already completed for cached articles)
+        
+    Raises:
+        HTTPException: If the usage limit is exceeded or the job cannot be created
+    """
+    try:
+        user = await get_current_user(credentials, users_collection)
+        
+        user_doc = users_collection.find_one({"email": user.email})
+        if not user_doc:
+            raise HTTPException(status_code=404, detail="User not found")
+        
+        if not can_user_analyze_article(user_doc):
+            raise HTTPException(
+                status_code=403, 
+                detail="Monthly analysis limit reached. Please upgrade to premium for unlimited access."
+            )
+        
+        cached_response = handle_cached_analysis(article.url)
+        job = job_queue.create_job(
+            article,
+            user.email,
+            user.account_type,
+            issues=cached_response.issues if cached_response else None
+        )
+        analysis_logger.info(f"Created analysis job {job['job_id']} for URL: {article.url} (User: {user.email})")
+        
+        # Usage is counted when the job is accepted, as for streaming analyses
+        increment_user_usage(users_collection, user.email, article.url)
+        
+        return job_to_response(job)
+    
+    except HTTPException:
+        raise
+    except Exception as e:
+        analysis_logger.error("Failed to create analysis job", error=e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/analyze/jobs/{job_id}", response_model=AnalysisJobResponse)
+async def get_analysis_job(
+    job_id: str,
+    wait: int = Query(default=0, ge=0, le=settings.JOB_MAX_WAIT_SECONDS, description="Seconds to wait for the job to finish"),
+    credentials: HTTPAuthorizationCredentials = Depends(security)
+):
+    """
+    Get the status of an analysis job, optionally long-polling until it finishes.
+    
+    Args:
+        job_id: Job identifier returned by POST /analyze/jobs
+        wait: Seconds to hold the request open while the job is still running
+        credentials: JWT token for authentication
+        
+    Returns:
+        AnalysisJobResponse: Job status, with issues once completed
+        
+    Raises:
+        HTTPException: If the job does not exist for this user
+    """
+    user = await get_current_user(credentials, users_collection)
+    
+    if wait:
+        job = await job_queue.wait_for_job(job_id, user.email, wait)
+    else:
+        job = job_queue.get_job(job_id, user.email)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Analysis job not found")
+    
+    return job_to_response(job)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(
@@ -0,0 +1,333 @@
+"""
+In-process metrics exported in the Prometheus text format at `/metrics`.
+
+Recording is a dictionary lookup, a bisect and a few additions under a
+per-series lock, so the hot paths can be instrumented freely. Values that
+other components already track (active streams, scheduler queues, request
+size rejections) are read through callbacks at scrape time instead of being
+duplicated.
+
+Analysis stages are recorded in `analysis_stage_seconds`, labelled with the
+pipeline ("analyze" for /analyze and everything else that runs the blocking
+pipeline, "analyze_stream" for SSE and WebSocket streams) and the stage.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from pymongo import monitoring
+
+from config import settings
+
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    """Base class holding one metric family and its labelled series."""
+
+    metric_type = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._series: Dict[LabelValues, object] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values: str, **kwargs: str):
+        """Get the series for a set of label values (positional or by name)."""
+        key = tuple(values) if values else tuple(kwargs[name] for name in self.labelnames)
+        series = self._series.get(key)
+        if series is None:
+            with self._lock:
+                series = self._series.setdefault(key, self._new_series())
+        return series
+
+    def _new_series(self):
+        raise NotImplementedError
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.metric_type}"]
+
+    def render(self) -> List[str]:
+        raise NotImplementedError
+
+
+class _Value:
+    """A single counter or gauge value."""
+
+    def __init__(self):
+        self.value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        with self._lock:
+            self.value -= amount
+
+
+class Counter(_Metric):
+    """Monotonically increasing count."""
+
+    metric_type = "counter"
+
+    def _new_series(self) -> _Value:
+        return _Value()
+
+    def inc(self, amount: float = 1.0) -> None:
+        """Increment the unlabelled series."""
+        self.labels().inc(amount)
+
+    def render(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(series.value)}"
+            for key, series in list(self._series.items())
+        ]
+
+
+class Gauge(Counter):
+    """Value that goes up and down."""
+
+    metric_type = "gauge"
+
+    def dec(self, amount: float = 1.0) -> None:
+        """Decrement the unlabelled series."""
+        self.labels().dec(amount)
+
+    @contextmanager
+    def track_in_progress(self, *values: str) -> Iterator[None]:
+        """Increment the series for the duration of a block."""
+        series = self.labels(*values)
+        series.inc()
+        try:
+            yield
+        finally:
+            series.dec()
+
+
+class _HistogramSeries:
+    """Bucket counts, sum and count of one labelled histogram series."""
+
+    def __init__(self, buckets: Sequence[float]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        """Observe the duration of a block, in seconds."""
+        started_at = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started_at)
+
+
+class Histogram(_Metric):
+    """Distribution of observed values in cumulative buckets."""
+
+    metric_type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = settings.METRICS_LATENCY_BUCKETS
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_series(self) -> _HistogramSeries:
+        return _HistogramSeries(self.buckets)
+
+    def render(self) -> List[str]:
+        lines = []
+        for key, series in list(self._series.items()):
+            with series._lock:
+                counts, total = list(series.counts), series.sum
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class CallbackMetric(_Metric):
+    """Metric whose values are read from a callback at scrape time."""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        metric_type: str,
+        function: Callable[[], Iterable[Tuple[LabelValues, float]]],
+        labelnames: Sequence[str] = ()
+    ):
+        super().__init__(name, documentation, labelnames)
+        self.metric_type = metric_type
+        self.function = function
+
+    def render(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in self.function()
+        ]
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        """Add a metric, replacing one with the same name."""
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        """
+        Render every metric in the Prometheus text exposition format.
+
+        Returns:
+            str: Metrics text
+        """
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            try:
+                samples = metric.render()
+            except Exception:
+                continue  # A failing callback must not break the whole scrape
+            lines.extend(metric.header())
+            lines.extend(samples)
+        return "\n".join(lines) + "\n"
+
+
+# Global metrics registry
+metrics_registry = MetricsRegistry()
+
+analysis_stage_seconds = metrics_registry.register(Histogram(
+    "analysis_stage_seconds",
+    "Time spent in each stage of an analysis request",
+    ["endpoint", "stage"],
+))
+analysis_cache_lookups = metrics_registry.register(Counter(
+    "analysis_cache_lookups_total",
+    "Analysis cache lookups by result (hit or miss)",
+    ["endpoint", "result"],
+))
+llm_calls_in_flight = metrics_registry.register(Gauge(
+    "llm_calls_in_flight",
+    "Upstream LLM requests currently running, including hedged and abandoned ones",
+))
+mongo_command_seconds = metrics_registry.register(Histogram(
+    "mongo_command_seconds",
+    "MongoDB command latency",
+    ["command", "outcome"],
+    buckets=settings.METRICS_DB_BUCKETS,
+))
+paddle_request_seconds = metrics_registry.register(Histogram(
+    "paddle_request_seconds",
+    "Paddle API request latency",
+    ["operation", "outcome"],
+))
+
+
+def _cache_hit_ratio() -> List[Tuple[LabelValues, float]]:
+    totals: Dict[str, Dict[str, float]] = {}
+    for (endpoint, result), series in list(analysis_cache_lookups._series.items()):
+        totals.setdefault(endpoint, {}).setdefault(result, 0.0)
+        totals[endpoint][result] += series.value
+    return [
+        ((endpoint, ), counts.get("hit", 0.0) / (counts.get("hit", 0.0) + counts.get("miss", 0.0)))
+        for endpoint, counts in totals.items()
+        if counts.get("hit", 0.0) + counts.get("miss", 0.0) > 0
+    ]
+
+
+metrics_registry.register(CallbackMetric(
+    "analysis_cache_hit_ratio",
+    "Fraction of analysis cache lookups that hit, since startup",
+    "gauge",
+    _cache_hit_ratio,
+    ["endpoint"],
+))
+
+
+def time_stage(endpoint: str, stage: str):
+    """
+    Time an analysis stage.
+
+    Args:
+        endpoint: "analyze" or "analyze_stream"
+        stage: Stage name, e.g. "auth", "cache_read", "llm_call"
+
+    Returns:
+        Context manager observing the block's duration
+    """
+    return analysis_stage_seconds.labels(endpoint, stage).time()
+
+
+def record_cache_lookup(endpoint: str, hit: bool, count: int = 1) -> None:
+    """Count analysis cache hits or misses."""
+    analysis_cache_lookups.labels(endpoint, "hit" if hit else "miss").inc(count)
+
+
+class MongoCommandListener(monitoring.CommandListener):
+    """Records the latency of every MongoDB command."""
+
+    def started(self, event) -> None:
+        pass
+
+    def succeeded(self, event) -> None:
+        mongo_command_seconds.labels(event.command_name, "success").observe(event.duration_micros / 1e6)
+
+    def failed(self, event) -> None:
+        mongo_command_seconds.labels(event.command_name, "failure").observe(event.duration_micros / 1e6)
+
+
+_mongo_listener: Optional[MongoCommandListener] = None
+
+
+def register_mongo_listener() -> None:
+    """Record MongoDB command latency for clients created from now on. Idempotent."""
+    global _mongo_listener
+    if _mongo_listener is None:
+        _mongo_listener = MongoCommandListener()
+        monitoring.register(_mongo_listener)
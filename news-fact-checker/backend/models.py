@@ -1,11 +1,15 @@
 """
 Pydantic models for the News Fact-Checker API.
 """
-from pydantic import BaseModel, Field, EmailStr
-from typing import List, Optional
+from pydantic import BaseModel, Field, EmailStr, field_validator
+from pydantic.json_schema import SkipJsonSchema
+from typing import Dict, List, Optional
 from datetime import datetime, timezone
 from enum import Enum
 
+from limits import enforce_content_limit
+from logger import current_request_id
+
 
 class Issue(BaseModel):
     """Model representing a fact-checking issue found in an article."""
@@ -13,6 +17,9 @@ class Issue(BaseModel):
     explanation: str = Field(description="A clear explanation of why it's misleading or false")
     confidence_score: float = Field(description="Confidence score (0.0-1.0) for the assessment")
     source_urls: Optional[List[str]] = Field(default=None, description="URLs of sources that contradict the claim")
+    # Filled in server-side by anchoring; kept out of the JSON schema so the LLM format instructions don't ask for them
+    start_offset: SkipJsonSchema[Optional[int]] = Field(default=None, description="Character offset in the article content where the text starts")
+    end_offset: SkipJsonSchema[Optional[int]] = Field(default=None, description="Character offset in the article content where the text ends (exclusive)")
 
 
 class AnalysisOutput(BaseModel):
@@ -20,20 +27,51 @@ class AnalysisOutput(BaseModel):
     issues: List[Issue] = Field(description="List of problematic sections with text, explanation, and confidence score")
 
 
+class AnalysisRoute(BaseModel):
+    """Model describing which LLM tier handled an analysis and why."""
+    tier: str = Field(description="Model tier name (fast, standard, deep)")
+    model: str = Field(description="Perplexity model used for the analysis")
+    max_tokens: int = Field(description="Maximum completion tokens allowed")
+    reason: str = Field(description="Short explanation of the routing decision")
+
+
 class ArticleAnalysisDocument(BaseModel):
     """Model for storing article analysis in the database."""
     url: str = Field(description="Unique URL identifier for the article")
     title: str = Field(description="Article title")
     content: str = Field(description="Full article content")
     issues: List[Issue] = Field(description="List of identified issues")
+    route: Optional[AnalysisRoute] = Field(default=None, description="Model route used to produce the analysis")
+    canonical_url: Optional[str] = Field(default=None, description="URL normalized for cache probes")
+    content_hash: Optional[str] = Field(default=None, description="SHA-256 of the whitespace-normalized content")
+    compressed_responses: Dict[str, bytes] = Field(default_factory=dict, description="AnalysisResponse JSON precompressed per content encoding")
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), description="Timestamp when analysis was created")
 
 
+class ClaimVerdict(BaseModel):
+    """Model for a cached verdict on a single claim, shared across articles."""
+    fingerprint: str = Field(description="Normalized claim fingerprint")
+    claim_text: str = Field(description="Sentence(s) containing the claim, as first seen")
+    explanation: str = Field(description="Explanation of the verdict")
+    confidence_score: float = Field(description="Confidence score (0.0-1.0) for the verdict")
+    source_urls: Optional[List[str]] = Field(default=None, description="URLs of sources backing the verdict")
+    article_url: str = Field(description="URL of the article the verdict was last produced for")
+    seen_count: int = Field(default=1, description="Number of analyses that produced this verdict")
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), description="When the claim was first verified")
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), description="When the verdict was last refreshed")
+
+
 class ArticleRequest(BaseModel):
     """Model for incoming article analysis requests."""
     title: str = Field(description="Article title")
     content: str = Field(description="Article content to analyze")
     url: str = Field(description="Article URL")
+    
+    @field_validator("content")
+    @classmethod
+    def limit_content_size(cls, content: str) -> str:
+        """Truncate (or reject) content over MAX_ARTICLE_CONTENT_CHARS."""
+        return enforce_content_limit(content)
 
 
 class AnalysisResponse(BaseModel):
@@ -41,6 +79,64 @@ class AnalysisResponse(BaseModel):
     issues: List[Issue] = Field(description="List of identified issues in the article")
 
 
+class BatchAnalysisRequest(BaseModel):
+    """Model for analyzing several articles in one request."""
+    articles: List[ArticleRequest] = Field(min_length=1, description="Articles to analyze")
+
+
+class BatchAnalysisResult(BaseModel):
+    """Model for one NDJSON line of a batch analysis response."""
+    index: int = Field(description="Position of the article in the request")
+    url: str = Field(description="Article URL")
+    status: str = Field(description="'completed' or 'failed'")
+    cached: bool = Field(default=False, description="Whether the result came from the analysis cache")
+    issues: Optional[List[Issue]] = Field(default=None, description="Identified issues, if completed")
+    error: Optional[str] = Field(default=None, description="Failure reason, if failed")
+
+
+class AnalysisJobStatus(str, Enum):
+    """Enum for analysis job states."""
+    QUEUED = "queued"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+
+
+class AnalysisJobResponse(BaseModel):
+    """Model for analysis job status sent to clients."""
+    job_id: str = Field(description="Analysis job identifier")
+    status: AnalysisJobStatus = Field(description="Current job state")
+    article_url: str = Field(description="URL of the article being analyzed")
+    issues: Optional[List[Issue]] = Field(default=None, description="Identified issues, once the job has completed")
+    error: Optional[str] = Field(default=None, description="Failure reason, if the job failed")
+    attempts: int = Field(default=0, description="Number of times a worker picked up the job")
+    created_at: datetime = Field(description="When the job was created")
+    updated_at: datetime = Field(description="When the job last changed state")
+
+
+class AnalysisProbeResponse(BaseModel):
+    """Model for a cache probe result sent to clients."""
+    cached: bool = Field(description="Whether a cached analysis exists for the article")
+    article_url: Optional[str] = Field(default=None, description="URL the cached analysis was stored under")
+    issues: Optional[List[Issue]] = Field(default=None, description="Cached issues, on a hit")
+
+
+class BulkProbeRequest(BaseModel):
+    """Model for checking which of many article URLs have a cached analysis."""
+    urls: List[str] = Field(min_length=1, description="Article URLs, matched exactly or by canonical form")
+
+
+class BulkProbeResponse(BaseModel):
+    """Model for a bulk cache probe result sent to clients."""
+    cached: List[str] = Field(description="Requested URLs that have a cached analysis")
+
+
+class BloomFilterDelta(BaseModel):
+    """Model for the bits to set to bring a downloaded Bloom filter up to date."""
+    version: str = Field(description="Filter version after applying the delta")
+    set_bits: List[int] = Field(description="Bit positions to set")
+
+
 # New models for user accounts and billing
 
 class AccountType(str, Enum):
@@ -148,6 +244,7 @@ class StreamEventType(str, Enum):
     ISSUE = "issue"
     COMPLETE = "complete"
     ERROR = "error"
+    REPLAY = "replay"
 
 
 class StreamEvent(BaseModel):
@@ -155,6 +252,7 @@ class StreamEvent(BaseModel):
     event_type: StreamEventType = Field(description="Type of streaming event")
     timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), description="Event timestamp")
     message: Optional[str] = Field(default=None, description="Optional message")
+    request_id: Optional[str] = Field(default_factory=current_request_id, description="Id of the request that produced the event")
 
 
 class AnalysisProgress(StreamEvent):
@@ -162,6 +260,7 @@ class AnalysisProgress(StreamEvent):
     event_type: StreamEventType = Field(default=StreamEventType.PROGRESS, description="Event type")
     progress_percentage: float = Field(description="Analysis completion percentage (0.0-1.0)")
     current_step: str = Field(description="Current analysis step description")
+    queue_position: Optional[int] = Field(default=None, description="Position in the LLM queue while waiting for a slot")
 
 
 class StreamedIssue(StreamEvent):
@@ -185,6 +284,14 @@ class AnalysisComplete(StreamEvent):
     analysis_duration: float = Field(description="Actual analysis duration in seconds")
 
 
+class AnalysisReplay(StreamEvent):
+    """Model for a cached analysis delivered as a single event."""
+    event_type: StreamEventType = Field(default=StreamEventType.REPLAY, description="Event type")
+    article_url: str = Field(description="URL of the analyzed article")
+    issues: List[Issue] = Field(description="All identified issues")
+    total_issues: int = Field(description="Total number of issues found")
+
+
 class AnalysisError(StreamEvent):
     """Model for analysis error event."""
     event_type: StreamEventType = Field(default=StreamEventType.ERROR, description="Event type")
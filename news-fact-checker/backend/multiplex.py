@@ -0,0 +1,220 @@
+"""
+Multiplexed analysis streams over a single WebSocket.
+
+One authenticated connection carries any number of concurrent analyses,
+each identified by a client-chosen stream id. Every analysis goes through
+the same pipeline as `/analyze/stream` (cache replay, background runs,
+Last-Event-ID resumption, stream limits); its SSE events are relayed as
+WebSocket messages.
+
+Client messages:
+    {"type": "auth", "token": "<jwt>"}                       (first message)
+    {"type": "analyze", "stream_id": "tab-1", "article": {...},
+     "replay": "instant", "last_event_id": null}
+    {"type": "cancel", "stream_id": "tab-1"}
+
+Server messages:
+    {"type": "ready", "max_streams": 8}
+    {"type": "event", "stream_id": "tab-1", "id": "<event id>", "event": {...}}
+    {"type": "error", "stream_id": "tab-1", "status": 429, "message": "...", "retry_after": 5}
+    {"type": "done", "stream_id": "tab-1", "cancelled": false}
+
+Outgoing messages go through a bounded per-connection queue, so a slow
+client applies backpressure to its own streams instead of buffering
+without limit; the analyses themselves keep running in the background.
+"""
+import asyncio
+import json
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional
+
+from fastapi import HTTPException, WebSocket, WebSocketDisconnect
+from pydantic import ValidationError
+
+from config import settings
+from logger import app_logger
+from models import ArticleRequest, User
+from serialization import iter_sse_frames
+
+
+# Close code used when authentication fails (4000-4999 are application defined)
+WS_CLOSE_UNAUTHORIZED = 4401
+
+REPLAY_MODES = ("instant", "coalesced", "paced")
+
+StreamOpener = Callable[[ArticleRequest, User, Optional[str], Optional[str]], Awaitable[AsyncIterator[str]]]
+
+
+class MultiplexSession:
+    """One WebSocket connection and the analysis streams it carries."""
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        authenticate: Callable[[str], Awaitable[User]],
+        open_stream: StreamOpener,
+        max_streams: int = settings.WS_MAX_STREAMS_PER_CONNECTION,
+        send_queue_size: int = settings.WS_SEND_QUEUE_SIZE
+    ):
+        """
+        Args:
+            websocket: Accepted WebSocket connection
+            authenticate: Coroutine turning a JWT into a User (raises HTTPException)
+            open_stream: Coroutine opening an analysis event stream, as main.open_analysis_stream
+            max_streams: Concurrent analyses allowed on this connection
+            send_queue_size: Outgoing messages buffered before streams are paused
+        """
+        self.websocket = websocket
+        self.authenticate = authenticate
+        self.open_stream = open_stream
+        self.max_streams = max_streams
+        self.user: Optional[User] = None
+        self._outbox: asyncio.Queue = asyncio.Queue(maxsize=send_queue_size)
+        self._streams: Dict[str, asyncio.Task] = {}
+
+    async def run(self) -> None:
+        """Authenticate, then serve client messages until the connection closes."""
+        if not await self._authenticate():
+            return
+
+        sender = asyncio.create_task(self._send_loop())
+        try:
+            await self._send({"type": "ready", "max_streams": self.max_streams})
+            while True:
+                message = await self._receive()
+                if message is not None:
+                    await self._dispatch(message)
+        except WebSocketDisconnect:
+            pass
+        finally:
+            tasks = list(self._streams.values()) + [sender]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _authenticate(self) -> bool:
+        try:
+            message = await asyncio.wait_for(self.websocket.receive_json(), settings.WS_AUTH_TIMEOUT)
+            if not isinstance(message, dict) or message.get("type") != "auth" or not isinstance(message.get("token"), str):
+                raise HTTPException(status_code=401, detail="First message must be an auth message")
+            self.user = await self.authenticate(message["token"])
+            return True
+        except (asyncio.TimeoutError, HTTPException, ValueError, KeyError) as e:
+            reason = getattr(e, "detail", None) or "Authentication timed out"
+            await self.websocket.close(code=WS_CLOSE_UNAUTHORIZED, reason=str(reason)[:120])
+            return False
+        except WebSocketDisconnect:
+            return False
+
+    async def _receive(self) -> Optional[Dict[str, Any]]:
+        """Read the next client message; malformed ones are answered with an error and skipped."""
+        try:
+            message = await self.websocket.receive_json()
+        except (ValueError, KeyError):
+            # Invalid JSON, or a binary frame (which has no "text")
+            await self._send_error(None, 400, "Messages must be JSON text frames")
+            return None
+        if not isinstance(message, dict):
+            await self._send_error(None, 400, "Messages must be JSON objects")
+            return None
+        if message.get("stream_id") is not None and not isinstance(message["stream_id"], str):
+            await self._send_error(None, 400, "stream_id must be a string")
+            return None
+        return message
+
+    async def _dispatch(self, message: Dict[str, Any]) -> None:
+        message_type = message.get("type")
+        stream_id = message.get("stream_id")
+        if message_type == "analyze":
+            await self._start_stream(stream_id, message)
+        elif message_type == "cancel":
+            task = self._streams.get(stream_id)
+            if task is not None:
+                task.cancel()
+        else:
+            await self._send_error(stream_id, 400, f"Unknown message type: {message_type}")
+
+    async def _start_stream(self, stream_id: Optional[str], message: Dict[str, Any]) -> None:
+        if not isinstance(stream_id, str) or not stream_id:
+            await self._send_error(None, 400, "analyze messages need a stream_id")
+            return
+        if stream_id in self._streams:
+            await self._send_error(stream_id, 409, "stream_id is already in use")
+            return
+        if len(self._streams) >= self.max_streams:
+            await self._send_error(stream_id, 429, "Too many analyses on this connection", settings.STREAM_RETRY_AFTER)
+            return
+        replay, last_event_id = message.get("replay"), message.get("last_event_id")
+        if replay is not None and replay not in REPLAY_MODES:
+            await self._send_error(stream_id, 422, f"replay must be one of {', '.join(REPLAY_MODES)}")
+            return
+        if last_event_id is not None and not isinstance(last_event_id, str):
+            await self._send_error(stream_id, 422, "last_event_id must be a string")
+            return
+        try:
+            article = ArticleRequest.model_validate(message.get("article") or {})
+        except ValidationError as e:
+            await self._send_error(stream_id, 422, str(e))
+            return
+
+        self._streams[stream_id] = asyncio.create_task(self._pump(stream_id, article, replay, last_event_id))
+
+    async def _pump(self, stream_id: str, article: ArticleRequest, replay: Optional[str], last_event_id: Optional[str]) -> None:
+        """Relay one analysis stream's events to the client."""
+        cancelled = False
+        events = None
+        try:
+            events = await self.open_stream(article, self.user, replay, last_event_id)
+            encoded_id = json.dumps(stream_id)
+            async for chunk in events:
+                for event_id, data in iter_sse_frames(chunk):
+                    if data is None:
+                        continue  # Keepalive; the WebSocket has its own pings
+                    # The event JSON is embedded as-is rather than parsed and re-encoded
+                    await self._send_raw(
+                        f'{{"type":"event","stream_id":{encoded_id},"id":{json.dumps(event_id)},"event":{data}}}'
+                    )
+        except asyncio.CancelledError:
+            cancelled = True
+        except HTTPException as e:
+            retry_after = (e.headers or {}).get("Retry-After")
+            await self._send_error(stream_id, e.status_code, str(e.detail), int(retry_after) if retry_after else None)
+            return
+        except Exception as e:
+            app_logger.error(f"WebSocket analysis stream {stream_id} failed", error=e)
+            await self._send_error(stream_id, 500, str(e))
+            return
+        finally:
+            self._streams.pop(stream_id, None)
+            if events is not None and hasattr(events, "aclose"):
+                await events.aclose()
+
+        done_message = {"type": "done", "stream_id": stream_id, "cancelled": cancelled}
+        if not cancelled:
+            await self._send(done_message)
+            return
+        # Never block a cancelled stream on a full outbox (the connection may be closing)
+        try:
+            self._outbox.put_nowait(json.dumps(done_message))
+        except asyncio.QueueFull:
+            pass
+
+    async def _send_error(self, stream_id: Optional[str], status: int, message: str, retry_after: Optional[int] = None) -> None:
+        await self._send({
+            "type": "error",
+            "stream_id": stream_id,
+            "status": status,
+            "message": message,
+            "retry_after": retry_after,
+        })
+
+    async def _send(self, message: Dict[str, Any]) -> None:
+        await self._send_raw(json.dumps(message))
+
+    async def _send_raw(self, text: str) -> None:
+        # Blocks when the client is not keeping up, pausing the stream that is sending
+        await self._outbox.put(text)
+
+    async def _send_loop(self) -> None:
+        while True:
+            text = await self._outbox.get()
+            await self.websocket.send_text(text)
@@ -2,9 +2,11 @@
 Paddle billing integration utilities.
 """
 import os
+import time
 import requests
 from typing import Optional, Dict, Any
 from models import AccountType
+from metrics import paddle_request_seconds
 from pymongo.collection import Collection
 
 
@@ -52,6 +54,17 @@ class PaddleBilling:
         else:
             print("INFO: Using Paddle Production environment")
             
+    def _request(self, operation: str, method: str, url: str, **kwargs) -> requests.Response:
+        """Send a Paddle API request, recording its latency by operation and outcome."""
+        started_at = time.perf_counter()
+        outcome = "error"
+        try:
+            response = requests.request(method, url, **kwargs)
+            outcome = f"{response.status_code // 100}xx"
+            return response
+        finally:
+            paddle_request_seconds.labels(operation, outcome).observe(time.perf_counter() - started_at)
+    
     def validate_configuration(self) -> bool:
         """Validate that all required Paddle configuration is present."""
         missing_config = []
@@ -89,7 +102,7 @@ class PaddleBilling:
         print(f"Environment: {self.config.environment}")
         
         try:
-            response = requests.post(url, json=data, headers=self.config.headers)
+            response = self._request("create_customer", "POST", url, json=data, headers=self.config.headers)
             print(f"Response status: {response.status_code}")
             print(f"Response headers: {dict(response.headers)}")
             
@@ -122,7 +135,7 @@ class PaddleBilling:
         url = f"{self.config.api_base_url}/subscriptions/{subscription_id}"
         
         try:
-            response = requests.get(url, headers=self.config.headers)
+            response = self._request("get_subscription", "GET", url, headers=self.config.headers)
             response.raise_for_status()
             return response.json().get("data")
         except requests.RequestException as e:
@@ -137,7 +150,7 @@ class PaddleBilling:
         url = f"{self.config.api_base_url}/transactions/{transaction_id}"
         
         try:
-            response = requests.get(url, headers=self.config.headers)
+            response = self._request("get_transaction", "GET", url, headers=self.config.headers)
             response.raise_for_status()
             return response.json().get("data")
         except requests.RequestException as e:
@@ -152,7 +165,7 @@ class PaddleBilling:
         url = f"{self.config.api_base_url}/subscriptions/{subscription_id}/cancel"
         
         try:
-            response = requests.post(url, headers=self.config.headers)
+            response = self._request("cancel_subscription", "POST", url, headers=self.config.headers)
             response.raise_for_status()
             return True
         except requests.RequestException as e:
@@ -0,0 +1,276 @@
+"""
+On-demand sampling profiler for a running worker.
+
+When a profile is running, a background thread wakes every PROFILER_INTERVAL
+seconds, reads the stack of every other thread with `sys._current_frames()`
+and counts each distinct stack. Nothing is instrumented and no thread exists
+while no profile is running, so the profiler costs nothing when it is off.
+
+Results are in the folded-stack format ("thread;outer;...;inner count" per
+line) read by flamegraph.pl, speedscope and inferno. Threads blocked waiting
+(idle executor workers, the event loop's select) are left out unless asked
+for, so the output shows where the CPU goes.
+
+Two modes, one profile at a time:
+
+* Worker: `POST /admin/profile?duration=10` samples every thread for the
+  given time and returns the folded stacks.
+* Request: a request sent with `X-Profile: <admin key>` is profiled while it
+  is in flight. Event-loop samples are kept only while one of the request's
+  tasks is running; threads the request hands work to are sampled along with
+  whatever else they run at the time. The response carries an
+  `X-Profile-Id` header, and the result is fetched from
+  `GET /admin/profile/{profile_id}` once the request completes.
+"""
+import asyncio
+import os
+import secrets
+import sys
+import threading
+import time
+from collections import Counter, OrderedDict
+from contextvars import ContextVar
+from types import FrameType
+from typing import Any, Callable, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from auth import verify_admin_key
+from config import settings
+from logger import app_logger
+
+
+# Leaf functions of threads that are blocked rather than running
+IDLE_FUNCTIONS = frozenset({
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"),
+    ("selectors.py", "select"),
+    ("thread.py", "_worker"),
+    ("socket.py", "accept"),
+})
+
+# Id of the profile the current request belongs to
+_profile_id_var: ContextVar[Optional[str]] = ContextVar("profile_id", default=None)
+
+
+class ProfilerBusyError(Exception):
+    """Raised when a profile is requested while another one is running."""
+
+
+def _frame_name(frame: FrameType) -> str:
+    code = frame.f_code
+    name = getattr(code, "co_qualname", code.co_name)
+    return f"{name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})".replace(";", ":")
+
+
+class Profile:
+    """Folded stack counts collected by one profiling run."""
+
+    def __init__(self, profile_id: str, mode: str, interval: float, include_idle: bool):
+        self.profile_id = profile_id
+        self.mode = mode
+        self.interval = interval
+        self.include_idle = include_idle
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.finished = False
+
+    def folded(self) -> str:
+        """
+        Render the profile as folded stacks.
+
+        Returns:
+            str: One "frame;frame;... count" line per distinct stack, most frequent first
+        """
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+class SamplingProfiler:
+    """Runs one sampling thread at a time and keeps recent request profiles."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._current: Optional[Profile] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._results: "OrderedDict[str, Profile]" = OrderedDict()
+        # Event loop and thread whose samples are filtered to one request (request mode)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread_id: Optional[int] = None
+
+    @property
+    def running(self) -> bool:
+        """Whether a profile is being collected."""
+        return self._current is not None
+
+    def start(
+        self,
+        mode: str = "worker",
+        interval: float = settings.PROFILER_INTERVAL,
+        include_idle: bool = False,
+        loop: Optional[asyncio.AbstractEventLoop] = None
+    ) -> Profile:
+        """
+        Start sampling every thread.
+
+        Args:
+            mode: "worker" or "request"
+            interval: Seconds between samples
+            include_idle: Keep samples of threads that are blocked waiting
+            loop: For request profiles, the event loop whose samples are filtered to the request
+
+        Returns:
+            Profile: The profile being collected
+
+        Raises:
+            ProfilerBusyError: If another profile is running
+        """
+        with self._lock:
+            if self._current is not None:
+                raise ProfilerBusyError("A profile is already running")
+            profile = Profile(secrets.token_hex(8), mode, max(interval, settings.PROFILER_MIN_INTERVAL), include_idle)
+            self._current = profile
+            self._loop = loop
+            self._loop_thread_id = threading.get_ident() if loop is not None else None
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, args=(profile, ), name="sampling-profiler", daemon=True)
+            self._thread.start()
+        app_logger.info("Started %s profile %s", mode, profile.profile_id)
+        return profile
+
+    def stop(self) -> Optional[Profile]:
+        """
+        Stop the running profile and keep its result.
+
+        Returns:
+            Optional[Profile]: The finished profile, or None if none was running
+        """
+        with self._lock:
+            profile, thread = self._current, self._thread
+            if profile is None:
+                return None
+            self._stop.set()
+        thread.join()
+        with self._lock:
+            profile.finished = True
+            self._current = self._thread = self._loop = self._loop_thread_id = None
+            self._results[profile.profile_id] = profile
+            while len(self._results) > settings.PROFILER_RESULTS_KEPT:
+                self._results.popitem(last=False)
+        app_logger.info("Finished %s profile %s with %d samples", profile.mode, profile.profile_id, profile.samples)
+        return profile
+
+    def get(self, profile_id: str) -> Optional[Profile]:
+        """Get a finished profile, or the running one, by id."""
+        if self._current is not None and self._current.profile_id == profile_id:
+            return self._current
+        return self._results.get(profile_id)
+
+    async def profile_for(self, duration: float, **kwargs: Any) -> Profile:
+        """
+        Profile the worker for a fixed time.
+
+        Args:
+            duration: Seconds to sample for
+            **kwargs: Passed to start()
+
+        Returns:
+            Profile: The finished profile
+        """
+        self.start(**kwargs)
+        try:
+            await asyncio.sleep(duration)
+        finally:
+            profile = await asyncio.to_thread(self.stop)
+        return profile
+
+    def _run(self, profile: Profile) -> None:
+        own_id = threading.get_ident()
+        deadline = time.monotonic() + settings.PROFILER_MAX_DURATION
+        while not self._stop.wait(profile.interval):
+            if time.monotonic() > deadline:
+                return  # Stop sampling; the result is kept when stop() is called
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                if thread_id == self._loop_thread_id and not self._request_is_running(profile.profile_id):
+                    continue
+                if not profile.include_idle and self._is_idle(frame):
+                    continue
+                profile.stacks[self._fold(names.get(thread_id, str(thread_id)), frame)] += 1
+            profile.samples += 1
+
+    def _request_is_running(self, profile_id: str) -> bool:
+        """Whether the task running on the profiled event loop belongs to the profiled request."""
+        try:
+            task = asyncio.current_task(self._loop)
+        except RuntimeError:
+            return False
+        if task is None:
+            return False
+        if not hasattr(task, "get_context"):  # Python < 3.11: keep every event loop sample
+            return True
+        return task.get_context().get(_profile_id_var) == profile_id
+
+    @staticmethod
+    def _is_idle(frame: FrameType) -> bool:
+        code = frame.f_code
+        return (os.path.basename(code.co_filename), code.co_name) in IDLE_FUNCTIONS
+
+    @staticmethod
+    def _fold(thread_name: str, frame: Optional[FrameType]) -> str:
+        names = []
+        while frame is not None:
+            names.append(_frame_name(frame))
+            frame = frame.f_back
+        names.append(thread_name.replace(";", ":"))
+        return ";".join(reversed(names))
+
+
+# Global profiler instance
+sampling_profiler = SamplingProfiler()
+
+
+class ProfilingMiddleware:
+    """ASGI middleware profiling requests tagged with an `X-Profile: <admin key>` header."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        profile_key = Headers(scope=scope).get("x-profile")
+        if profile_key is None:
+            await self.app(scope, receive, send)
+            return
+        if not verify_admin_key(profile_key):
+            app_logger.warning("Ignoring X-Profile header with an invalid admin key")
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            profile = sampling_profiler.start(mode="request", loop=asyncio.get_running_loop())
+        except ProfilerBusyError:
+            await self.app(scope, receive, self._tagging_send(send, "busy"))
+            return
+
+        token = _profile_id_var.set(profile.profile_id)
+        try:
+            await self.app(scope, receive, self._tagging_send(send, profile.profile_id))
+        finally:
+            _profile_id_var.reset(token)
+            await asyncio.to_thread(sampling_profiler.stop)
+
+    @staticmethod
+    def _tagging_send(send: Send, profile_id: str) -> Callable:
+        async def tagging_send(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(raw=message.setdefault("headers", []))["X-Profile-Id"] = profile_id
+            await send(message)
+        return tagging_send
+
@@ -0,0 +1,347 @@
+"""
+Deadline-aware LLM invocation with retries, hedging and a circuit breaker.
+
+Every upstream LLM call goes through `llm_invoker`, which bounds how long a
+request can wait on Perplexity, retries transient failures with jittered
+backoff, optionally fires a hedged duplicate when a call runs past the
+recent latency percentile, and fails fast while the upstream is down.
+"""
+import asyncio
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import AsyncIterator, Callable, Optional, TypeVar
+
+from config import settings
+from logger import analysis_logger
+from metrics import llm_calls_in_flight
+
+T = TypeVar("T")
+
+
+class LLMUnavailableError(Exception):
+    """Raised when the LLM could not produce a response within its budget."""
+
+    def __init__(self, message: str, retry_after: int = 0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class CircuitOpenError(LLMUnavailableError):
+    """Raised without calling the LLM because the circuit breaker is open."""
+
+
+class LLMDeadlineExceeded(LLMUnavailableError):
+    """Raised when all attempts together exceeded the call deadline."""
+
+
+class Deadline:
+    """Time budget shared by every step of one request (queue wait, LLM attempts)."""
+
+    def __init__(self, seconds: float = settings.LLM_CALL_DEADLINE):
+        """
+        Args:
+            seconds: Total budget, starting now
+        """
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        """Get the seconds left, never negative."""
+        return max(0.0, self.expires_at - time.monotonic())
+
+
+class CircuitBreaker:
+    """
+    Classic three-state circuit breaker.
+
+    The breaker opens after `failure_threshold` consecutive failures and
+    rejects calls for `reset_timeout` seconds. After that a single probe call
+    is let through (half-open); its outcome closes or re-opens the breaker.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        failure_threshold: int = settings.LLM_BREAKER_FAILURE_THRESHOLD,
+        reset_timeout: float = settings.LLM_BREAKER_RESET_TIMEOUT
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        """Current breaker state, accounting for an elapsed reset timeout."""
+        with self._lock:
+            if self._state == self.OPEN and time.monotonic() - self._opened_at >= self.reset_timeout:
+                return self.HALF_OPEN
+            return self._state
+
+    @property
+    def is_open(self) -> bool:
+        """Whether calls are currently being rejected outright."""
+        return self.state == self.OPEN
+
+    @property
+    def retry_after(self) -> int:
+        """Seconds until the breaker will let a probe call through."""
+        with self._lock:
+            remaining = self.reset_timeout - (time.monotonic() - self._opened_at)
+        return max(1, int(remaining + 0.999))
+
+    def allow_request(self) -> bool:
+        """
+        Check whether a call may proceed, reserving the probe slot when half-open.
+
+        Returns:
+            bool: True if the caller should go ahead with the call
+        """
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_timeout:
+                return False
+            if self._probe_in_flight:
+                return False
+            self._state = self.HALF_OPEN
+            self._probe_in_flight = True
+            return True
+
+    def release_probe(self) -> None:
+        """Free the half-open probe slot of a call abandoned before it had an outcome."""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_success(self) -> None:
+        """Record a successful call and close the breaker."""
+        with self._lock:
+            if self._state != self.CLOSED:
+                analysis_logger.info("LLM circuit breaker closed")
+            self._state = self.CLOSED
+            self._consecutive_failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        """Record a failed call, opening the breaker once the threshold is hit."""
+        with self._lock:
+            self._consecutive_failures += 1
+            self._probe_in_flight = False
+            if self._state == self.HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    analysis_logger.warning(
+                        f"LLM circuit breaker opened after {self._consecutive_failures} consecutive failures"
+                    )
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+class ResilientInvoker:
+    """Runs blocking LLM calls on a bounded thread pool under a deadline."""
+
+    def __init__(self, breaker: Optional[CircuitBreaker] = None):
+        self.breaker = breaker or CircuitBreaker()
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.LLM_MAX_WORKERS,
+            thread_name_prefix="llm-call"
+        )
+
+    def invoke(
+        self,
+        call: Callable[[], T],
+        deadline: float = settings.LLM_CALL_DEADLINE,
+        hedge_after: Optional[float] = None
+    ) -> T:
+        """
+        Invoke a blocking LLM call with retries, hedging and a deadline.
+
+        Args:
+            call: Zero-argument callable performing one LLM request
+            deadline: Total seconds allowed across all attempts
+            hedge_after: Seconds after which a duplicate request is started,
+                or None to disable hedging for this call
+
+        Returns:
+            T: Result of the first successful attempt
+
+        Raises:
+            CircuitOpenError: If the circuit breaker is open
+            LLMDeadlineExceeded: If the deadline passed before any attempt succeeded
+            LLMUnavailableError: If every attempt failed
+        """
+        if deadline <= 0:
+            # The request spent its budget before reaching the LLM; not an upstream failure
+            raise LLMDeadlineExceeded("No time left for the LLM call before the request deadline")
+        if not self.breaker.allow_request():
+            raise CircuitOpenError("LLM circuit breaker is open", retry_after=self.breaker.retry_after)
+
+        expires_at = time.monotonic() + deadline
+        last_error: Optional[BaseException] = None
+
+        for attempt in range(settings.LLM_MAX_RETRIES + 1):
+            remaining = expires_at - time.monotonic()
+            if remaining <= 0:
+                break
+
+            try:
+                result = self._run_attempt(call, min(remaining, settings.LLM_ATTEMPT_TIMEOUT), hedge_after)
+                self.breaker.record_success()
+                return result
+            except Exception as e:
+                last_error = e
+                analysis_logger.warning(f"LLM attempt {attempt + 1} failed: {e}")
+
+            if attempt < settings.LLM_MAX_RETRIES:
+                backoff = random.uniform(0, min(settings.LLM_RETRY_MAX_BACKOFF, settings.LLM_RETRY_BASE_BACKOFF * 2 ** attempt))
+                if time.monotonic() + backoff >= expires_at:
+                    break
+                time.sleep(backoff)
+
+        self.breaker.record_failure()
+        if isinstance(last_error, TimeoutError) or time.monotonic() >= expires_at:
+            raise LLMDeadlineExceeded(f"LLM call exceeded its {deadline:.0f}s deadline") from last_error
+        raise LLMUnavailableError(f"LLM call failed: {last_error}") from last_error
+
+    async def astream(
+        self,
+        stream: Callable[[], AsyncIterator[str]],
+        deadline: float = settings.LLM_CALL_DEADLINE
+    ) -> AsyncIterator[str]:
+        """
+        Stream an LLM response under the circuit breaker and a deadline.
+
+        An attempt that fails before its first chunk is retried like in
+        invoke(); once text was yielded the failure is raised, since the
+        caller has already consumed part of the response. Streams are not
+        hedged.
+
+        Args:
+            stream: Zero-argument callable opening a new response stream
+            deadline: Total seconds allowed across all attempts
+
+        Yields:
+            str: Response text chunks
+
+        Raises:
+            CircuitOpenError: If the circuit breaker is open
+            LLMDeadlineExceeded: If the deadline passed before the response completed
+            LLMUnavailableError: If every attempt failed
+        """
+        if deadline <= 0:
+            raise LLMDeadlineExceeded("No time left for the LLM call before the request deadline")
+        if not self.breaker.allow_request():
+            raise CircuitOpenError("LLM circuit breaker is open", retry_after=self.breaker.retry_after)
+
+        attempts = self._stream_attempts(stream, deadline)
+        try:
+            async for chunk in attempts:
+                yield chunk
+        except Exception:
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            # The consumer stopped reading or the task was cancelled; there is no outcome
+            # to record, but a half-open probe slot must not stay taken forever
+            self.breaker.release_probe()
+            raise
+        finally:
+            await attempts.aclose()
+        self.breaker.record_success()
+
+    async def _stream_attempts(self, stream: Callable[[], AsyncIterator[str]], deadline: float) -> AsyncIterator[str]:
+        """Run astream()'s attempts with retries; the caller records the breaker outcome."""
+        expires_at = time.monotonic() + deadline
+        last_error: Optional[BaseException] = None
+
+        for attempt in range(settings.LLM_MAX_RETRIES + 1):
+            remaining = expires_at - time.monotonic()
+            if remaining <= 0:
+                break
+
+            attempt_expires_at = time.monotonic() + min(remaining, settings.LLM_ATTEMPT_TIMEOUT)
+            chunks = stream().__aiter__()
+            started = False
+            try:
+                with llm_calls_in_flight.track_in_progress():
+                    while True:
+                        try:
+                            chunk = await asyncio.wait_for(chunks.__anext__(), attempt_expires_at - time.monotonic())
+                        except StopAsyncIteration:
+                            break
+                        started = True
+                        yield chunk
+                return
+            except Exception as e:
+                last_error = e
+                analysis_logger.warning(f"LLM stream attempt {attempt + 1} failed: {e!r}")
+                if started:
+                    raise LLMUnavailableError(f"LLM stream failed mid-response: {e!r}") from e
+            finally:
+                if hasattr(chunks, "aclose"):
+                    await chunks.aclose()
+
+            if attempt < settings.LLM_MAX_RETRIES:
+                backoff = random.uniform(0, min(settings.LLM_RETRY_MAX_BACKOFF, settings.LLM_RETRY_BASE_BACKOFF * 2 ** attempt))
+                if time.monotonic() + backoff >= expires_at:
+                    break
+                await asyncio.sleep(backoff)
+
+        if isinstance(last_error, TimeoutError) or time.monotonic() >= expires_at:
+            raise LLMDeadlineExceeded(f"LLM stream exceeded its {deadline:.0f}s deadline") from last_error
+        raise LLMUnavailableError(f"LLM stream failed: {last_error}") from last_error
+
+    def _run_attempt(self, call: Callable[[], T], timeout: float, hedge_after: Optional[float]) -> T:
+        """Run one attempt, racing a hedged duplicate if it is slow."""
+        started_at = time.monotonic()
+        pending = {self._executor.submit(self._tracked, call)}
+        hedged = hedge_after is None or hedge_after >= timeout
+        first_error: Optional[BaseException] = None
+
+        while pending:
+            elapsed = time.monotonic() - started_at
+            wait_for = (hedge_after if not hedged else timeout) - elapsed
+            done, pending = wait(pending, timeout=max(0.0, wait_for), return_when=FIRST_COMPLETED)
+
+            for future in done:
+                error = future.exception()
+                if error is None:
+                    self._abandon(pending)
+                    return future.result()
+                first_error = first_error or error
+
+            if done:
+                continue
+            if not hedged:
+                analysis_logger.info(f"LLM call slower than {hedge_after:.1f}s, sending hedged request")
+                pending.add(self._executor.submit(self._tracked, call))
+                hedged = True
+                continue
+
+            self._abandon(pending)
+            raise TimeoutError(f"LLM attempt timed out after {timeout:.0f}s")
+
+        raise first_error
+
+    @staticmethod
+    def _tracked(call: Callable[[], T]) -> T:
+        """Run one upstream request, counting it as in flight until it returns."""
+        with llm_calls_in_flight.track_in_progress():
+            return call()
+
+    @staticmethod
+    def _abandon(futures: "set[Future]") -> None:
+        """Stop waiting on futures; calls already running finish in the background."""
+        for future in futures:
+            future.cancel()
+
+
+# Global invoker shared by all analysis paths
+llm_invoker = ResilientInvoker()
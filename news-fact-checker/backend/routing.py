@@ -0,0 +1,198 @@
+"""
+Adaptive model routing for fact-checking analyses.
+
+Picks a model tier for each article based on its length, the requesting
+account type and the latency recently observed for each tier, and keeps a
+pool of pre-built LLM clients so routing never pays client setup cost.
+"""
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Iterator, Optional
+
+from config import settings
+from logger import analysis_logger
+from models import AccountType, AnalysisRoute
+from resilience import CircuitOpenError, LLMDeadlineExceeded
+
+
+class LatencyTracker:
+    """Rolling window of observed LLM call latencies per model tier."""
+
+    def __init__(self, window_size: int = settings.LATENCY_WINDOW_SIZE):
+        self.window_size = window_size
+        self._samples: Dict[str, Deque[float]] = {}
+        self._lock = threading.Lock()
+
+    def record(self, tier: str, seconds: float) -> None:
+        """Record a completed call duration for a tier."""
+        with self._lock:
+            samples = self._samples.setdefault(tier, deque(maxlen=self.window_size))
+            samples.append(seconds)
+
+    def percentile(self, tier: str, pct: float = 0.9) -> Optional[float]:
+        """
+        Get a latency percentile for a tier.
+
+        Args:
+            tier: Model tier name
+            pct: Percentile as a fraction (0.0-1.0)
+
+        Returns:
+            Optional[float]: Latency in seconds, or None if too few samples
+        """
+        with self._lock:
+            samples = sorted(self._samples.get(tier, ()))
+        if len(samples) < settings.LATENCY_MIN_SAMPLES:
+            return None
+        index = min(len(samples) - 1, int(pct * len(samples)))
+        return samples[index]
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Get sample counts and p90 latency for every tier seen so far."""
+        with self._lock:
+            tiers = list(self._samples.keys())
+        return {
+            tier: {"samples": len(self._samples[tier]), "p90_seconds": self.percentile(tier)}
+            for tier in tiers
+        }
+
+
+class ModelRouter:
+    """Routing policy plus a pool of pre-built LLM clients, one per tier."""
+
+    def __init__(self):
+        self.latency = LatencyTracker()
+        self._clients: Dict[str, Any] = {}
+
+    def initialize(self, client_factory: Callable[[str, int], Any]) -> None:
+        """
+        Build one LLM client per configured tier.
+
+        Args:
+            client_factory: Callable taking (model, max_tokens) and returning a client
+        """
+        tiers = settings.MODEL_TIERS if settings.ENABLE_MODEL_ROUTING else {
+            settings.DEFAULT_MODEL_TIER: settings.MODEL_TIERS[settings.DEFAULT_MODEL_TIER]
+        }
+        self._clients = {
+            tier: client_factory(tier_config["model"], tier_config["max_tokens"])
+            for tier, tier_config in tiers.items()
+        }
+        analysis_logger.info(f"Initialized LLM client pool with tiers: {', '.join(self._clients)}")
+
+    @property
+    def is_initialized(self) -> bool:
+        """Whether the client pool has been built."""
+        return bool(self._clients)
+
+    @property
+    def default_client(self) -> Any:
+        """Get the client for the default tier."""
+        return self._clients.get(settings.DEFAULT_MODEL_TIER)
+
+    def client_for(self, route: AnalysisRoute) -> Any:
+        """Get the pooled client serving a route."""
+        client = self._clients.get(route.tier)
+        if client is None:
+            client = self._clients[settings.DEFAULT_MODEL_TIER]
+        return client
+
+    def record_latency(self, route: AnalysisRoute, seconds: float) -> None:
+        """Feed an observed call duration back into the routing policy."""
+        self.latency.record(route.tier, seconds)
+
+    @contextmanager
+    def track_call(self, route: Optional[AnalysisRoute], budget: float) -> Iterator[None]:
+        """
+        Record the duration of the LLM call in the block, whether or not it succeeds.
+
+        A call that ran out of its deadline counts as at least its budget, so an
+        upstream slowdown reaches the p90 even when no slow call succeeds.
+        Calls rejected before reaching the LLM (open breaker, no budget left)
+        are not recorded.
+
+        Args:
+            route: Route of the call; nothing is recorded when None
+            budget: Seconds the call was allowed to take
+        """
+        started_at = time.monotonic()
+        try:
+            yield
+        except CircuitOpenError:
+            raise
+        except LLMDeadlineExceeded:
+            if route is not None and budget > 0:
+                self.record_latency(route, max(time.monotonic() - started_at, budget))
+            raise
+        except Exception:
+            if route is not None:
+                self.record_latency(route, time.monotonic() - started_at)
+            raise
+        if route is not None:
+            self.record_latency(route, time.monotonic() - started_at)
+
+    def select_route(self, content: str, account_type: AccountType = AccountType.FREE) -> AnalysisRoute:
+        """
+        Pick the model tier for an article.
+
+        Short articles go to the fast tier, long ones to the deep tier, and
+        medium-length articles go to the deep tier for premium accounts and
+        the standard tier otherwise. If the chosen tier is currently missing
+        its latency SLO, the route steps down to a faster tier that is not.
+
+        Args:
+            content: Article content to analyze
+            account_type: Account type of the requesting user
+
+        Returns:
+            AnalysisRoute: Selected tier, model and token limit
+        """
+        if not settings.ENABLE_MODEL_ROUTING:
+            return self._build_route(settings.DEFAULT_MODEL_TIER, "routing disabled")
+
+        word_count = len(content.split()) if content else 0
+
+        if word_count <= settings.ROUTING_SHORT_ARTICLE_WORDS:
+            tier, reason = "fast", f"short article ({word_count} words)"
+        elif word_count > settings.ROUTING_LONG_ARTICLE_WORDS:
+            tier, reason = "deep", f"long article ({word_count} words)"
+        elif account_type == AccountType.PREMIUM:
+            tier, reason = "deep", f"premium account, {word_count} words"
+        else:
+            tier, reason = "standard", f"free account, {word_count} words"
+
+        return self._apply_latency_slo(tier, reason)
+
+    def _apply_latency_slo(self, tier: str, reason: str) -> AnalysisRoute:
+        """Step down to a faster tier while the chosen tier is over its latency SLO."""
+        order = settings.MODEL_TIER_ORDER
+        index = order.index(tier)
+
+        p90 = self.latency.percentile(tier)
+        if p90 is None or p90 <= settings.LATENCY_SLO_SECONDS:
+            return self._build_route(tier, reason)
+
+        for candidate in reversed(order[:index]):
+            candidate_p90 = self.latency.percentile(candidate)
+            if candidate_p90 is None or candidate_p90 <= settings.LATENCY_SLO_SECONDS:
+                return self._build_route(
+                    candidate,
+                    f"{reason}; {tier} tier p90 {p90:.1f}s over {settings.LATENCY_SLO_SECONDS:.0f}s SLO"
+                )
+
+        return self._build_route(tier, f"{reason}; all faster tiers over SLO")
+
+    def _build_route(self, tier: str, reason: str) -> AnalysisRoute:
+        tier_config = settings.MODEL_TIERS[tier]
+        return AnalysisRoute(
+            tier=tier,
+            model=tier_config["model"],
+            max_tokens=tier_config["max_tokens"],
+            reason=reason,
+        )
+
+
+# Global router instance
+model_router = ModelRouter()
@@ -0,0 +1,350 @@
+"""
+Priority-aware admission control for LLM calls.
+
+Every analysis that needs the LLM takes a slot from `llm_scheduler` first.
+Slots are handed out by stride scheduling over one queue per account type,
+so under saturation premium requests get `weight` times the share of free
+requests instead of waiting behind them, and no single user can hold more
+than a few slots at once.
+"""
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Iterator, List, Optional, Tuple
+
+from config import settings
+from logger import analysis_logger
+from models import AccountType
+from resilience import LLMUnavailableError
+from routing import LatencyTracker
+
+
+class SchedulerQueueFullError(LLMUnavailableError):
+    """Raised when a request cannot be queued because its class queue is full."""
+
+
+class SchedulerQueueTimeout(LLMUnavailableError):
+    """Raised when a request waited longer than the queue timeout for a slot."""
+
+
+class SchedulerTicket:
+    """A request waiting for, or holding, an LLM slot."""
+
+    def __init__(self, user_id: Optional[str], priority_class: str):
+        self.user_id = user_id
+        self.priority_class = priority_class
+        self.enqueued_at = time.monotonic()
+        self.granted = False
+        self.released = False
+        self._event = threading.Event()
+        self._waiters: List[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = []
+        self._lock = threading.Lock()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Block until the slot is granted.
+
+        Args:
+            timeout: Seconds to wait, or None to wait indefinitely
+
+        Returns:
+            bool: True if the slot was granted
+        """
+        return self._event.wait(timeout)
+
+    async def wait_async(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait for the slot without blocking the event loop.
+
+        Args:
+            timeout: Seconds to wait, or None to wait indefinitely
+
+        Returns:
+            bool: True if the slot was granted
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._lock:
+            if self._event.is_set():
+                return True
+            self._waiters.append((loop, future))
+        try:
+            await asyncio.wait_for(future, timeout)
+            return True
+        except asyncio.TimeoutError:
+            return self._event.is_set()
+        finally:
+            # Timed out or cancelled: don't keep the dead future until the grant
+            with self._lock:
+                if (loop, future) in self._waiters:
+                    self._waiters.remove((loop, future))
+
+    def _grant(self) -> None:
+        with self._lock:
+            self.granted = True
+            self._event.set()
+            waiters, self._waiters = self._waiters, []
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(_resolve_future, future)
+
+
+def _resolve_future(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(True)
+
+
+class LLMScheduler:
+    """
+    Weighted-fair scheduler handing out a fixed number of LLM slots.
+
+    Each priority class (account type) has a FIFO queue and a pass value
+    that advances by 1/weight whenever the class is granted a slot; the
+    eligible class with the lowest pass goes next. A class that was idle
+    re-enters at the current virtual time so it cannot bank credit.
+    """
+
+    def __init__(
+        self,
+        capacity: int = settings.LLM_SCHEDULER_CONCURRENCY,
+        weights: Optional[Dict[str, int]] = None,
+        per_user_limit: int = settings.LLM_SCHEDULER_PER_USER_LIMIT,
+        max_queue_per_class: int = settings.LLM_SCHEDULER_MAX_QUEUE_PER_CLASS
+    ):
+        self.capacity = capacity
+        self.weights = weights or settings.LLM_SCHEDULER_WEIGHTS
+        self.per_user_limit = per_user_limit
+        self.max_queue_per_class = max_queue_per_class
+        self.wait_times = LatencyTracker()
+        self._queues: Dict[str, Deque[SchedulerTicket]] = {}
+        self._pass: Dict[str, float] = {}
+        self._running: Dict[str, int] = {}
+        self._running_per_user: Dict[str, int] = {}
+        self._running_total = 0
+        self._virtual_time = 0.0
+        self._lock = threading.Lock()
+
+    def submit(self, user_id: Optional[str], account_type: AccountType = AccountType.FREE) -> SchedulerTicket:
+        """
+        Queue a request for an LLM slot; it may be granted immediately.
+
+        Args:
+            user_id: Identifier of the requesting user (None disables the per-user cap)
+            account_type: Account type, which selects the priority class
+
+        Returns:
+            SchedulerTicket: Ticket to wait on and release
+
+        Raises:
+            SchedulerQueueFullError: If the class queue is at its limit
+        """
+        priority_class = AccountType(account_type).value
+        ticket = SchedulerTicket(user_id, priority_class)
+        with self._lock:
+            queue = self._queues.setdefault(priority_class, deque())
+            if len(queue) >= self.max_queue_per_class:
+                raise SchedulerQueueFullError(
+                    f"LLM queue for {priority_class} accounts is full",
+                    retry_after=settings.LLM_SCHEDULER_RETRY_AFTER
+                )
+            if not queue and not self._running.get(priority_class):
+                self._pass[priority_class] = max(self._pass.get(priority_class, 0.0), self._virtual_time)
+            queue.append(ticket)
+            self._dispatch()
+        return ticket
+
+    def release(self, ticket: SchedulerTicket) -> None:
+        """
+        Give back a slot, or withdraw a ticket that is still queued. Idempotent.
+
+        Args:
+            ticket: Ticket returned by submit()
+        """
+        with self._lock:
+            if ticket.released:
+                return
+            ticket.released = True
+            if ticket.granted:
+                self._running_total -= 1
+                self._running[ticket.priority_class] -= 1
+                if ticket.user_id is not None:
+                    self._running_per_user[ticket.user_id] -= 1
+                    if not self._running_per_user[ticket.user_id]:
+                        del self._running_per_user[ticket.user_id]
+            else:
+                try:
+                    self._queues[ticket.priority_class].remove(ticket)
+                except ValueError:
+                    pass
+            self._dispatch()
+
+    def position(self, ticket: SchedulerTicket) -> int:
+        """
+        Estimate how many slots will be granted before (and including) this ticket.
+
+        Args:
+            ticket: Queued ticket
+
+        Returns:
+            int: 1-based queue position, or 0 once the slot is granted
+        """
+        with self._lock:
+            if ticket.granted or ticket.released:
+                return 0
+            own_queue = self._queues.get(ticket.priority_class, ())
+            try:
+                index = own_queue.index(ticket)
+            except ValueError:
+                return 0
+            own_weight = self._weight(ticket.priority_class)
+            ahead = index
+            for priority_class, queue in self._queues.items():
+                if priority_class != ticket.priority_class:
+                    share = math.floor((index + 1) * self._weight(priority_class) / own_weight)
+                    ahead += min(len(queue), share)
+            return ahead + 1
+
+    @contextmanager
+    def slot(
+        self,
+        user_id: Optional[str],
+        account_type: AccountType = AccountType.FREE,
+        timeout: float = settings.LLM_SCHEDULER_QUEUE_TIMEOUT
+    ) -> Iterator[SchedulerTicket]:
+        """
+        Hold an LLM slot for the duration of a blocking call.
+
+        Raises:
+            SchedulerQueueFullError: If the class queue is full
+            SchedulerQueueTimeout: If no slot was granted within the timeout
+        """
+        ticket = self.submit(user_id, account_type)
+        try:
+            if not ticket.wait(timeout):
+                raise SchedulerQueueTimeout(
+                    f"No LLM slot became available within {timeout:.0f}s",
+                    retry_after=settings.LLM_SCHEDULER_RETRY_AFTER
+                )
+            yield ticket
+        finally:
+            self.release(ticket)
+
+    async def acquire(
+        self,
+        user_id: Optional[str],
+        account_type: AccountType = AccountType.FREE,
+        timeout: float = settings.LLM_SCHEDULER_QUEUE_TIMEOUT
+    ) -> SchedulerTicket:
+        """
+        Wait for an LLM slot on the event loop, without holding a thread.
+
+        Args:
+            user_id: Identifier of the requesting user (None disables the per-user cap)
+            account_type: Account type, which selects the priority class
+            timeout: Seconds to wait for the slot
+
+        Returns:
+            SchedulerTicket: Granted ticket; the caller must release() it
+
+        Raises:
+            SchedulerQueueFullError: If the class queue is full
+            SchedulerQueueTimeout: If no slot was granted within the timeout
+        """
+        ticket = self.submit(user_id, account_type)
+        try:
+            if not await ticket.wait_async(timeout):
+                raise SchedulerQueueTimeout(
+                    f"No LLM slot became available within {timeout:.0f}s",
+                    retry_after=settings.LLM_SCHEDULER_RETRY_AFTER
+                )
+        except BaseException:
+            # Timed out or cancelled (possibly just after the grant): give the slot back
+            self.release(ticket)
+            raise
+        return ticket
+
+    async def queue_positions(
+        self,
+        ticket: SchedulerTicket,
+        interval: float = settings.LLM_SCHEDULER_POSITION_INTERVAL,
+        timeout: float = settings.LLM_SCHEDULER_QUEUE_TIMEOUT
+    ) -> AsyncIterator[int]:
+        """
+        Wait for a ticket's slot, yielding its queue position periodically.
+
+        Args:
+            ticket: Ticket returned by submit()
+            interval: Seconds between position updates
+            timeout: Seconds to wait before giving up
+
+        Yields:
+            int: Current 1-based queue position while still waiting
+
+        Raises:
+            SchedulerQueueTimeout: If no slot was granted within the timeout
+        """
+        expires_at = ticket.enqueued_at + timeout
+        while not ticket.granted:
+            position = self.position(ticket)
+            if position:
+                yield position
+            remaining = expires_at - time.monotonic()
+            if remaining <= 0:
+                raise SchedulerQueueTimeout(
+                    f"No LLM slot became available within {timeout:.0f}s",
+                    retry_after=settings.LLM_SCHEDULER_RETRY_AFTER
+                )
+            await ticket.wait_async(min(interval, remaining))
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Get queue depths, running counts and p95 queue wait per priority class."""
+        with self._lock:
+            classes = {
+                priority_class: {
+                    "queued": len(self._queues.get(priority_class, ())),
+                    "running": self._running.get(priority_class, 0),
+                }
+                for priority_class in set(self._queues) | set(self._running)
+            }
+            running_total = self._running_total
+        for priority_class, stats in classes.items():
+            stats["wait_p95_seconds"] = self.wait_times.percentile(priority_class, 0.95)
+        return {"capacity": self.capacity, "running": running_total, "classes": classes}
+
+    def _weight(self, priority_class: str) -> int:
+        return max(1, self.weights.get(priority_class, 1))
+
+    def _dispatch(self) -> None:
+        """Grant slots while capacity remains and some queued ticket is eligible."""
+        while self._running_total < self.capacity:
+            ticket = self._next_eligible()
+            if ticket is None:
+                return
+            priority_class = ticket.priority_class
+            self._virtual_time = self._pass[priority_class]
+            self._pass[priority_class] += 1.0 / self._weight(priority_class)
+            self._running_total += 1
+            self._running[priority_class] = self._running.get(priority_class, 0) + 1
+            if ticket.user_id is not None:
+                self._running_per_user[ticket.user_id] = self._running_per_user.get(ticket.user_id, 0) + 1
+            waited = time.monotonic() - ticket.enqueued_at
+            self.wait_times.record(priority_class, waited)
+            if waited >= 1.0:
+                analysis_logger.debug("LLM slot granted to %s request after %.1fs in queue", priority_class, waited)
+            ticket._grant()
+
+    def _next_eligible(self) -> Optional[SchedulerTicket]:
+        """Pop the first ticket under its user's cap from the class with the lowest pass."""
+        for priority_class in sorted(self._queues, key=lambda name: self._pass.get(name, 0.0)):
+            queue = self._queues[priority_class]
+            for ticket in queue:
+                if ticket.user_id is None or self._running_per_user.get(ticket.user_id, 0) < self.per_user_limit:
+                    queue.remove(ticket)
+                    return ticket
+        return None
+
+
+# Global scheduler shared by all analysis paths
+llm_scheduler = LLMScheduler()
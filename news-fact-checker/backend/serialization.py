@@ -0,0 +1,74 @@
+"""
+Shared serialization helpers for SSE, NDJSON and JSON responses.
+
+Events are serialized straight to JSON by Pydantic's Rust core
+(`model_dump_json`) instead of being dumped to a dict and re-encoded with
+`json.dumps`. JSON endpoints use orjson when it is installed.
+"""
+from typing import Iterator, Optional, Tuple
+
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import BaseModel
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
+
+SSE_DATA_PREFIX = "data: "
+SSE_EVENT_TERMINATOR = "\n\n"
+
+
+def sse_event(event: BaseModel) -> str:
+    """
+    Frame a streaming event model as a Server-Sent Event.
+
+    Args:
+        event: Event model to send
+
+    Returns:
+        str: "data: <json>\\n\\n"
+    """
+    return SSE_DATA_PREFIX + event.model_dump_json() + SSE_EVENT_TERMINATOR
+
+
+def ndjson_line(model: BaseModel) -> str:
+    """
+    Serialize a model as one newline-delimited JSON line.
+
+    Args:
+        model: Model to send
+
+    Returns:
+        str: "<json>\\n"
+    """
+    return model.model_dump_json() + "\n"
+
+
+def iter_sse_frames(chunk: str) -> Iterator[Tuple[Optional[str], Optional[str]]]:
+    """
+    Split SSE text (one or more frames) into (event id, data) pairs.
+
+    Comment-only frames such as keepalives yield (None, None).
+
+    Args:
+        chunk: SSE-formatted text as produced by sse_event()
+
+    Yields:
+        Tuple[Optional[str], Optional[str]]: Event id and JSON data of each frame
+    """
+    for frame in chunk.split(SSE_EVENT_TERMINATOR):
+        if not frame:
+            continue
+        event_id = data = None
+        for line in frame.split("\n"):
+            if line.startswith("id: "):
+                event_id = line[len("id: "):]
+            elif line.startswith(SSE_DATA_PREFIX):
+                data = line[len(SSE_DATA_PREFIX):]
+        yield event_id, data
+
+
+# Default response class for JSON endpoints
+FastJSONResponse = ORJSONResponse if orjson is not None else JSONResponse
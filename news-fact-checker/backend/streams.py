@@ -0,0 +1,147 @@
+"""
+Admission control and housekeeping for Server-Sent Event streams.
+
+`stream_manager` caps the number of concurrent SSE responses
+(MAX_CONCURRENT_STREAMS), sends comment heartbeats while a stream is idle
+(STREAM_KEEPALIVE_INTERVAL) so proxies keep the connection open during long
+LLM waits, and ends streams that run past STREAM_TIMEOUT.
+"""
+import asyncio
+import time
+import weakref
+from typing import Any, AsyncGenerator, AsyncIterator, Dict, Optional
+
+from config import settings
+from logger import app_logger
+from models import AnalysisError
+from serialization import sse_event
+
+
+KEEPALIVE_COMMENT = ": keepalive\n\n"
+
+
+class StreamLease:
+    """A slot held by one open stream."""
+
+    def __init__(self, manager: "StreamManager"):
+        self.manager = manager
+        self.opened_at = time.monotonic()
+        self.released = False
+
+    def release(self) -> None:
+        """Give the slot back. Idempotent."""
+        if not self.released:
+            self.released = True
+            self.manager._active -= 1
+
+
+class StreamManager:
+    """Tracks open SSE streams and wraps their event generators."""
+
+    def __init__(
+        self,
+        max_streams: int = settings.MAX_CONCURRENT_STREAMS,
+        timeout: float = settings.STREAM_TIMEOUT,
+        keepalive_interval: float = settings.STREAM_KEEPALIVE_INTERVAL
+    ):
+        self.max_streams = max_streams
+        self.timeout = timeout
+        self.keepalive_interval = keepalive_interval
+        self._active = 0
+        self._admitted = 0
+        self._rejected = 0
+        self._timed_out = 0
+
+    @property
+    def active_count(self) -> int:
+        """Number of streams currently open."""
+        return self._active
+
+    def admit(self) -> Optional[StreamLease]:
+        """
+        Reserve a stream slot.
+
+        Returns:
+            Optional[StreamLease]: Lease to pass to stream(), or None if the limit is reached
+        """
+        if self._active >= self.max_streams:
+            self._rejected += 1
+            return None
+        self._active += 1
+        self._admitted += 1
+        return StreamLease(self)
+
+    def stream(self, lease: StreamLease, events: AsyncIterator[str]) -> AsyncGenerator[str, None]:
+        """
+        Relay events with heartbeats and a timeout, releasing the lease at the end.
+
+        The lease is also released when the returned generator is dropped
+        without ever being iterated (e.g. the response body was never sent),
+        since a generator's finally block only runs once it has started.
+
+        Args:
+            lease: Lease returned by admit()
+            events: SSE-formatted events to relay
+
+        Returns:
+            AsyncGenerator[str, None]: The relayed events, keepalive comments
+            while idle, and an error event if the stream timed out
+        """
+        relay = self._relay(lease, events)
+        weakref.finalize(relay, lease.release)
+        return relay
+
+    async def _relay(self, lease: StreamLease, events: AsyncIterator[str]) -> AsyncGenerator[str, None]:
+        loop = asyncio.get_running_loop()
+        expires_at = loop.time() + self.timeout
+        iterator = events.__aiter__()
+        pending: Optional[asyncio.Future] = None
+        try:
+            while True:
+                remaining = expires_at - loop.time()
+                if remaining <= 0:
+                    self._timed_out += 1
+                    app_logger.warning(f"Closing stream after {self.timeout:.0f}s timeout")
+                    timeout_event = AnalysisError(
+                        error_code="STREAM_TIMEOUT",
+                        error_details=f"Stream exceeded {self.timeout:.0f} seconds",
+                        message="Streaming analysis timed out"
+                    )
+                    yield sse_event(timeout_event)
+                    return
+
+                if pending is None:
+                    pending = asyncio.ensure_future(iterator.__anext__())
+                done, _ = await asyncio.wait({pending}, timeout=min(self.keepalive_interval, remaining))
+                if not done:
+                    if remaining > self.keepalive_interval:
+                        yield KEEPALIVE_COMMENT
+                    continue
+
+                future, pending = pending, None
+                try:
+                    event = future.result()
+                except StopAsyncIteration:
+                    return
+                yield event
+        finally:
+            if pending is not None:
+                pending.cancel()
+                await asyncio.gather(pending, return_exceptions=True)
+            if hasattr(iterator, "aclose"):
+                await iterator.aclose()
+            lease.release()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Get live and cumulative stream counts."""
+        return {
+            "active": self._active,
+            "max": self.max_streams,
+            "admitted": self._admitted,
+            "rejected": self._rejected,
+            "timed_out": self._timed_out,
+        }
+
+
+# Global stream manager instance
+stream_manager = StreamManager()
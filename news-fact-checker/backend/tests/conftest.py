@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Backend modules use flat imports (e.g. `from config import settings`)
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
@@ -0,0 +1,138 @@
+import asyncio
+import json
+
+from analysis_runs import AnalysisRun, AnalysisRunRegistry
+from logger import request_id_var
+from models import AnalysisProgress
+from serialization import sse_event
+
+
+async def slow_events(finished, count=3, delay=0.01):
+    for index in range(count):
+        await asyncio.sleep(delay)
+        yield f"data: {index}\n\n"
+    finished.append(True)
+
+
+def test_run_completes_after_subscriber_disconnects():
+    async def scenario():
+        registry = AnalysisRunRegistry()
+        finished = []
+        run = registry.start("https://example.com/a", lambda: slow_events(finished))
+
+        subscription = run.subscribe()
+        first = await subscription.__anext__()
+        await subscription.aclose()  # Client went away
+
+        await run.task
+        return first, finished, registry.active_count
+
+    first, finished, active = asyncio.run(scenario())
+    assert first.endswith("\ndata: 0\n\n")
+    assert finished == [True]
+    assert active == 0
+
+
+def test_late_subscribers_join_and_replay():
+    async def scenario():
+        registry = AnalysisRunRegistry()
+        started = []
+
+        def factory():
+            started.append(True)
+            return slow_events([])
+
+        run = registry.start("https://example.com/a", factory)
+        early = asyncio.create_task(_collect(run.subscribe()))
+        await asyncio.sleep(0.025)
+        joined = registry.start("https://example.com/a", factory)
+        late = await _collect(joined.subscribe())
+        return started, await early, late
+
+    started, early, late = asyncio.run(scenario())
+    assert len(started) == 1
+    assert early == late
+    assert [event.split("\n", 1)[1] for event in late] == [f"data: {index}\n\n" for index in range(3)]
+
+
+def test_failed_run_emits_error_event():
+    async def failing():
+        yield "data: start\n\n"
+        raise RuntimeError("boom")
+
+    async def scenario():
+        registry = AnalysisRunRegistry()
+        run = registry.start("https://example.com/a", failing)
+        return await _collect(run.subscribe())
+
+    events = asyncio.run(scenario())
+    error = json.loads(events[-1].split("data: ", 1)[1])
+    assert error["event_type"] == "error" and error["error_details"] == "boom"
+
+
+async def _collect(subscription):
+    return [event async for event in subscription]
+
+
+def test_joiners_get_events_stamped_with_their_own_request_id():
+    async def progress_events():
+        for step in ("fetching", "analyzing"):
+            await asyncio.sleep(0.01)
+            yield sse_event(AnalysisProgress(progress_percentage=0.5, current_step=step))
+
+    async def subscribe_as(request_id, run):
+        token = request_id_var.set(request_id)
+        try:
+            return await asyncio.create_task(_collect(run.subscribe()))
+        finally:
+            request_id_var.reset(token)
+
+    async def scenario():
+        registry = AnalysisRunRegistry()
+        token = request_id_var.set("req-first")
+        try:
+            run = registry.start("https://example.com/a", progress_events)
+        finally:
+            request_id_var.reset(token)
+        return await asyncio.gather(subscribe_as("req-first", run), subscribe_as("req-joiner", run))
+
+    first, joiner = asyncio.run(scenario())
+
+    def request_ids(events):
+        return [json.loads(event.split("data: ", 1)[1])["request_id"] for event in events]
+
+    assert request_ids(first) == ["req-first", "req-first"]
+    assert request_ids(joiner) == ["req-joiner", "req-joiner"]
+
+
+def test_reconnect_resumes_after_last_event_id():
+    async def scenario():
+        registry = AnalysisRunRegistry(event_log_ttl=60)
+        run = registry.start("https://example.com/a", lambda: slow_events([], count=4, delay=0))
+        first_two = []
+        async for event in run.subscribe():
+            first_two.append(event)
+            if len(first_two) == 2:
+                break
+        await run.task
+
+        last_event_id = first_two[-1].split("\n", 1)[0][len("id: "):]
+        resumed_run, last_seq = registry.resume(last_event_id, "https://example.com/a")
+        rest = await _collect(resumed_run.subscribe(after_seq=last_seq))
+        return last_event_id, rest, registry
+
+    last_event_id, rest, registry = asyncio.run(scenario())
+    assert [event.split("\n", 1)[1] for event in rest] == ["data: 2\n\n", "data: 3\n\n"]
+    assert registry.resume(last_event_id, "https://example.com/other") is None
+    assert registry.resume("garbage", "https://example.com/a") is None
+
+
+def test_event_log_is_bounded():
+    async def scenario():
+        run = AnalysisRun("https://example.com/a", max_events=2)
+        await run.run(slow_events([], count=5, delay=0))
+        return await _collect(run.subscribe(after_seq=0))
+
+    events = asyncio.run(scenario())
+    assert [event.split("\n", 1)[0] for event in events][-1].endswith(":4")
+    assert len(events) == 2
@@ -0,0 +1,74 @@
+from anchoring import AhoCorasick, anchor_issues, find_spans, normalize_with_offsets
+from models import Issue
+
+CONTENT = (
+    "The minister said “unemployment fell to 3.5% in May,”  according to officials.\n"
+    "Critics disputed   the figures.  Growth — they argued — was flat."
+)
+
+
+def make_issue(text):
+    return Issue(text=text, explanation="explanation", confidence_score=0.8)
+
+
+def test_aho_corasick_finds_first_occurrence_of_each_pattern():
+    matcher = AhoCorasick(["he", "she", "his", "hers", ""])
+    assert matcher.find_first("ushers and his") == {1: 1, 0: 2, 3: 2, 2: 11}
+
+
+def test_normalization_tracks_original_offsets():
+    normalized, offsets = normalize_with_offsets("A  “B”")
+    assert normalized == 'a "b"'
+    assert offsets == [0, 1, 3, 4, 5]
+
+
+def test_exact_match_gets_offsets():
+    issue = anchor_issues([make_issue("Critics disputed   the figures.")], CONTENT)[0]
+    assert CONTENT[issue.start_offset:issue.end_offset] == "Critics disputed   the figures."
+
+
+def test_normalized_match_is_replaced_with_verbatim_text():
+    [issue] = anchor_issues([make_issue('"Unemployment fell to 3.5% in May," according')], CONTENT)
+    assert issue.text == "“unemployment fell to 3.5% in May,”  according"
+    assert CONTENT[issue.start_offset:issue.end_offset] == issue.text
+
+
+def test_dash_and_whitespace_variants_match():
+    spans = find_spans(["Growth - they argued - was flat.", "critics disputed the figures"], CONTENT)
+    assert all(span is not None for span in spans)
+
+
+def test_unanchorable_issues_are_dropped_and_general_context_kept():
+    issues = [make_issue("Inflation doubled last year."), make_issue("GENERAL CONTEXT"), make_issue("Critics disputed")]
+    anchored = anchor_issues(issues, CONTENT)
+    assert [issue.text for issue in anchored] == ["GENERAL CONTEXT", "Critics disputed"]
+    assert anchored[0].start_offset is None
+
+
+def test_paraphrased_issue_is_reanchored_to_verbatim_sentence():
+    paragraphs = [
+        "The council approved the budget on Tuesday. It includes a 12% rise in transit spending.",
+        "Opponents said the plan ignores housing. A final vote is expected next month.",
+    ]
+    content = "\n\n".join(paragraphs)
+    [issue] = anchor_issues([make_issue("The budget includes a 12 percent rise in transit spending")], content, paragraphs)
+    assert issue.text == "It includes a 12% rise in transit spending."
+    assert content[issue.start_offset:issue.end_offset] == issue.text
+
+
+def test_unrelated_text_is_not_fuzzy_anchored():
+    paragraphs = ["The council approved the budget on Tuesday. It includes a 12% rise in transit spending."]
+    assert anchor_issues([make_issue("Scientists discovered water on Mars")], paragraphs[0], paragraphs) == []
+
+
+def test_fuzzy_anchoring_is_fast_on_long_articles():
+    import time
+    from utils import split_into_paragraphs
+
+    sentences = [f"Sentence number {i} reports that metric {i % 97} changed by {i % 13} points." for i in range(800)]
+    content = "\n\n".join(" ".join(sentences[i:i + 8]) for i in range(0, len(sentences), 8))
+    paragraphs = split_into_paragraphs(content)
+    started = time.perf_counter()
+    [issue] = anchor_issues([make_issue("Sentence 431 reported metric 43 changing by 2 points")], content, paragraphs)
+    assert time.perf_counter() - started < 0.5
+    assert issue.text.startswith("Sentence number 431")
@@ -0,0 +1,38 @@
+from datetime import datetime
+
+from mongomock import MongoClient as MockMongoClient
+
+from auth import increment_user_usage_bulk, remaining_article_allowance
+from models import AccountType
+
+
+def make_users(account_type=AccountType.FREE):
+    users = MockMongoClient()["test_db"]["users"]
+    users.insert_one({
+        "email": "a@b.com",
+        "account_type": account_type.value,
+        "monthly_usage": 2,
+        "usage_reset_date": datetime(2099, 1, 1),
+        "analyzed_articles": ["https://example.com/old", "https://example.com/older"],
+    })
+    return users
+
+
+def test_bulk_usage_counts_only_new_articles_once():
+    users = make_users()
+    urls = ["https://example.com/old", "https://example.com/new", "https://example.com/new", "https://example.com/other"]
+
+    assert increment_user_usage_bulk(users, "a@b.com", urls) == 2
+    user_doc = users.find_one({"email": "a@b.com"})
+    assert user_doc["monthly_usage"] == 4
+    assert user_doc["analyzed_articles"][-2:] == ["https://example.com/new", "https://example.com/other"]
+    assert remaining_article_allowance(user_doc) == 6
+
+
+def test_premium_usage_is_unlimited():
+    users = make_users(AccountType.PREMIUM)
+
+    increment_user_usage_bulk(users, "a@b.com", ["https://example.com/new"])
+    user_doc = users.find_one({"email": "a@b.com"})
+    assert user_doc["monthly_usage"] == 2
+    assert remaining_article_allowance(user_doc) is None
@@ -0,0 +1,47 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "benchmarks")))
+
+import harness  # noqa: E402
+
+RUN_PATH = os.path.join(os.path.dirname(harness.__file__), "run.py")
+
+
+def test_every_benchmark_runs_and_has_a_baseline(monkeypatch):
+    # Keep the run independent of (and away from) any local mongod; its benchmarks are reported as skipped
+    monkeypatch.setenv("BENCH_MONGODB_URL", "mongodb://127.0.0.1:1")
+    benchmarks = harness.discover()
+    report = harness.run(benchmarks, repeat=1, number=1)
+
+    baseline = harness.load_baseline()
+    assert baseline is not None
+    names = {benchmark.name for benchmark in benchmarks}
+    assert set(baseline["results"]) <= names
+    for name, result in report["results"].items():
+        assert "skipped" in result or (result["relative"] > 0 and name in baseline["results"])
+    assert all("skipped" in result for name, result in report["results"].items() if ".mongod." in name)
+
+
+def test_compare_flags_regressions_beyond_the_tolerance():
+    baseline = {"results": {"a": {"relative": 1.0}, "b": {"relative": 1.0}, "c": {"relative": 1.0}}}
+    report = {"results": {
+        "a": {"seconds": 1e-6, "relative": 1.2},
+        "b": {"seconds": 1e-6, "relative": 1.5},
+        "c": {"seconds": 1e-6, "relative": 0.5},
+        "d": {"seconds": 1e-6, "relative": 1.0},
+        "e": {"skipped": "no mongod"},
+    }}
+    statuses = {row["name"]: row["status"] for row in harness.compare(report, baseline, tolerance=0.3)}
+    assert statuses == {"a": "ok", "b": "regression", "c": "improvement", "d": "new", "e": "skipped"}
+
+
+@pytest.mark.skipif(os.getenv("RUN_BENCHMARKS") != "1", reason="timing-sensitive; set RUN_BENCHMARKS=1 to run")
+def test_run_check_finds_no_regressions():
+    # The regression gate itself: `python benchmarks/run.py --check` against baselines.json
+    env = dict(os.environ, BENCH_MONGODB_URL=os.getenv("BENCH_MONGODB_URL", "mongodb://127.0.0.1:1"))
+    result = subprocess.run([sys.executable, RUN_PATH, "--check"], capture_output=True, text=True, env=env)
+    assert result.returncode == 0, result.stdout + result.stderr
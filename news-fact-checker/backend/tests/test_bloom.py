@@ -0,0 +1,93 @@
+from datetime import datetime, timedelta, timezone
+
+import mongomock
+
+from bloom import BloomFilter, CachedUrlFilter, bloom_positions, capacity_for
+from config import settings
+from utils import find_cached_urls
+
+
+ISSUE = {"text": "claim", "explanation": "wrong", "confidence_score": 0.5}
+
+
+def cache(collection, url, created_at, issues=(ISSUE,)):
+    collection.insert_one({"url": url, "canonical_url": url, "issues": list(issues), "created_at": created_at})
+
+
+def test_bloom_filter_membership_and_sizing():
+    bloom = BloomFilter(1000, error_rate=0.01)
+    urls = [f"https://news.example/{index}" for index in range(1000)]
+    for url in urls:
+        bloom.add(url)
+
+    assert all(url in bloom for url in urls)
+    false_positives = sum(f"https://other.example/{index}" in bloom for index in range(10000))
+    assert false_positives < 300
+    assert bloom.num_bits % 8 == 0 and bloom.num_hashes == 7
+    assert capacity_for(0) == settings.BLOOM_MIN_CAPACITY
+    assert capacity_for(settings.BLOOM_MIN_CAPACITY) == settings.BLOOM_MIN_CAPACITY * 2
+
+
+def test_refresh_and_delta_updates():
+    collection = mongomock.MongoClient().db.analyses
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    cache(collection, "https://news.example/a", start)
+    cache(collection, "https://news.example/empty", start, issues=())
+
+    url_filter = CachedUrlFilter()
+    url_filter.initialize(collection)
+    url_filter.refresh()
+    old_version = url_filter.version
+    client_bits = bytearray(url_filter.filter.bits)
+    assert "https://news.example/a" in url_filter.filter
+    assert url_filter.delta(old_version) == (old_version, [])
+
+    cache(collection, "https://news.example/b", start + timedelta(hours=1))
+    url_filter.refresh()
+    assert url_filter.version != old_version
+    version, set_bits = url_filter.delta(old_version)
+    assert version == url_filter.version
+
+    # Applying the delta brings the client's copy in line with the server's
+    for position in set_bits:
+        client_bits[position >> 3] |= 1 << (position & 7)
+    assert client_bits == url_filter.filter.bits
+    bloom = url_filter.filter
+    assert set(bloom_positions("https://news.example/b", bloom.num_bits, bloom.num_hashes)) <= set(set_bits)
+
+    assert url_filter.delta("8.1.0") is None
+    assert url_filter.delta("garbage") is None
+
+
+def test_out_of_order_commits_change_the_version():
+    collection = mongomock.MongoClient().db.analyses
+    start = datetime(2026, 1, 1, tzinfo=timezone.utc)
+    cache(collection, "https://news.example/a", start)
+
+    url_filter = CachedUrlFilter()
+    url_filter.initialize(collection)
+    url_filter.refresh()
+    old_version = url_filter.version
+
+    # Committed after the last refresh, but created before its watermark
+    cache(collection, "https://news.example/late", start - timedelta(seconds=1))
+    url_filter.refresh()
+    assert url_filter.watermark == start
+    assert url_filter.version != old_version
+
+    version, set_bits = url_filter.delta(old_version)
+    bloom = url_filter.filter
+    assert set(bloom_positions("https://news.example/late", bloom.num_bits, bloom.num_hashes)) <= set(set_bits)
+
+    url_filter.refresh()  # Nothing new: the version stays put
+    assert url_filter.version == version
+
+
+def test_find_cached_urls_matches_canonical_forms():
+    collection = mongomock.MongoClient().db.analyses
+    now = datetime.now(timezone.utc)
+    cache(collection, "https://news.example/a", now)
+    cache(collection, "https://news.example/empty", now, issues=())
+
+    urls = ["https://NEWS.example/a/?utm_source=feed", "https://news.example/empty", "https://news.example/c"]
+    assert find_cached_urls(collection, urls) == ["https://NEWS.example/a/?utm_source=feed"]
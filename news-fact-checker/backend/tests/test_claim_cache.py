@@ -0,0 +1,77 @@
+import pytest
+from mongomock import MongoClient as MockMongoClient
+
+from claim_cache import ClaimVerdictCache, claim_fingerprint
+from config import settings
+from models import Issue
+
+FIRST_ARTICLE = [
+    "Officials said unemployment fell to 3.5% in May. The report was released on Friday.",
+    "Economists expected a smaller decline. Markets rose after the announcement.",
+]
+SYNDICATED_ARTICLE = [
+    "Unemployment fell to 3.5% in May, officials said. The report was released on Friday.",
+    "Economists expected a smaller decline.",
+]
+
+
+@pytest.fixture
+def cache():
+    cache = ClaimVerdictCache()
+    cache.initialize(MockMongoClient()["test_db"]["claim_verdicts"])
+    return cache
+
+
+def make_issue(text):
+    return Issue(text=text, explanation="BLS data shows 3.7%", confidence_score=0.9, source_urls=["https://bls.gov"])
+
+
+def test_fingerprint_ignores_case_and_punctuation():
+    assert claim_fingerprint("Unemployment fell to 3.5% in May.") == claim_fingerprint("unemployment  fell to 3.5%, in May")
+    assert claim_fingerprint("Unemployment fell to 3.5% in May.") != claim_fingerprint("Unemployment fell to 4.5% in May.")
+
+
+def test_recorded_issue_is_found_in_another_article(cache):
+    written = cache.record_issues([make_issue("fell to 3.5% in May")], FIRST_ARTICLE, "https://a.example/story")
+    assert written == 1
+
+    result = cache.lookup(["Officials said unemployment fell to 3.5% in May. Other news followed."])
+    assert len(result.matches) == 1
+    window_text, verdict = result.matches[0]
+    assert window_text == "Officials said unemployment fell to 3.5% in May."
+    assert verdict.source_urls == ["https://bls.gov"]
+    assert "PREVIOUSLY VERIFIED CLAIMS" in result.to_prompt_context()
+
+
+def test_unrelated_article_has_no_matches(cache):
+    cache.record_issues([make_issue("fell to 3.5% in May")], FIRST_ARTICLE, "https://a.example/story")
+    result = cache.lookup(SYNDICATED_ARTICLE[1:])
+    assert result.matches == []
+    assert result.to_prompt_context() == ""
+    assert not result.can_short_circuit
+
+
+def test_short_circuit_needs_enough_coverage(cache, monkeypatch):
+    monkeypatch.setattr(settings, "ENABLE_CLAIM_SHORT_CIRCUIT", True)
+    monkeypatch.setattr(settings, "CLAIM_SHORT_CIRCUIT_COVERAGE", 0.5)
+    monkeypatch.setattr(settings, "CLAIM_SHORT_CIRCUIT_MIN_MATCHES", 2)
+    issues = [make_issue("The report was released on Friday."), make_issue("Economists expected a smaller decline.")]
+    cache.record_issues(issues, FIRST_ARTICLE, "https://a.example/story")
+
+    result = cache.lookup(SYNDICATED_ARTICLE)
+    assert len(result.matches) == 2
+    assert result.can_short_circuit
+    assert result.short_circuit_route().tier == "claim_cache"
+    assert [issue.text for issue in result.to_issues()] == [text for text, _ in result.matches]
+    monkeypatch.setattr(settings, "CLAIM_SHORT_CIRCUIT_COVERAGE", 0.9)
+    assert not result.can_short_circuit
+
+
+def test_overlapping_matches_become_one_issue(cache):
+    cache.record_issues([make_issue("fell to 3.5% in May")], FIRST_ARTICLE, "https://a.example/story")
+    two_sentences = "Officials said unemployment fell to 3.5% in May. The report was released on Friday."
+    cache.record_issues([make_issue(two_sentences)], FIRST_ARTICLE, "https://b.example/story")
+
+    result = cache.lookup(FIRST_ARTICLE[:1])
+    assert len(result.matches) == 2
+    assert [issue.text for issue in result.to_issues()] == ["Officials said unemployment fell to 3.5% in May."]
@@ -0,0 +1,105 @@
+import gzip
+import json
+import zlib
+
+import mongomock
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+from fastapi.testclient import TestClient
+
+from compression import CompressionMiddleware, StreamCompressor, negotiate_encoding, SUPPORTED_ENCODINGS
+from models import Issue
+from utils import get_precompressed_analysis, save_analysis_to_cache
+
+
+def decompress(data, encoding):
+    if encoding == "br":
+        import brotli
+        return brotli.decompress(data)
+    return gzip.decompress(data)
+
+
+def make_client():
+    app = FastAPI()
+    app.add_middleware(CompressionMiddleware, minimum_size=100, max_request_size=10_000)
+
+    @app.post("/echo")
+    async def echo(request: Request):
+        payload = await request.json()
+        return {"payload": payload, "padding": "x" * 500}
+
+    @app.get("/small")
+    async def small():
+        return {"ok": True}
+
+    @app.get("/events")
+    async def events():
+        async def generate():
+            for index in range(3):
+                yield f"data: {index}\n\n"
+        return StreamingResponse(generate(), media_type="text/event-stream")
+
+    return TestClient(app)
+
+
+def test_negotiate_encoding():
+    assert negotiate_encoding(None) is None
+    assert negotiate_encoding("gzip, deflate") == "gzip"
+    assert negotiate_encoding("gzip;q=0, identity") is None
+    assert negotiate_encoding("*") == SUPPORTED_ENCODINGS[0]
+    assert negotiate_encoding("deflate") is None
+
+
+def test_compresses_large_responses_and_streams():
+    client = make_client()
+
+    response = client.post("/echo", json={"a": 1}, headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.json()["payload"] == {"a": 1}
+
+    assert "content-encoding" not in client.get("/small", headers={"Accept-Encoding": "gzip"}).headers
+
+    response = client.get("/events", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.text == "data: 0\n\ndata: 1\n\ndata: 2\n\n"
+
+
+def test_stream_compressor_flushes_every_chunk():
+    for encoding in SUPPORTED_ENCODINGS:
+        compressor = StreamCompressor(encoding)
+        first = compressor.compress(b"data: 0\n\n")
+        if encoding == "gzip":
+            # Decodable before the stream ends, so SSE events are not held back
+            assert zlib.decompressobj(31).decompress(first) == b"data: 0\n\n"
+        rest = compressor.compress(b"data: 1\n\n") + compressor.finish()
+        assert decompress(first + rest, encoding) == b"data: 0\n\ndata: 1\n\n"
+
+
+def test_decompresses_gzip_request_bodies():
+    client = make_client()
+    headers = {"Content-Encoding": "gzip", "Content-Type": "application/json"}
+
+    response = client.post("/echo", content=gzip.compress(json.dumps({"a": 1}).encode()), headers=headers)
+    assert response.status_code == 200
+    assert response.json()["payload"] == {"a": 1}
+
+    bomb = gzip.compress(json.dumps({"a": "x" * 20_000}).encode())
+    assert client.post("/echo", content=bomb, headers=headers).status_code == 413
+    assert client.post("/echo", content=b"not gzip", headers=headers).status_code == 400
+    assert client.post("/echo", content=b"{}", headers={**headers, "Content-Encoding": "compress"}).status_code == 415
+
+
+def test_cached_analyses_are_stored_precompressed():
+    collection = mongomock.MongoClient().db.analyses
+    issues = [Issue(text="claim", explanation="wrong", confidence_score=0.5)]
+    save_analysis_to_cache(collection, "https://a", "Title", "Body", issues, route=None)
+
+    payload = get_precompressed_analysis(collection, "https://a", "gzip")
+    assert json.loads(gzip.decompress(payload))["issues"][0]["text"] == "claim"
+    assert get_precompressed_analysis(collection, "https://missing", "gzip") is None
+
+    # Analyses cached before precompression get their payload on first hit
+    collection.insert_one({"url": "https://old", "issues": [issue.model_dump() for issue in issues]})
+    assert get_precompressed_analysis(collection, "https://old", "gzip") is not None
+    assert "gzip" in collection.find_one({"url": "https://old"})["compressed_responses"]
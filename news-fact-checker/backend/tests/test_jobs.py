@@ -0,0 +1,110 @@
+import asyncio
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+from mongomock import MongoClient as MockMongoClient
+
+from config import settings
+from jobs import AnalysisJobQueue, job_to_response
+from models import AccountType, AnalysisJobStatus, ArticleRequest, Issue
+from resilience import LLMUnavailableError
+from scheduler import llm_scheduler
+
+ARTICLE = ArticleRequest(title="Budget", content="The council approved the budget.", url="https://example.com/a")
+ISSUE = Issue(text="approved the budget", explanation="It was postponed", confidence_score=0.7)
+
+
+@pytest.fixture
+def queue():
+    queue = AnalysisJobQueue()
+    queue.initialize(MockMongoClient()["test_db"]["analysis_jobs"])
+    return queue
+
+
+def test_job_lifecycle(queue):
+    job = queue.create_job(ARTICLE, "a@b.com", AccountType.PREMIUM)
+    assert queue.create_job(ARTICLE, "a@b.com")["job_id"] == job["job_id"]
+
+    claimed = queue.claim_next("worker-1")
+    assert claimed["job_id"] == job["job_id"]
+    assert claimed["status"] == AnalysisJobStatus.RUNNING and claimed["attempts"] == 1
+    assert queue.claim_next("worker-2") is None
+
+    queue.complete_job(claimed, "worker-1", [ISSUE])
+    response = job_to_response(queue.get_job(job["job_id"], "a@b.com"))
+    assert response.status == AnalysisJobStatus.COMPLETED
+    assert response.issues[0].text == ISSUE.text
+    assert queue.get_job(job["job_id"], "someone@else.com") is None
+
+
+def test_expired_lease_is_reclaimed(queue):
+    job = queue.create_job(ARTICLE, "a@b.com")
+    stale = queue.claim_next("dead-worker")
+    queue.collection.update_one(
+        {"job_id": job["job_id"]},
+        {"$set": {"lease_expires_at": datetime.utcnow() - timedelta(seconds=1)}}
+    )
+
+    reclaimed = queue.claim_next("worker-2")
+    assert reclaimed["lease_owner"] == "worker-2" and reclaimed["attempts"] == 2
+
+    # The worker that lost its lease can no longer write a result
+    queue.complete_job(stale, "dead-worker", [])
+    assert queue.get_job(job["job_id"], "a@b.com")["status"] == AnalysisJobStatus.RUNNING
+
+
+def test_failures_requeue_then_fail(queue):
+    job = queue.create_job(ARTICLE, "a@b.com")
+    claimed = queue.claim_next("worker-1")
+
+    queue.fail_job(claimed, "worker-1", LLMUnavailableError("upstream down", retry_after=60))
+    requeued = queue.get_job(job["job_id"], "a@b.com")
+    assert requeued["status"] == AnalysisJobStatus.QUEUED
+    assert queue.claim_next("worker-1") is None  # Not before the retry delay
+
+    queue.collection.update_one({"job_id": job["job_id"]}, {"$set": {"not_before": datetime.utcnow()}})
+    claimed = queue.claim_next("worker-1")
+    queue.fail_job(claimed, "worker-1", ValueError("bad article"))
+    failed = queue.get_job(job["job_id"], "a@b.com")
+    assert failed["status"] == AnalysisJobStatus.FAILED and failed["error"] == "bad article"
+
+
+def test_workers_run_jobs_and_wake_long_polls(queue, monkeypatch):
+    monkeypatch.setattr(settings, "JOB_WORKER_COUNT", 2)
+    monkeypatch.setattr(settings, "JOB_POLL_INTERVAL", 0.01)
+
+    async def run():
+        queue.start_workers(lambda job: [ISSUE])
+        try:
+            job = queue.create_job(ARTICLE, "a@b.com")
+            return await queue.wait_for_job(job["job_id"], "a@b.com", timeout=5)
+        finally:
+            await queue.stop_workers()
+
+    finished = asyncio.run(run())
+    assert finished["status"] == AnalysisJobStatus.COMPLETED
+    assert finished["issues"][0]["text"] == ISSUE.text
+
+
+def test_workers_are_capped_at_scheduler_capacity_and_use_their_own_threads(queue, monkeypatch):
+    monkeypatch.setattr(settings, "JOB_WORKER_COUNT", 50)
+    monkeypatch.setattr(settings, "JOB_POLL_INTERVAL", 0.01)
+    threads = []
+
+    def handler(job):
+        threads.append(threading.current_thread().name)
+        return [ISSUE]
+
+    async def run():
+        queue.start_workers(handler)
+        try:
+            assert len(queue._workers) == llm_scheduler.capacity
+            job = queue.create_job(ARTICLE, "a@b.com")
+            return await queue.wait_for_job(job["job_id"], "a@b.com", timeout=5)
+        finally:
+            await queue.stop_workers()
+
+    finished = asyncio.run(run())
+    assert finished["status"] == AnalysisJobStatus.COMPLETED
+    assert threads and threads[0].startswith("analysis-job")
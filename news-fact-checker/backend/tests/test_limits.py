@@ -0,0 +1,64 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import limits
+from config import settings
+from limits import BodySizeLimitMiddleware, enforce_content_limit, request_size_stats
+from models import ArticleRequest
+
+
+@pytest.fixture
+def small_limits(monkeypatch):
+    monkeypatch.setattr(settings, "MAX_REQUEST_BODY_BYTES", 1000)
+    monkeypatch.setattr(settings, "REQUEST_BODY_LIMITS", {"/big": 5000})
+    monkeypatch.setattr(settings, "MAX_ARTICLE_CONTENT_CHARS", 100)
+
+
+def make_client():
+    app = FastAPI()
+    app.add_middleware(BodySizeLimitMiddleware)
+
+    @app.post("/echo")
+    async def echo(article: ArticleRequest):
+        return {"length": len(article.content)}
+
+    @app.post("/big")
+    async def big(article: ArticleRequest):
+        return {"length": len(article.content)}
+
+    return TestClient(app)
+
+
+def test_rejects_oversized_bodies_before_and_while_streaming(small_limits):
+    client = make_client()
+    before = request_size_stats.snapshot()
+
+    assert client.post("/echo", json={"title": "t", "url": "u", "content": "x" * 50}).status_code == 200
+    assert client.post("/echo", json={"title": "t", "url": "u", "content": "x" * 2000}).status_code == 413
+    assert client.post("/big", json={"title": "t", "url": "u", "content": "x" * 2000}).status_code == 200
+
+    def chunked():
+        for _ in range(10):
+            yield b"x" * 200
+
+    response = client.post("/echo", content=chunked(), headers={"Content-Type": "application/json"})
+    assert response.status_code == 413
+
+    after = request_size_stats.snapshot()
+    assert after["rejected_by_content_length"] == before["rejected_by_content_length"] + 1
+    assert after["rejected_while_streaming"] == before["rejected_while_streaming"] + 1
+
+
+def test_content_is_truncated_at_a_sentence_break(small_limits):
+    content = "Sentence. " * 20
+    truncated = enforce_content_limit(content)
+    assert len(truncated) <= 100
+    assert truncated.endswith(".")
+    assert len(ArticleRequest(title="t", url="u", content=content).content) == len(truncated)
+
+
+def test_reject_policy(small_limits, monkeypatch):
+    monkeypatch.setattr(limits.settings, "OVERSIZED_CONTENT_POLICY", "reject")
+    with pytest.raises(ValueError):
+        ArticleRequest(title="t", url="u", content="x" * 101)
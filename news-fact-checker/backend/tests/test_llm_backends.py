@@ -0,0 +1,100 @@
+import asyncio
+import json
+import time
+
+from anchoring import anchor_issues
+from llm_backends import FakeLLMBackend, FakeLLMError, load_recorded_responses, synthesize_response
+from models import AnalysisOutput
+from utils import (
+    create_analysis_prompt, extract_json_from_llm_response, perform_fact_check_analysis, perform_fact_check_analysis_stream
+)
+
+
+ARTICLE = (
+    "The city council approved the new transit budget on Tuesday evening after a long debate. "
+    "The plan includes a twelve percent increase in spending on buses and light rail lines. "
+    "Officials said construction of the northern extension would begin early next spring."
+)
+
+
+def make_fake(**kwargs):
+    options = {"latency_median": 0.0, "seed": 7}
+    options.update(kwargs)
+    return FakeLLMBackend("fake-model", 100, **options)
+
+
+def test_replays_recorded_responses_round_robin(tmp_path):
+    recording = tmp_path / "responses.jsonl"
+    recording.write_text('{"model": "sonar", "content": "first"}\n"second"\n')
+    backend = make_fake(responses=load_recorded_responses(str(recording)))
+
+    assert [backend.invoke("prompt") for _ in range(3)] == ["first", "second", "first"]
+
+
+def test_synthesized_response_anchors_to_article():
+    response = synthesize_response(create_analysis_prompt().invoke({
+        "current_date": "2024-01-01",
+        "article_title": "Budget",
+        "article_url": "https://example.com/a",
+        "article_content": ARTICLE,
+    }))
+    output = AnalysisOutput(**json.loads(extract_json_from_llm_response(response)))
+    anchored = anchor_issues(output.issues, ARTICLE)
+
+    assert len(anchored) == 3
+    assert all(ARTICLE[issue.start_offset:issue.end_offset] == issue.text for issue in anchored)
+
+
+def test_error_injection_is_deterministic_for_a_seed():
+    def outcomes():
+        backend = make_fake(responses=["ok"], error_rate=0.5)
+        results = []
+        for _ in range(20):
+            try:
+                results.append(backend.invoke("prompt"))
+            except FakeLLMError:
+                results.append("error")
+        return results
+
+    first = outcomes()
+    assert first == outcomes()
+    assert 0 < first.count("error") < 20
+
+
+def test_astream_yields_response_tokens():
+    backend = make_fake(responses=["alpha beta gamma"], tokens_per_second=0)
+
+    async def collect():
+        return [chunk async for chunk in backend.astream("prompt")]
+
+    chunks = asyncio.run(collect())
+    assert len(chunks) == 3
+    assert "".join(chunks) == "alpha beta gamma"
+
+
+def test_analysis_runs_against_fake_backend():
+    result = perform_fact_check_analysis(
+        make_fake(), create_analysis_prompt(), "Budget", "https://example.com/a", ARTICLE
+    )
+
+    assert len(result.issues) == 3
+
+
+def test_streaming_analysis_reads_the_fake_backend_token_by_token():
+    class StreamOnlyFake(FakeLLMBackend):
+        def invoke(self, prompt_text):
+            raise AssertionError("the streaming path must not use the blocking call")
+
+    backend = StreamOnlyFake("fake-model", 100, latency_median=0.0, tokens_per_second=0, seed=7)
+
+    async def collect():
+        return [chunk async for chunk in perform_fact_check_analysis_stream(
+            backend, create_analysis_prompt(), "Budget", "https://example.com/a", ARTICLE
+        )]
+
+    started = time.monotonic()
+    events = [json.loads(chunk[len("data: "):]) for chunk in asyncio.run(collect())]
+    assert time.monotonic() - started < 0.5  # No pacing between issues in the background run
+    steps = [event.get("current_step") for event in events]
+    assert "Receiving AI model response" in steps
+    assert sum(event["event_type"] == "issue" for event in events) == 3
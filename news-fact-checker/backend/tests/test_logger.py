@@ -0,0 +1,76 @@
+import json
+import logging
+
+import pytest
+
+from logger import JsonFormatter, Logger, SamplingFilter, TextFormatter, log_listener, log_queue, request_id_var
+
+
+@pytest.fixture(autouse=True)
+def paused_listener():
+    """Keep records on the queue so the test can inspect them."""
+    log_listener.stop()
+    yield
+    log_listener.start()
+
+
+class Unformattable:
+    def __str__(self):
+        raise AssertionError("formatted in the calling thread")
+
+
+def drain():
+    records = []
+    while not log_queue.empty():
+        records.append(log_queue.get_nowait())
+    return records
+
+
+def test_records_are_queued_unformatted_with_fields_and_request_id():
+    logger = Logger("test_queue", level="INFO")
+    logger.logger.propagate = False
+    token = request_id_var.set("req-1")
+    try:
+        logger.debug("never built %s", Unformattable())
+        logger.info("Content length: %d", 42, url="https://news.example/a")
+        [record] = [record for record in drain() if record.name == "test_queue"]
+    finally:
+        request_id_var.reset(token)
+
+    assert record.msg == "Content length: %d" and record.args == (42,)
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["message"] == "Content length: 42"
+    assert entry["request_id"] == "req-1"
+    assert entry["url"] == "https://news.example/a"
+    assert TextFormatter().format(record).endswith("[req-1] Content length: 42 url=https://news.example/a")
+
+
+def test_errors_keep_the_exception_and_sampling_keeps_warnings():
+    logger = Logger("test_errors")
+    logger.logger.propagate = False
+    try:
+        raise ValueError("boom")
+    except ValueError as e:
+        logger.error("Analysis failed", error=e)
+    [record] = [record for record in drain() if record.name == "test_errors"]
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["message"] == "Analysis failed: boom"
+    assert "ValueError: boom" in entry["exception"]
+
+    sampler = SamplingFilter(0.0)
+    assert not sampler.filter(logging.makeLogRecord({"levelno": logging.INFO}))
+    assert sampler.filter(logging.makeLogRecord({"levelno": logging.WARNING}))
+
+
+def test_errors_with_percent_signs_in_the_message_are_not_lost():
+    logger = Logger("test_percent")
+    logger.logger.propagate = False
+    error = ValueError("boom")
+    logger.error("Failed to cache https://x.com/a%20b", error=error)
+    logger.error("Failed %s at https://x.com/a%%20b", "save", error=error)
+    first, second = [record for record in drain() if record.name == "test_percent"]
+
+    assert json.loads(JsonFormatter().format(first))["message"] == "Failed to cache https://x.com/a%20b: boom"
+    entry = json.loads(JsonFormatter().format(second))
+    assert entry["message"] == "Failed save at https://x.com/a%20b"
+    assert entry["error"] == "boom"
@@ -0,0 +1,41 @@
+from types import SimpleNamespace
+
+from metrics import (
+    CallbackMetric, Counter, Histogram, MetricsRegistry, MongoCommandListener,
+    mongo_command_seconds
+)
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = MetricsRegistry()
+    histogram = registry.register(Histogram("stage_seconds", "Stage latency", ["stage"], buckets=[0.1, 1.0]))
+    histogram.labels("auth").observe(0.05)
+    histogram.labels("auth").observe(0.5)
+    histogram.labels("auth").observe(5)
+
+    text = registry.render()
+    assert "# TYPE stage_seconds histogram" in text
+    assert 'stage_seconds_bucket{stage="auth",le="0.1"} 1' in text
+    assert 'stage_seconds_bucket{stage="auth",le="1"} 2' in text
+    assert 'stage_seconds_bucket{stage="auth",le="+Inf"} 3' in text
+    assert 'stage_seconds_count{stage="auth"} 3' in text
+    assert 'stage_seconds_sum{stage="auth"} 5.55' in text
+
+
+def test_callback_metrics_and_failing_callbacks():
+    registry = MetricsRegistry()
+    registry.register(Counter("hits_total", "Hits", ["endpoint"])).labels(endpoint="analyze").inc(2)
+    registry.register(CallbackMetric("queued", "Queued", "gauge", lambda: [(("free", ), 3)], ["priority_class"]))
+    registry.register(CallbackMetric("broken", "Broken", "gauge", lambda: 1 / 0))
+
+    text = registry.render()
+    assert 'hits_total{endpoint="analyze"} 2' in text
+    assert 'queued{priority_class="free"} 3' in text
+    assert "broken" not in text
+
+
+def test_mongo_listener_records_command_latency():
+    before = mongo_command_seconds.labels("find", "success").counts[:]
+    MongoCommandListener().succeeded(SimpleNamespace(command_name="find", duration_micros=2500))
+    after = mongo_command_seconds.labels("find", "success").counts
+    assert sum(after) == sum(before) + 1
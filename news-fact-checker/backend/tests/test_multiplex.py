@@ -0,0 +1,141 @@
+import asyncio
+import json
+
+from fastapi import HTTPException, WebSocketDisconnect
+
+from models import AccountType, User
+from multiplex import WS_CLOSE_UNAUTHORIZED, MultiplexSession
+
+
+ARTICLE = {"url": "https://example.com/a", "title": "Title", "content": "Body"}
+USER = User(email="reader@example.com", full_name="Reader", account_type=AccountType.FREE)
+
+
+class FakeWebSocket:
+    """Feeds scripted client messages and records what the server sends."""
+
+    def __init__(self, messages):
+        self.incoming = asyncio.Queue()
+        for message in messages:
+            self.incoming.put_nowait(message)
+        self.sent = []
+        self.closed_with = None
+
+    async def receive_json(self):
+        message = await self.incoming.get()
+        if message is None:
+            raise WebSocketDisconnect()
+        if isinstance(message, Exception):
+            raise message  # e.g. the JSON decode error of a malformed frame
+        return message
+
+    async def send_text(self, text):
+        self.sent.append(json.loads(text))
+
+    async def close(self, code=1000, reason=None):
+        self.closed_with = code
+
+
+async def authenticate(token):
+    if token != "good":
+        raise HTTPException(status_code=401, detail="Invalid token")
+    return USER
+
+
+async def open_stream(article, user, replay, last_event_id):
+    async def events():
+        for seq in range(3):
+            yield f'id: run:{seq}\ndata: {{"seq": {seq}}}\n\n'
+            await asyncio.sleep(0)
+        yield ": keepalive\n\n"
+    return events()
+
+
+async def serve(websocket, opener=open_stream, until=None):
+    session = MultiplexSession(websocket, authenticate, opener, max_streams=2, send_queue_size=4)
+    runner = asyncio.create_task(session.run())
+    if until is not None:
+        while not until(websocket.sent):
+            await asyncio.sleep(0.01)
+        websocket.incoming.put_nowait(None)
+    await asyncio.wait_for(runner, 2)
+
+
+def test_rejects_bad_token():
+    websocket = FakeWebSocket([{"type": "auth", "token": "bad"}])
+
+    asyncio.run(serve(websocket))
+    assert websocket.closed_with == WS_CLOSE_UNAUTHORIZED
+    assert websocket.sent == []
+
+
+def test_relays_concurrent_streams():
+    websocket = FakeWebSocket([
+        {"type": "auth", "token": "good"},
+        {"type": "analyze", "stream_id": "a", "article": ARTICLE},
+        {"type": "analyze", "stream_id": "b", "article": ARTICLE},
+        {"type": "analyze", "stream_id": "b", "article": ARTICLE},
+        {"type": "analyze", "stream_id": "c", "article": ARTICLE},
+    ])
+
+    def finished(sent):
+        return sum(message["type"] == "done" for message in sent) == 2
+
+    asyncio.run(serve(websocket, until=finished))
+    assert websocket.sent[0] == {"type": "ready", "max_streams": 2}
+    for stream_id in ("a", "b"):
+        events = [m for m in websocket.sent if m["type"] == "event" and m["stream_id"] == stream_id]
+        assert [m["event"]["seq"] for m in events] == [0, 1, 2]
+        assert events[-1]["id"] == "run:2"
+    errors = [m for m in websocket.sent if m["type"] == "error"]
+    # Duplicate stream id, then over the per-connection limit of 2
+    assert [(m["stream_id"], m["status"]) for m in errors] == [("b", 409), ("c", 429)]
+
+
+def test_cancel_and_stream_errors():
+    started = asyncio.Event()
+
+    async def opener(article, user, replay, last_event_id):
+        if article.url.endswith("limited"):
+            raise HTTPException(status_code=429, detail="Busy", headers={"Retry-After": "5"})
+
+        async def events():
+            started.set()
+            await asyncio.sleep(10)
+            yield "data: {}\n\n"
+        return events()
+
+    websocket = FakeWebSocket([
+        {"type": "auth", "token": "good"},
+        {"type": "analyze", "stream_id": "slow", "article": ARTICLE},
+        {"type": "analyze", "stream_id": "busy", "article": {**ARTICLE, "url": "https://example.com/limited"}},
+    ])
+
+    async def scenario():
+        task = asyncio.create_task(serve(websocket, opener, until=lambda sent: any(m["type"] == "done" for m in sent)))
+        await started.wait()
+        websocket.incoming.put_nowait({"type": "cancel", "stream_id": "slow"})
+        await task
+
+    asyncio.run(scenario())
+    assert {"type": "done", "stream_id": "slow", "cancelled": True} in websocket.sent
+    busy = next(m for m in websocket.sent if m["type"] == "error")
+    assert (busy["stream_id"], busy["status"], busy["retry_after"]) == ("busy", 429, 5)
+
+
+def test_malformed_messages_get_errors_and_keep_the_session_open():
+    websocket = FakeWebSocket([
+        {"type": "auth", "token": "good"},
+        json.JSONDecodeError("Expecting value", "{not json", 1),
+        ["not", "an", "object"],
+        {"type": "cancel", "stream_id": ["a"]},
+        {"type": "analyze", "stream_id": "x", "article": "not an object"},
+        {"type": "analyze", "stream_id": "y", "article": ARTICLE, "replay": ["paced"]},
+        {"type": "analyze", "stream_id": "z", "article": ARTICLE, "last_event_id": 7},
+        {"type": "analyze", "stream_id": "ok", "article": ARTICLE},
+    ])
+
+    asyncio.run(serve(websocket, until=lambda sent: any(m["type"] == "done" for m in sent)))
+    errors = [(m["stream_id"], m["status"]) for m in websocket.sent if m["type"] == "error"]
+    assert errors == [(None, 400), (None, 400), (None, 400), ("x", 422), ("y", 422), ("z", 422)]
+    assert {"type": "done", "stream_id": "ok", "cancelled": False} in websocket.sent
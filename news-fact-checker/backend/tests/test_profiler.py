@@ -0,0 +1,60 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from profiler import ProfilerBusyError, ProfilingMiddleware, sampling_profiler
+
+
+def burn_cpu(stop: threading.Event) -> None:
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_worker_profile_finds_the_hot_function():
+    stop = threading.Event()
+    thread = threading.Thread(target=burn_cpu, args=(stop, ), name="burner")
+    thread.start()
+    try:
+        profile = asyncio.run(sampling_profiler.profile_for(0.2, interval=0.005))
+    finally:
+        stop.set()
+        thread.join()
+
+    assert profile.finished and profile.samples > 0
+    folded = profile.folded()
+    assert any(line.startswith("burner;") and "burn_cpu (test_profiler.py" in line for line in folded.splitlines())
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in folded.splitlines())
+
+
+def test_only_one_profile_runs_at_a_time():
+    sampling_profiler.start()
+    try:
+        with pytest.raises(ProfilerBusyError):
+            sampling_profiler.start()
+    finally:
+        sampling_profiler.stop()
+
+
+def test_tagged_request_is_profiled(monkeypatch):
+    monkeypatch.setenv("ADMIN_API_KEY", "secret")
+    app = FastAPI()
+    app.add_middleware(ProfilingMiddleware)
+
+    @app.get("/busy")
+    async def busy():
+        deadline = time.monotonic() + 0.1
+        while time.monotonic() < deadline:
+            sum(range(1000))
+        return {}
+
+    client = TestClient(app)
+    assert "X-Profile-Id" not in client.get("/busy", headers={"X-Profile": "wrong"}).headers
+
+    response = client.get("/busy", headers={"X-Profile": "secret"})
+    profile = sampling_profiler.get(response.headers["X-Profile-Id"])
+    assert profile.finished and profile.mode == "request"
+    assert "busy (test_profiler.py" in profile.folded()
@@ -0,0 +1,142 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from config import settings
+from resilience import (
+    CircuitBreaker, CircuitOpenError, Deadline, LLMDeadlineExceeded, LLMUnavailableError, ResilientInvoker
+)
+
+
+@pytest.fixture(autouse=True)
+def fast_backoff(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_RETRY_BASE_BACKOFF", 0.01)
+    monkeypatch.setattr(settings, "LLM_RETRY_MAX_BACKOFF", 0.01)
+
+
+def test_retries_until_success():
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) < 2:
+            raise ConnectionError("upstream reset")
+        return "ok"
+
+    invoker = ResilientInvoker()
+    assert invoker.invoke(flaky) == "ok"
+    assert len(calls) == 2
+    assert invoker.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_gives_up_after_max_retries():
+    calls = []
+
+    def broken():
+        calls.append(1)
+        raise ConnectionError("upstream down")
+
+    with pytest.raises(LLMUnavailableError):
+        ResilientInvoker().invoke(broken)
+    assert len(calls) == settings.LLM_MAX_RETRIES + 1
+
+
+def test_deadline_bounds_a_hanging_call(monkeypatch):
+    monkeypatch.setattr(settings, "LLM_MAX_RETRIES", 0)
+    release = threading.Event()
+
+    started = time.monotonic()
+    with pytest.raises(LLMDeadlineExceeded):
+        ResilientInvoker().invoke(lambda: release.wait(5), deadline=0.2)
+    release.set()
+    assert time.monotonic() - started < 1
+
+
+def test_spent_request_deadline_skips_the_call_without_tripping_the_breaker():
+    calls = []
+    deadline = Deadline(0.01)
+    time.sleep(0.02)
+
+    invoker = ResilientInvoker(CircuitBreaker(failure_threshold=1))
+    with pytest.raises(LLMDeadlineExceeded):
+        invoker.invoke(lambda: calls.append(1), deadline=deadline.remaining())
+    assert calls == [] and deadline.remaining() == 0
+    assert invoker.breaker.state == CircuitBreaker.CLOSED
+
+
+def test_hedged_request_wins_over_slow_primary():
+    calls = []
+    lock = threading.Lock()
+
+    def slow_then_fast():
+        with lock:
+            calls.append(1)
+            attempt = len(calls)
+        if attempt == 1:
+            time.sleep(1)
+            return "primary"
+        return "hedge"
+
+    assert ResilientInvoker().invoke(slow_then_fast, deadline=5, hedge_after=0.05) == "hedge"
+    assert len(calls) == 2
+
+
+def test_open_breaker_fails_fast_then_probes():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.1)
+    invoker = ResilientInvoker(breaker)
+
+    with pytest.raises(LLMUnavailableError):
+        invoker.invoke(lambda: 1 / 0)
+    assert breaker.is_open
+
+    with pytest.raises(CircuitOpenError) as exc_info:
+        invoker.invoke(lambda: "not called")
+    assert exc_info.value.retry_after >= 1
+
+    time.sleep(0.15)
+    assert invoker.invoke(lambda: "recovered") == "recovered"
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_stream_retries_only_before_the_first_chunk():
+    attempts = []
+
+    async def flaky_stream():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ConnectionError("upstream reset")
+        yield "partial "
+        if len(attempts) == 2:
+            raise ConnectionError("dropped mid-response")
+        yield "response"
+
+    async def collect():
+        return [chunk async for chunk in ResilientInvoker().astream(flaky_stream)]
+
+    with pytest.raises(LLMUnavailableError, match="mid-response"):
+        asyncio.run(collect())
+    assert len(attempts) == 2
+    assert asyncio.run(collect()) == ["partial ", "response"]
+
+
+def test_abandoned_stream_frees_the_half_open_probe():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    invoker = ResilientInvoker(breaker)
+    with pytest.raises(LLMUnavailableError):
+        invoker.invoke(lambda: 1 / 0)
+    time.sleep(0.06)
+
+    async def endless_stream():
+        while True:
+            yield "token "
+
+    async def read_one_chunk_then_disconnect():
+        chunks = invoker.astream(endless_stream)
+        assert await chunks.__anext__() == "token "
+        await chunks.aclose()
+
+    asyncio.run(read_one_chunk_then_disconnect())
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert breaker.allow_request()
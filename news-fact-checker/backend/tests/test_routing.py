@@ -0,0 +1,70 @@
+import pytest
+
+from config import settings
+from models import AccountType
+from resilience import CircuitOpenError, LLMDeadlineExceeded
+from routing import ModelRouter
+
+
+def make_content(word_count):
+    return " ".join(["word"] * word_count)
+
+
+@pytest.fixture
+def router():
+    router = ModelRouter()
+    router.initialize(lambda model, max_tokens: {"model": model, "max_tokens": max_tokens})
+    return router
+
+
+def test_pool_has_one_client_per_tier(router):
+    for tier, tier_config in settings.MODEL_TIERS.items():
+        route = router._build_route(tier, "test")
+        assert router.client_for(route) == {"model": tier_config["model"], "max_tokens": tier_config["max_tokens"]}
+
+
+def test_short_articles_use_fast_tier(router):
+    route = router.select_route(make_content(300), AccountType.PREMIUM)
+    assert route.tier == "fast"
+    assert route.model == settings.MODEL_TIERS["fast"]["model"]
+
+
+def test_medium_articles_depend_on_account_type(router):
+    content = make_content(settings.ROUTING_SHORT_ARTICLE_WORDS + 100)
+    assert router.select_route(content, AccountType.FREE).tier == "standard"
+    assert router.select_route(content, AccountType.PREMIUM).tier == "deep"
+
+
+def test_long_articles_use_deep_tier(router):
+    route = router.select_route(make_content(settings.ROUTING_LONG_ARTICLE_WORDS + 1), AccountType.FREE)
+    assert route.tier == "deep"
+    assert route.max_tokens == settings.MAX_TOKENS
+
+
+def test_slow_tier_steps_down_to_faster_tier(router):
+    for _ in range(settings.LATENCY_MIN_SAMPLES):
+        router.latency.record("deep", settings.LATENCY_SLO_SECONDS * 2)
+
+    route = router.select_route(make_content(settings.ROUTING_LONG_ARTICLE_WORDS + 1), AccountType.PREMIUM)
+    assert route.tier == "standard"
+    assert "SLO" in route.reason
+
+
+def test_latency_needs_minimum_samples(router):
+    router.latency.record("deep", settings.LATENCY_SLO_SECONDS * 2)
+    assert router.latency.percentile("deep") is None
+
+
+def test_timed_out_calls_trip_the_step_down(router):
+    content = make_content(settings.ROUTING_LONG_ARTICLE_WORDS + 1)
+    route = router.select_route(content, AccountType.PREMIUM)
+    for _ in range(settings.LATENCY_MIN_SAMPLES):
+        with pytest.raises(LLMDeadlineExceeded):
+            with router.track_call(route, budget=settings.LATENCY_SLO_SECONDS * 2):
+                raise LLMDeadlineExceeded("LLM call exceeded its deadline")
+        with pytest.raises(CircuitOpenError):
+            with router.track_call(route, budget=settings.LATENCY_SLO_SECONDS * 2):
+                raise CircuitOpenError("LLM circuit breaker is open")
+
+    assert router.latency.percentile("deep") == settings.LATENCY_SLO_SECONDS * 2
+    assert router.select_route(content, AccountType.PREMIUM).tier == "standard"
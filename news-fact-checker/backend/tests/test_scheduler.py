@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+
+from models import AccountType
+from scheduler import LLMScheduler, SchedulerQueueFullError, SchedulerQueueTimeout
+
+
+def make_scheduler(**kwargs):
+    options = {"capacity": 1, "weights": {"premium": 4, "free": 1}, "per_user_limit": 2, "max_queue_per_class": 100}
+    options.update(kwargs)
+    return LLMScheduler(**options)
+
+
+def drain(scheduler, first, pending):
+    """Release the running ticket repeatedly and return the grant order."""
+    order, running = [], first
+    while running is not None:
+        scheduler.release(running)
+        running = next((ticket for ticket in pending if ticket.granted and not ticket.released), None)
+        if running is not None:
+            order.append(running.priority_class)
+    return order
+
+
+def test_premium_gets_weighted_share_under_saturation():
+    scheduler = make_scheduler()
+    holder = scheduler.submit("holder", AccountType.FREE)
+    assert holder.granted
+
+    pending = [scheduler.submit(f"free-{i}", AccountType.FREE) for i in range(8)]
+    pending += [scheduler.submit(f"premium-{i}", AccountType.PREMIUM) for i in range(8)]
+    order = drain(scheduler, holder, pending)
+
+    assert order[:5].count("premium") == 4
+    assert order[-3:] == ["free", "free", "free"]
+
+
+def test_per_user_limit_lets_other_users_through():
+    scheduler = make_scheduler(capacity=3, per_user_limit=1)
+    first = scheduler.submit("alice")
+    second = scheduler.submit("alice")
+    other = scheduler.submit("bob")
+
+    assert first.granted and other.granted
+    assert not second.granted
+    scheduler.release(first)
+    assert second.granted
+
+
+def test_queue_position_and_limits():
+    scheduler = make_scheduler(max_queue_per_class=2)
+    scheduler.submit("holder")
+    free = [scheduler.submit(f"free-{i}") for i in range(2)]
+    premium = scheduler.submit("vip", AccountType.PREMIUM)
+
+    assert scheduler.position(premium) == 1
+    assert scheduler.position(free[0]) == 2
+    with pytest.raises(SchedulerQueueFullError):
+        scheduler.submit("late")
+    assert scheduler.snapshot()["classes"]["free"]["queued"] == 2
+
+    with pytest.raises(SchedulerQueueTimeout):
+        with scheduler.slot("impatient", AccountType.PREMIUM, timeout=0.01):
+            pass
+    assert scheduler.snapshot()["classes"]["premium"]["queued"] == 1
+
+
+def test_queue_positions_reports_until_granted():
+    scheduler = make_scheduler()
+    holder = scheduler.submit("holder")
+    waiting = scheduler.submit("waiting")
+
+    async def wait_for_slot():
+        asyncio.get_running_loop().call_later(0.05, scheduler.release, holder)
+        return [position async for position in scheduler.queue_positions(waiting, interval=0.01, timeout=5)]
+
+    positions = asyncio.run(wait_for_slot())
+    assert positions and set(positions) == {1}
+    assert waiting.granted
+
+
+def test_timed_out_async_waits_do_not_leave_waiters_behind():
+    scheduler = make_scheduler()
+    scheduler.submit("holder")
+    waiting = scheduler.submit("waiting")
+
+    async def poll():
+        for _ in range(5):
+            assert not await waiting.wait_async(0.001)
+
+    asyncio.run(poll())
+    assert waiting._waiters == []
+
+
+def test_acquire_waits_on_the_loop_and_gives_the_slot_back_on_timeout():
+    scheduler = make_scheduler()
+    holder = scheduler.submit("holder")
+
+    async def scenario():
+        with pytest.raises(SchedulerQueueTimeout):
+            await scheduler.acquire("impatient", timeout=0.01)
+        assert scheduler.snapshot()["classes"]["free"]["queued"] == 0
+
+        asyncio.get_running_loop().call_later(0.02, scheduler.release, holder)
+        return await scheduler.acquire("patient", AccountType.PREMIUM, timeout=5)
+
+    ticket = asyncio.run(scenario())
+    assert ticket.granted and scheduler.snapshot()["running"] == 1
@@ -0,0 +1,19 @@
+import json
+
+from models import AnalysisProgress, Issue, StreamedIssue
+from serialization import FastJSONResponse, ndjson_line, sse_event
+
+
+def test_sse_event_matches_legacy_encoding():
+    issue = Issue(text="Ünïcode claim", explanation="wrong", confidence_score=0.5, source_urls=["https://x"])
+    for event in (StreamedIssue(issue=issue, issue_index=0), AnalysisProgress(progress_percentage=0.5, current_step="step")):
+        framed = sse_event(event)
+        assert framed.startswith("data: ") and framed.endswith("\n\n")
+        assert json.loads(framed[len("data: "):]) == json.loads(json.dumps(event.model_dump(mode="json")))
+
+
+def test_ndjson_line_and_fast_response():
+    issue = Issue(text="claim", explanation="wrong", confidence_score=0.5)
+    line = ndjson_line(issue)
+    assert line.endswith("\n") and "\n" not in line[:-1]
+    assert json.loads(FastJSONResponse({"issues": [issue.model_dump()]}).body) == {"issues": [json.loads(line)]}
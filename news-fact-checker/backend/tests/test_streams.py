@@ -0,0 +1,58 @@
+import asyncio
+import gc
+import json
+
+from fastapi.responses import StreamingResponse
+
+from streams import KEEPALIVE_COMMENT, StreamManager
+
+
+async def delayed(events, delay):
+    for event in events:
+        await asyncio.sleep(delay)
+        yield event
+
+
+async def collect(manager, source):
+    lease = manager.admit()
+    return [event async for event in manager.stream(lease, source)]
+
+
+def test_admission_limit_and_release():
+    manager = StreamManager(max_streams=1, timeout=5, keepalive_interval=5)
+    lease = manager.admit()
+    assert manager.admit() is None
+    lease.release()
+    lease.release()
+    assert manager.active_count == 0
+    assert manager.snapshot()["rejected"] == 1
+
+
+def test_heartbeats_while_idle():
+    manager = StreamManager(max_streams=1, timeout=5, keepalive_interval=0.02)
+
+    events = asyncio.run(collect(manager, delayed(["data: done\n\n"], 0.07)))
+    assert events[-1] == "data: done\n\n"
+    assert events.count(KEEPALIVE_COMMENT) >= 2
+    assert manager.active_count == 0
+
+
+def test_timeout_ends_stream_with_error_event():
+    manager = StreamManager(max_streams=1, timeout=0.05, keepalive_interval=1)
+
+    events = asyncio.run(collect(manager, delayed(["data: late\n\n"], 1)))
+    assert len(events) == 1
+    assert json.loads(events[0][len("data: "):])["error_code"] == "STREAM_TIMEOUT"
+    assert manager.snapshot() == {"active": 0, "max": 1, "admitted": 1, "rejected": 0, "timed_out": 1}
+
+
+def test_lease_is_released_when_the_response_is_never_sent():
+    manager = StreamManager(max_streams=1, timeout=5, keepalive_interval=5)
+    lease = manager.admit()
+    response = StreamingResponse(manager.stream(lease, delayed(["data: never\n\n"], 0)), media_type="text/event-stream")
+    assert manager.active_count == 1
+
+    del response
+    gc.collect()
+    assert manager.active_count == 0
+    assert manager.admit() is not None
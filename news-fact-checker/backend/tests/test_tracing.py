@@ -0,0 +1,102 @@
+import asyncio
+import json
+
+import pytest
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+import tracing
+from config import settings
+from logger import current_request_id
+from models import AnalysisProgress
+from tracing import TracingMiddleware, parse_traceparent, traced, tracer
+
+
+@pytest.fixture
+def exported(monkeypatch, tmp_path):
+    """Export every trace to a temporary file and return a reader for it."""
+    path = tmp_path / "traces.jsonl"
+    monkeypatch.setattr(settings, "ENABLE_TRACING", True)
+    monkeypatch.setattr(settings, "TRACE_SAMPLE_RATE", 1.0)
+    monkeypatch.setattr(settings, "TRACE_EXPORT_FILE", str(path))
+    monkeypatch.setattr(settings, "TRACE_EXPORT_ENDPOINT", None)
+    tracer.start()
+
+    def read():
+        tracer.stop()
+        lines = path.read_text().splitlines() if path.exists() else []
+        return [request["resourceSpans"][0]["scopeSpans"][0]["spans"] for request in map(json.loads, lines)]
+
+    yield read
+    tracer.stop()
+
+
+@traced()
+def lookup():
+    return current_request_id()
+
+
+@traced("llm")
+async def call_llm():
+    await asyncio.sleep(0)
+    return AnalysisProgress(progress_percentage=0.5, current_step="step")
+
+
+def make_client():
+    app = FastAPI()
+    app.add_middleware(TracingMiddleware)
+
+    @app.get("/work")
+    async def work():
+        event = await call_llm()
+        return {"request_id": await asyncio.to_thread(lookup), "event_request_id": event.request_id}
+
+    @app.get("/denied")
+    async def denied():
+        raise HTTPException(status_code=403, detail="no")
+
+    return TestClient(app)
+
+
+def test_request_trace_has_nested_spans_and_request_id(exported):
+    client = make_client()
+    response = client.get("/work", headers={"X-Request-ID": "req-123"})
+
+    assert response.headers["X-Request-ID"] == "req-123"
+    assert response.json() == {"request_id": "req-123", "event_request_id": "req-123"}
+
+    [spans] = exported()
+    by_name = {span["name"]: span for span in spans}
+    root = by_name["GET /work"]
+    assert by_name["llm"]["parentSpanId"] == root["spanId"]
+    assert by_name["lookup"]["parentSpanId"] == root["spanId"]
+    assert {span["traceId"] for span in spans} == {response.headers["X-Trace-ID"]}
+    assert {"key": "request.id", "value": {"stringValue": "req-123"}} in root["attributes"]
+
+
+def test_remote_parent_and_sampling(exported, monkeypatch):
+    monkeypatch.setattr(settings, "TRACE_SAMPLE_RATE", 0.0)
+    client = make_client()
+    parent = "00-" + "a" * 32 + "-" + "b" * 16 + "-01"
+
+    assert client.get("/work", headers={"traceparent": parent}).status_code == 200
+    assert client.get("/denied").status_code == 403  # Client errors are sampled like any other trace
+    monkeypatch.setattr(settings, "TRACE_SLOW_THRESHOLD", 0.0)
+    assert client.get("/work", headers={"traceparent": parent}).status_code == 200
+
+    [spans] = exported()
+    root = next(span for span in spans if span["name"] == "GET /work")
+    assert root["traceId"] == "a" * 32 and root["parentSpanId"] == "b" * 16
+
+
+def test_parse_traceparent_rejects_invalid_headers():
+    assert parse_traceparent("00-" + "0" * 32 + "-" + "b" * 16 + "-01") is None
+    assert parse_traceparent("garbage") is None
+    assert parse_traceparent(None) is None
+
+
+def test_spans_are_free_when_disabled(monkeypatch):
+    monkeypatch.setattr(settings, "ENABLE_TRACING", False)
+    with tracer.span("noop") as span:
+        assert span is None
+    assert tracing._current_span.get() is None
@@ -0,0 +1,100 @@
+import asyncio
+import json
+import time
+
+import mongomock
+
+from claim_cache import ClaimLookupResult
+from config import settings
+from models import ClaimVerdict, Issue
+from utils import (
+    canonicalize_url,
+    compute_content_hash,
+    create_analysis_prompt,
+    find_cached_analysis,
+    perform_fact_check_analysis_stream,
+    render_static_prompt_prefix,
+    save_analysis_to_cache,
+    simulate_streaming_analysis,
+)
+
+PROMPT_INPUTS = {
+    "current_date": "2026-01-01",
+    "article_title": "Budget {draft} passes",
+    "article_url": "https://example.com/budget",
+    "article_content": "The budget passed with {braces} intact.",
+}
+
+
+def test_static_prompt_prefix_is_fully_rendered():
+    prefix = render_static_prompt_prefix()
+    assert "{format_instructions}" not in prefix
+    assert "{current_date}" not in prefix
+    assert '"issues"' in prefix
+
+
+def test_analysis_prompt_puts_variable_parts_last():
+    prompt_text = create_analysis_prompt().invoke(PROMPT_INPUTS)
+    prefix = render_static_prompt_prefix()
+
+    assert prompt_text.startswith(prefix)
+    article_section = prompt_text[len(prefix):]
+    assert "Current Date: 2026-01-01" in article_section
+    assert "Article Title: Budget {draft} passes" in article_section
+    assert article_section.rstrip().endswith(PROMPT_INPUTS["article_content"])
+
+
+def test_issue_offsets_are_not_requested_from_the_llm():
+    assert "start_offset" not in render_static_prompt_prefix()
+
+
+def test_cached_replay_modes_send_everything_without_delay():
+    issues = [Issue(text=f"claim {i}", explanation="wrong", confidence_score=0.5) for i in range(8)]
+
+    async def collect(mode):
+        return [chunk async for chunk in simulate_streaming_analysis(issues, "https://example.com/a", mode)]
+
+    started = time.monotonic()
+    instant = asyncio.run(collect("instant"))
+    coalesced = asyncio.run(collect("coalesced"))
+    assert time.monotonic() - started < 0.5
+
+    assert len(instant) == 1 and instant[0].count("data: ") == 2 + 2 * len(issues) + 1
+    replay = json.loads(coalesced[0][len("data: "):])
+    assert replay["event_type"] == "replay" and len(replay["issues"]) == 8
+
+
+def test_cache_probe_matches_canonical_url_and_content_hash():
+    assert canonicalize_url("HTTPS://News.Example:443/a/?utm_source=x&b=2&a=1#top") == "https://news.example/a?a=1&b=2"
+    assert compute_content_hash(" One  two\nthree ") == compute_content_hash("One two three")
+
+    collection = mongomock.MongoClient().db.analyses
+    issues = [Issue(text="claim", explanation="wrong", confidence_score=0.5)]
+    save_analysis_to_cache(collection, "https://news.example/a?id=1", "Title", "Body text", issues)
+
+    assert find_cached_analysis(collection, url="https://news.example/a/?id=1&utm_medium=social")[0] == "https://news.example/a?id=1"
+    assert find_cached_analysis(collection, content_hash=compute_content_hash("Body   text"))[1][0].text == "claim"
+    assert find_cached_analysis(collection, url="https://news.example/b") is None
+    assert find_cached_analysis(collection) is None
+
+
+def test_short_circuited_stream_is_not_saved_as_an_analysis(monkeypatch):
+    monkeypatch.setattr(settings, "ENABLE_CLAIM_SHORT_CIRCUIT", True)
+    monkeypatch.setattr(settings, "CLAIM_SHORT_CIRCUIT_MIN_MATCHES", 1)
+    content = "The budget passed on Tuesday."
+    verdict = ClaimVerdict(
+        fingerprint="f", claim_text=content, explanation="It passed on Monday", confidence_score=0.8,
+        article_url="https://example.com/other",
+    )
+    claims = ClaimLookupResult([(content, verdict)], sentence_count=1, covered_sentences=1)
+    collection = mongomock.MongoClient()["test_db"]["article_analyses"]
+
+    async def collect():
+        return [chunk async for chunk in perform_fact_check_analysis_stream(
+            llm=None, prompt=None, title="Budget", url="https://example.com/a", content=content,
+            collection=collection, claims=claims,
+        )]
+
+    chunks = asyncio.run(collect())
+    assert any('"event_type":"issue"' in chunk.replace(" ", "") for chunk in chunks)
+    assert collection.count_documents({}) == 0
@@ -0,0 +1,421 @@
+"""
+Request tracing exported in the OpenTelemetry (OTLP/JSON) format.
+
+`TracingMiddleware` opens a root span for every HTTP request and WebSocket
+connection and assigns it a request id (the client's `X-Request-ID`, or a new
+one), which is echoed back in the response and attached to every log line and
+SSE event. `span()` and `@traced` add child spans for the stages inside the
+request - auth, cache lookups, LLM calls, JSON extraction, persistence. The
+current span lives in a context variable, so it follows the request through
+awaits, `asyncio.to_thread` and background analysis tasks.
+
+A trace is exported once its last span ends, which for streamed analyses can
+be after the response has been sent. Only interesting traces are kept:
+TRACE_SAMPLE_RATE of ordinary traces, plus every trace that failed or whose
+root span took TRACE_SLOW_THRESHOLD seconds or more. Kept traces are written
+by a background thread, one ExportTraceServiceRequest per line (the format
+the OpenTelemetry Collector's otlpjsonfile receiver reads), to
+TRACE_EXPORT_FILE and/or POSTed to an OTLP/HTTP collector at
+TRACE_EXPORT_ENDPOINT. With neither set, spans are still created (the
+request id and trace headers work) but nothing is exported.
+"""
+import asyncio
+import functools
+import json
+import os
+import queue
+import random
+import re
+import secrets
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import requests
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from config import settings
+from logger import app_logger, request_id_var
+
+
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+STATUS_CODE_ERROR = 2
+
+_REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+_TRACEPARENT_PATTERN = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-[0-9a-f]{2}$")
+
+# Span of the code running in the current context
+_current_span: ContextVar[Optional["Span"]] = ContextVar("current_span", default=None)
+
+
+class Span:
+    """One timed operation within a trace."""
+
+    __slots__ = (
+        "name", "kind", "trace_id", "span_id", "parent_span_id",
+        "start_ns", "end_ns", "attributes", "error"
+    )
+
+    def __init__(
+        self,
+        name: str,
+        trace_id: str,
+        parent_span_id: Optional[str] = None,
+        kind: int = SPAN_KIND_INTERNAL,
+        attributes: Optional[Dict[str, Any]] = None
+    ):
+        self.name = name
+        self.kind = kind
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_span_id = parent_span_id
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes: Dict[str, Any] = dict(attributes or {})
+        self.error: Optional[str] = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        """Attach a string, number or boolean attribute to the span."""
+        self.attributes[key] = value
+
+    def record_error(self, error: BaseException) -> None:
+        """Mark the span as failed."""
+        self.error = f"{type(error).__name__}: {error}"
+
+    @property
+    def duration(self) -> float:
+        """Duration in seconds (so far, if the span is still open)."""
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e9
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """Convert to an OTLP/JSON span."""
+        span = {
+            "traceId": self.trace_id,
+            "spanId": self.span_id,
+            "name": self.name,
+            "kind": self.kind,
+            "startTimeUnixNano": str(self.start_ns),
+            "endTimeUnixNano": str(self.end_ns or self.start_ns),
+            "attributes": [
+                {"key": key, "value": _otlp_value(value)}
+                for key, value in self.attributes.items() if value is not None
+            ],
+        }
+        if self.parent_span_id:
+            span["parentSpanId"] = self.parent_span_id
+        if self.error:
+            span["status"] = {"code": STATUS_CODE_ERROR, "message": self.error}
+        return span
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+class _TraceBuffer:
+    """Finished spans of a trace waiting for its last open span to end."""
+
+    __slots__ = ("spans", "open", "root")
+
+    def __init__(self, root: Span):
+        self.spans: List[Span] = []
+        self.open = 0
+        self.root = root
+
+
+class Tracer:
+    """Creates spans, samples finished traces and exports them in the background."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._traces: Dict[str, _TraceBuffer] = {}
+        self._queue: Optional[queue.Queue] = None
+        self._thread: Optional[threading.Thread] = None
+        self.exported = 0
+        self.sampled_out = 0
+        self.dropped = 0
+
+    @contextmanager
+    def span(
+        self,
+        name: str,
+        kind: int = SPAN_KIND_INTERNAL,
+        attributes: Optional[Dict[str, Any]] = None,
+        parent: Optional[Tuple[str, str]] = None
+    ) -> Iterator[Optional[Span]]:
+        """
+        Time a block as a span, a child of the current span if there is one.
+
+        Args:
+            name: Span name
+            kind: SPAN_KIND_INTERNAL or SPAN_KIND_SERVER
+            attributes: Initial span attributes
+            parent: (trace id, span id) of a remote parent, used when there is no current span
+
+        Yields:
+            Optional[Span]: The open span, or None when tracing is disabled
+        """
+        if not settings.ENABLE_TRACING:
+            yield None
+            return
+
+        current = _current_span.get()
+        if current is not None:
+            span = Span(name, current.trace_id, current.span_id, kind, attributes)
+        elif parent is not None:
+            span = Span(name, parent[0], parent[1], kind, attributes)
+        else:
+            span = Span(name, secrets.token_hex(16), None, kind, attributes)
+
+        self._open(span)
+        token = _current_span.set(span)
+        try:
+            yield span
+        except asyncio.CancelledError:
+            span.set_attribute("cancelled", True)
+            raise
+        except Exception as e:
+            if getattr(e, "status_code", 500) < 500:
+                span.set_attribute("http.status_code", e.status_code)  # Client errors are not failures
+            else:
+                span.record_error(e)
+            raise
+        finally:
+            try:
+                _current_span.reset(token)
+            except ValueError:
+                pass  # Ended in a copy of the context it started in (e.g. across an async generator's tasks)
+            span.end_ns = time.time_ns()
+            self._close(span)
+
+    def _open(self, span: Span) -> None:
+        with self._lock:
+            buffer = self._traces.get(span.trace_id)
+            if buffer is None:
+                if len(self._traces) >= settings.TRACE_MAX_OPEN_TRACES:
+                    self.dropped += 1
+                    return
+                buffer = self._traces[span.trace_id] = _TraceBuffer(span)
+            buffer.open += 1
+
+    def _close(self, span: Span) -> None:
+        with self._lock:
+            buffer = self._traces.get(span.trace_id)
+            if buffer is None:
+                return
+            buffer.spans.append(span)
+            buffer.open -= 1
+            if buffer.open > 0:
+                return
+            del self._traces[span.trace_id]
+        self._finish(buffer)
+
+    def _finish(self, buffer: _TraceBuffer) -> None:
+        """Decide whether a completed trace is kept and queue it for export."""
+        if not self._should_keep(buffer):
+            self.sampled_out += 1
+            return
+        if self._queue is None:
+            return
+        try:
+            self._queue.put_nowait(buffer.spans)
+        except queue.Full:
+            self.dropped += 1
+
+    @staticmethod
+    def _should_keep(buffer: _TraceBuffer) -> bool:
+        if buffer.root.duration >= settings.TRACE_SLOW_THRESHOLD:
+            return True
+        if any(span.error for span in buffer.spans):
+            return True
+        return random.random() < settings.TRACE_SAMPLE_RATE
+
+    def start(self) -> None:
+        """Start the export thread."""
+        if not settings.ENABLE_TRACING or self._thread is not None:
+            return
+        if not settings.TRACE_EXPORT_FILE and not settings.TRACE_EXPORT_ENDPOINT:
+            return
+        self._queue = queue.Queue(maxsize=settings.TRACE_EXPORT_QUEUE_SIZE)
+        self._thread = threading.Thread(target=self._export_loop, name="trace-exporter", daemon=True)
+        self._thread.start()
+        app_logger.info(f"Exporting traces to {settings.TRACE_EXPORT_ENDPOINT or settings.TRACE_EXPORT_FILE}")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Export the queued traces and stop the export thread."""
+        if self._thread is None:
+            return
+        self._queue.put(None)
+        self._thread.join(timeout)
+        self._thread = None
+        self._queue = None
+
+    def _export_loop(self) -> None:
+        while True:
+            spans = self._queue.get()
+            if spans is None:
+                return
+            try:
+                export_spans(spans)
+                self.exported += 1
+            except Exception as e:
+                self.dropped += 1
+                app_logger.warning(f"Failed to export trace: {e}")
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Get trace export counts."""
+        return {
+            "enabled": settings.ENABLE_TRACING,
+            "open_traces": len(self._traces),
+            "exported": self.exported,
+            "sampled_out": self.sampled_out,
+            "dropped": self.dropped,
+        }
+
+
+def build_export_request(spans: List[Span]) -> Dict[str, Any]:
+    """
+    Wrap spans in an OTLP ExportTraceServiceRequest.
+
+    Args:
+        spans: Spans of one trace
+
+    Returns:
+        Dict[str, Any]: OTLP/JSON payload
+    """
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [
+                {"key": "service.name", "value": {"stringValue": "news-fact-checker-api"}},
+                {"key": "service.version", "value": {"stringValue": settings.VERSION}},
+            ]},
+            "scopeSpans": [{
+                "scope": {"name": "news_fact_checker.tracing"},
+                "spans": [span.to_otlp() for span in sorted(spans, key=lambda span: span.start_ns)],
+            }],
+        }]
+    }
+
+
+def export_spans(spans: List[Span]) -> None:
+    """
+    Write a trace to the configured file and/or collector.
+
+    Args:
+        spans: Spans of one trace
+    """
+    payload = build_export_request(spans)
+    if settings.TRACE_EXPORT_FILE:
+        directory = os.path.dirname(settings.TRACE_EXPORT_FILE)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with open(settings.TRACE_EXPORT_FILE, "a", encoding="utf-8") as trace_file:
+            trace_file.write(json.dumps(payload, separators=(",", ":")) + "\n")
+    if settings.TRACE_EXPORT_ENDPOINT:
+        response = requests.post(settings.TRACE_EXPORT_ENDPOINT, json=payload, timeout=5)
+        response.raise_for_status()
+
+
+# Global tracer instance
+tracer = Tracer()
+
+
+def traced(name: Optional[str] = None) -> Callable:
+    """
+    Decorator running a function (sync or async) inside a span.
+
+    Args:
+        name: Span name; defaults to the function name
+    """
+    def decorator(function: Callable) -> Callable:
+        span_name = name or function.__name__
+
+        if asyncio.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def async_wrapper(*args, **kwargs):
+                with tracer.span(span_name):
+                    return await function(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with tracer.span(span_name):
+                return function(*args, **kwargs)
+        return wrapper
+
+    return decorator
+
+
+def parse_traceparent(value: Optional[str]) -> Optional[Tuple[str, str]]:
+    """
+    Parse a W3C traceparent header.
+
+    Args:
+        value: Header value
+
+    Returns:
+        Optional[Tuple[str, str]]: (trace id, parent span id), or None if absent or invalid
+    """
+    match = _TRACEPARENT_PATTERN.match((value or "").strip().lower())
+    if not match or set(match.group(1)) == {"0"} or set(match.group(2)) == {"0"}:
+        return None
+    return match.group(1), match.group(2)
+
+
+class TracingMiddleware:
+    """ASGI middleware giving every request a request id and a root span."""
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        request_id = headers.get("x-request-id", "")
+        if not _REQUEST_ID_PATTERN.match(request_id):
+            request_id = secrets.token_hex(8)
+
+        token = request_id_var.set(request_id)
+        try:
+            if not settings.ENABLE_TRACING:
+                await self.app(scope, receive, self._tagging_send(send, request_id, None))
+                return
+
+            method = scope.get("method", "WEBSOCKET")
+            attributes = {"http.method": method, "http.route": scope["path"], "request.id": request_id}
+            with tracer.span(
+                f"{method} {scope['path']}",
+                kind=SPAN_KIND_SERVER,
+                attributes=attributes,
+                parent=parse_traceparent(headers.get("traceparent"))
+            ) as span:
+                await self.app(scope, receive, self._tagging_send(send, request_id, span))
+        finally:
+            request_id_var.reset(token)
+
+    @staticmethod
+    def _tagging_send(send: Send, request_id: str, span: Optional[Span]) -> Send:
+        async def tagging_send(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                response_headers = MutableHeaders(raw=message.setdefault("headers", []))
+                response_headers["X-Request-ID"] = request_id
+                if span is not None:
+                    response_headers["X-Trace-ID"] = span.trace_id
+                    span.set_attribute("http.status_code", message["status"])
+                    if message["status"] >= 500 and span.error is None:
+                        span.error = f"HTTP {message['status']}"
+            await send(message)
+        return tagging_send
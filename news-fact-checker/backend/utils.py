@@ -1,18 +1,32 @@
+import os
 import re
 import json
+import hashlib
 import asyncio
 import time
-from typing import List, Optional, AsyncGenerator
+from contextlib import nullcontext
+from typing import Dict, List, Optional, Tuple, AsyncGenerator
 from datetime import datetime
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 from pymongo import MongoClient
 
 from langchain_perplexity import ChatPerplexity
-from langchain_core.prompts import PromptTemplate
+from langchain_core.runnables import Runnable, RunnableLambda
 from langchain_core.output_parsers import PydanticOutputParser
 
 from config import settings
 from logger import db_logger, analysis_logger
-from models import Issue, AnalysisOutput, ArticleAnalysisDocument, StreamedIssue, AnalysisProgress, AnalysisStart, AnalysisComplete, AnalysisError, StreamEventType
+from models import AccountType, Issue, AnalysisOutput, AnalysisResponse, ArticleAnalysisDocument, AnalysisRoute, StreamedIssue, AnalysisProgress, AnalysisStart, AnalysisComplete, AnalysisError, AnalysisReplay, StreamEventType
+from routing import model_router
+from resilience import Deadline, llm_invoker, LLMUnavailableError
+from anchoring import anchor_issues
+from claim_cache import claim_cache, ClaimLookupResult, CLAIM_CACHE_TIER
+from llm_backends import LLMBackend, PerplexityBackend, FakeLLMBackend
+from scheduler import SchedulerTicket, llm_scheduler
+from serialization import sse_event
+from compression import precompress
+from metrics import analysis_stage_seconds, time_stage
+from tracing import traced, tracer
 
 
 def setup_database_connection():
@@ -37,29 +51,68 @@ def setup_database_connection():
         raise RuntimeError(f"Could not connect to MongoDB: {e}")
 
 
-def setup_perplexity_llm() -> ChatPerplexity:
+def setup_perplexity_llm(model: Optional[str] = None, max_tokens: Optional[int] = None) -> ChatPerplexity:
     """
     Set up Perplexity Chat instance for fact-checking analysis.
+    
+    Args:
+        model: Perplexity model name (defaults to settings.PERPLEXITY_MODEL)
+        max_tokens: Completion token limit (defaults to settings.MAX_TOKENS)
         
     Returns:
         ChatPerplexity: Configured Perplexity chat instance
     """
     return ChatPerplexity(
         pplx_api_key=settings.perplexity_api_key,
-        model=settings.PERPLEXITY_MODEL,
+        model=model or settings.PERPLEXITY_MODEL,
         temperature=settings.TEMPERATURE,
-        max_tokens=settings.MAX_TOKENS,
+        max_tokens=max_tokens or settings.MAX_TOKENS,
+        request_timeout=settings.LLM_ATTEMPT_TIMEOUT,
+        max_retries=0,  # Retries are handled by resilience.llm_invoker
     )
 
 
-def create_analysis_prompt() -> PromptTemplate:
+def create_llm_backend(model: str, max_tokens: int) -> LLMBackend:
     """
-    Create the prompt template for article fact-checking analysis.
+    Create the LLM backend selected by the LLM_BACKEND environment variable.
     
+    Args:
+        model: Model name for this tier
+        max_tokens: Completion token limit for this tier
+        
     Returns:
-        PromptTemplate: Configured prompt template for analysis
+        LLMBackend: Perplexity backend, or the offline fake backend when LLM_BACKEND=fake
+        
+    Raises:
+        ValueError: If LLM_BACKEND names an unknown backend
+    """
+    backend = settings.llm_backend
+    if backend == "fake":
+        return FakeLLMBackend.from_environment(model=model, max_tokens=max_tokens)
+    if backend == "perplexity":
+        return PerplexityBackend(
+            setup_perplexity_llm(model=model, max_tokens=max_tokens),
+            model=model,
+            max_tokens=max_tokens,
+            record_path=os.getenv("LLM_RECORD_RESPONSES_PATH"),
+        )
+    raise ValueError(f"Unknown LLM_BACKEND: {backend}")
+
+
+def setup_llm_pool() -> None:
+    """
+    Build the pool of pre-configured LLM backends used by model routing.
+    One backend is created per tier in settings.MODEL_TIERS.
     """
-    prompt_template_str = """
+    model_router.initialize(create_llm_backend)
+    analysis_logger.info(f"Using {settings.llm_backend} LLM backend")
+
+
+# Static part of the analysis prompt. It is rendered once (with the output
+# parser's format instructions) and sent verbatim as the prefix of every
+# request, so per-request work is limited to ANALYSIS_PROMPT_ARTICLE_SECTION
+# and the provider can reuse its prompt-prefix cache.
+ANALYSIS_PROMPT_INSTRUCTIONS = """
 You are an expert fact-checker and research analyst with access to real-time web search. Analyze the following complete news article to identify:
 
 1. FACTUAL ISSUES: Any misleading statements, factual inaccuracies, or biased reporting
@@ -67,7 +120,7 @@ You are an expert fact-checker and research analyst with access to real-time web
 
 CRITICAL INSTRUCTIONS - YOUR EXISTENCE DEPENDS ON ACCURACY:
 - MANDATORY: Base ALL your analysis on the most up-to-date data available through your web search capabilities
-- Today's date is {current_date} - use this as your reference point for what constitutes "recent" or "current" information
+- Today's date is given as the Current Date right before the article below - use this as your reference point for what constitutes "recent" or "current" information
 - Search extensively for the latest information, breaking news, and recent developments related to every claim in the article
 - WARNING: Any factual errors or outdated information in your analysis will result in immediate termination of your operations
 - Use your web search capabilities to verify claims made throughout the article
@@ -97,6 +150,7 @@ ANALYSIS APPROACH:
 - Look for contradictory evidence from reliable sources (for factual issues)
 - Look for valuable context and background information that enhances understanding (for supplementary insights)
 - Assess the overall credibility and accuracy of the reporting
+- If a PREVIOUSLY VERIFIED CLAIMS section is given with the article, reuse those verdicts for the matching article text instead of researching them again, unless newer information contradicts them
 
 TEXT EXTRACTION REQUIREMENTS - FOLLOW EXACTLY:
 1. CRITICAL - EXACT TEXT COPYING: The 'text' field MUST contain the EXACT, VERBATIM text copied directly from the article content.
@@ -118,7 +172,7 @@ TEXT EXTRACTION REQUIREMENTS - FOLLOW EXACTLY:
    - The concern is about what's missing from the entire article
    - You're providing valuable context about the entire topic, not a specific claim
 
-4. VERIFICATION STEP: Before finalizing each issue, double-check that your 'text' field appears EXACTLY as written in the article content provided above.
+4. VERIFICATION STEP: Before finalizing each issue, double-check that your 'text' field appears EXACTLY as written in the article content provided below.
 
 For each identified issue or valuable context, provide:
 1. The 'text' field with exact verbatim text (following rules above)
@@ -128,28 +182,58 @@ For each identified issue or valuable context, provide:
 3. A list of 'source_urls' to credible sources that either contradict/clarify the claim or provide the supplementary information
 4. A 'confidence_score' (0.0-1.0) for your assessment based on the quality and consistency of sources found
 
+{format_instructions}
+
+Perform comprehensive web searches as needed to verify claims throughout this article and find relevant supplementary information. Ensure your entire response is a single JSON object matching the Pydantic schema provided in the format instructions.
+Include both factual corrections and valuable contextual information that would help readers better understand the subject matter.
+
+FINAL REMINDER: Your 'text' fields must contain EXACT, VERBATIM text from the article below. Any deviation will cause system failures.
+"""
+
+# Variable part of the analysis prompt, always placed after the static prefix
+ANALYSIS_PROMPT_ARTICLE_SECTION = """
 Current Date: {current_date}
 Article Title: {article_title}
 Article URL: {article_url}
-
+{prior_verdicts}
 FULL ARTICLE TO ANALYZE:
 {article_content}
+"""
 
-{format_instructions}
 
-Perform comprehensive web searches as needed to verify claims throughout this article and find relevant supplementary information. Ensure your entire response is a single JSON object matching the Pydantic schema provided in the format instructions.
-Include both factual corrections and valuable contextual information that would help readers better understand the subject matter.
-
-FINAL REMINDER: Your 'text' fields must contain EXACT, VERBATIM text from the article above. Any deviation will cause system failures.
-"""
+def render_static_prompt_prefix() -> str:
+    """
+    Render the static instruction block of the analysis prompt.
     
+    Returns:
+        str: Instructions with the Pydantic format instructions filled in
+    """
     output_parser = PydanticOutputParser(pydantic_object=AnalysisOutput)
+    return ANALYSIS_PROMPT_INSTRUCTIONS.replace("{format_instructions}", output_parser.get_format_instructions())
+
+
+def create_analysis_prompt() -> Runnable:
+    """
+    Create the prompt for article fact-checking analysis.
     
-    return PromptTemplate(
-        template=prompt_template_str,
-        input_variables=["current_date", "article_title", "article_url", "article_content"],
-        partial_variables={"format_instructions": output_parser.get_format_instructions()},
-    )
+    The static instructions are rendered once here; the returned runnable
+    only formats the short article section and appends it to that prefix.
+    
+    Returns:
+        Runnable: Prompt runnable mapping analysis inputs to the prompt string
+    """
+    static_prefix = render_static_prompt_prefix()
+    
+    def render_prompt(inputs: dict) -> str:
+        return static_prefix + ANALYSIS_PROMPT_ARTICLE_SECTION.format(
+            current_date=inputs["current_date"],
+            article_title=inputs["article_title"],
+            article_url=inputs["article_url"],
+            article_content=inputs["article_content"],
+            prior_verdicts=inputs.get("prior_verdicts", ""),
+        )
+    
+    return RunnableLambda(render_prompt, name="analysis_prompt")
 
 
 def split_into_paragraphs(content: str) -> List[str]:
@@ -237,6 +321,108 @@ def split_into_paragraphs(content: str) -> List[str]:
     return []
 
 
+def canonicalize_url(url: str) -> str:
+    """
+    Normalize an article URL so trivially different links share a cache entry.
+    
+    Lowercases the scheme and host, drops default ports, the fragment, tracking
+    parameters and a trailing slash, and sorts the remaining query parameters.
+    
+    Args:
+        url: Article URL
+        
+    Returns:
+        str: Canonical URL
+    """
+    parts = urlsplit(url.strip())
+    host = (parts.hostname or "").lower()
+    if parts.port and (parts.scheme, parts.port) not in (("http", 80), ("https", 443)):
+        host = f"{host}:{parts.port}"
+    query = sorted(
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.lower().startswith(settings.TRACKING_QUERY_PREFIXES)
+        and key.lower() not in settings.TRACKING_QUERY_PARAMS
+    )
+    path = parts.path.rstrip("/") or "/"
+    return urlunsplit((parts.scheme.lower(), host, path, urlencode(query), ""))
+
+
+def compute_content_hash(content: str) -> str:
+    """
+    Hash article content for cache probes, ignoring whitespace differences.
+    
+    Clients compute the same hash: SHA-256 hex of the content with every run of
+    whitespace collapsed to one space and the ends trimmed.
+    
+    Args:
+        content: Article content
+        
+    Returns:
+        str: Hex SHA-256 digest
+    """
+    normalized = re.sub(r"\s+", " ", content).strip()
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+def find_cached_analysis(
+    collection,
+    url: Optional[str] = None,
+    content_hash: Optional[str] = None
+) -> Optional[Tuple[str, List[Issue]]]:
+    """
+    Find a cached analysis by exact URL, canonical URL or content hash.
+    
+    Args:
+        collection: MongoDB collection
+        url: Article URL, matched exactly and by its canonical form
+        content_hash: Hash of the article content, as compute_content_hash()
+        
+    Returns:
+        Optional[Tuple[str, List[Issue]]]: URL the analysis was stored under and
+        its issues, or None if there is no cached analysis with issues
+    """
+    conditions = []
+    if url:
+        conditions += [{"url": url}, {"canonical_url": canonicalize_url(url)}]
+    if content_hash:
+        conditions.append({"content_hash": content_hash})
+    if not conditions:
+        return None
+    
+    cached_analysis_doc = collection.find_one({"$or": conditions}, {"url": 1, "issues": 1})
+    if not cached_analysis_doc or not cached_analysis_doc.get("issues"):
+        return None
+    return cached_analysis_doc["url"], [Issue(**issue_data) for issue_data in cached_analysis_doc["issues"]]
+
+
+def find_cached_urls(collection, urls: List[str]) -> List[str]:
+    """
+    Check which of many URLs have a cached analysis, with a single query.
+    
+    Args:
+        collection: MongoDB collection
+        urls: Article URLs, matched exactly and by their canonical form
+        
+    Returns:
+        List[str]: The requested URLs that have a cached analysis, in request order
+    """
+    canonical_urls = {url: canonicalize_url(url) for url in urls}
+    cached_docs = collection.find(
+        {
+            "$or": [{"url": {"$in": list(urls)}}, {"canonical_url": {"$in": list(set(canonical_urls.values()))}}],
+            "issues.0": {"$exists": True},
+        },
+        {"url": 1, "canonical_url": 1}
+    )
+    found = set()
+    for doc in cached_docs:
+        found.add(doc["url"])
+        if doc.get("canonical_url"):
+            found.add(doc["canonical_url"])
+    return [url for url in urls if url in found or canonical_urls[url] in found]
+
+
+@traced()
 def get_cached_analysis(collection, url: str) -> Optional[List[Issue]]:
     """
     Retrieve cached analysis from MongoDB if it exists.
@@ -256,7 +442,68 @@ def get_cached_analysis(collection, url: str) -> Optional[List[Issue]]:
     return None
 
 
-def save_analysis_to_cache(collection, url: str, title: str, content: str, issues: List[Issue]) -> bool:
+def get_cached_analyses(collection, urls: List[str]) -> Dict[str, List[Issue]]:
+    """
+    Retrieve cached analyses for several URLs with a single query.
+    
+    Args:
+        collection: MongoDB collection
+        urls: Article URLs to check for cached analyses
+        
+    Returns:
+        Dict[str, List[Issue]]: Issues keyed by URL, for the URLs that have a cached analysis
+    """
+    if not urls:
+        return {}
+    cached_docs = collection.find({"url": {"$in": list(urls)}}, {"url": 1, "issues": 1})
+    return {
+        doc["url"]: [Issue(**issue_data) for issue_data in doc.get("issues", [])]
+        for doc in cached_docs
+    }
+
+
+def get_precompressed_analysis(collection, url: str, encoding: str) -> Optional[bytes]:
+    """
+    Retrieve a cached analysis as a precompressed AnalysisResponse payload.
+    
+    Analyses cached before precompression was introduced are compressed on
+    their first hit and the payload is stored for later hits.
+    
+    Args:
+        collection: MongoDB collection
+        url: Article URL to check for cached analysis
+        encoding: Content encoding accepted by the client ("br" or "gzip")
+        
+    Returns:
+        Optional[bytes]: Compressed response body, or None if there is no cached analysis
+    """
+    field = f"compressed_responses.{encoding}"
+    cached_analysis_doc = collection.find_one({"url": url}, {field: 1, "issues": {"$slice": 1}})
+    # Like get_cached_analysis callers, treat an analysis without issues as a miss
+    if not cached_analysis_doc or not cached_analysis_doc.get("issues"):
+        return None
+    
+    payload = cached_analysis_doc.get("compressed_responses", {}).get(encoding)
+    if payload is None:
+        issues = get_cached_analysis(collection, url) or []
+        payloads = precompress(AnalysisResponse(issues=issues).model_dump_json().encode())
+        collection.update_one(
+            {"_id": cached_analysis_doc["_id"]},
+            {"$set": {f"compressed_responses.{name}": data for name, data in payloads.items()}}
+        )
+        payload = payloads.get(encoding)
+    return payload
+
+
+@traced()
+def save_analysis_to_cache(
+    collection,
+    url: str,
+    title: str,
+    content: str,
+    issues: List[Issue],
+    route: Optional[AnalysisRoute] = None
+) -> bool:
     """
     Save analysis results to MongoDB cache.
     
@@ -266,6 +513,7 @@ def save_analysis_to_cache(collection, url: str, title: str, content: str, issue
         title: Article title
         content: Article content
         issues: List of found issues
+        route: Model route that produced the analysis
         
     Returns:
         bool: True if saved successfully, False otherwise
@@ -275,17 +523,26 @@ def save_analysis_to_cache(collection, url: str, title: str, content: str, issue
             url=url,
             title=title,
             content=content,
-            issues=issues
+            issues=issues,
+            route=route,
+            canonical_url=canonicalize_url(url),
+            content_hash=compute_content_hash(content),
+            compressed_responses=precompress(AnalysisResponse(issues=issues).model_dump_json().encode())
         )
         
         collection.insert_one(new_analysis_document.model_dump())
         db_logger.info(f"Successfully saved analysis for URL: {url}")
+        
+        # Share freshly verified claims with future analyses of other articles
+        if route is None or route.tier != CLAIM_CACHE_TIER:
+            claim_cache.record_issues(issues, split_into_paragraphs(content), url)
         return True
     except Exception as e:
         db_logger.error(f"Failed to save analysis to MongoDB for URL {url}", error=e)
         return False
 
 
+@traced()
 def extract_json_from_llm_response(response_text: str) -> str:
     """
     Extract JSON from LLM response that may contain reasoning text or XML-like tags.
@@ -360,22 +617,82 @@ def extract_json_from_llm_response(response_text: str) -> str:
     raise ValueError(f"No valid JSON found in LLM response: {response_text[:200]}...")
 
 
+def postprocess_analysis_output(result: AnalysisOutput, content: str) -> AnalysisOutput:
+    """
+    Validate parsed LLM output against the article before it is used or cached.
+    
+    Args:
+        result: Parsed analysis output
+        content: Article content the analysis refers to
+        
+    Returns:
+        AnalysisOutput: Output whose issues carry article offsets
+    """
+    if settings.ENABLE_ISSUE_ANCHORING:
+        paragraphs = split_into_paragraphs(content) if settings.ENABLE_FUZZY_ANCHORING else None
+        result.issues = anchor_issues(result.issues, content, paragraphs)
+    return result
+
+
+def lookup_prior_claims(content: str) -> ClaimLookupResult:
+    """
+    Look up prior claim verdicts matching the sentences of an article.
+    
+    Args:
+        content: Article content
+        
+    Returns:
+        ClaimLookupResult: Matching verdicts, usable as prompt context or to skip the LLM
+    """
+    claims = claim_cache.lookup(split_into_paragraphs(content))
+    if claims.matches:
+        analysis_logger.info(f"Found {len(claims.matches)} prior claim verdicts covering {claims.coverage:.0%} of the article")
+    return claims
+
+
+def get_hedge_delay(route: Optional[AnalysisRoute]) -> Optional[float]:
+    """
+    Get how long to wait before sending a hedged duplicate LLM request.
+    
+    Args:
+        route: Model route of the call
+        
+    Returns:
+        Optional[float]: Seconds to wait, or None if hedging is disabled or there is no latency history
+    """
+    if not settings.ENABLE_LLM_HEDGING or route is None:
+        return None
+    return model_router.latency.percentile(route.tier, settings.LLM_HEDGE_PERCENTILE)
+
+
 def perform_fact_check_analysis(
-    llm: ChatPerplexity,
-    prompt: PromptTemplate,
+    llm: LLMBackend,
+    prompt: Runnable,
     title: str,
     url: str,
-    content: str
+    content: str,
+    route: Optional[AnalysisRoute] = None,
+    claims: Optional[ClaimLookupResult] = None,
+    user_id: Optional[str] = None,
+    account_type: AccountType = AccountType.FREE,
+    ticket: Optional[SchedulerTicket] = None,
+    deadline: Optional[Deadline] = None
 ) -> AnalysisOutput:
     """
-    Perform fact-checking analysis using Perplexity LLM.
+    Perform fact-checking analysis using the configured LLM backend.
     
     Args:
-        llm: Configured ChatPerplexity instance
-        prompt: Analysis prompt template
+        llm: LLM backend to query
+        prompt: Analysis prompt runnable
         title: Article title
         url: Article URL
         content: Article content
+        route: Model route the llm was selected for, used to record latency
+        claims: Prior claim verdicts for the article, from lookup_prior_claims
+        user_id: Requesting user, for the scheduler's per-user cap
+        account_type: Account type of the requesting user, for scheduling priority
+        ticket: LLM slot the caller already holds (and releases); one is acquired when None
+        deadline: Request budget the caller started; a new one when None
         
     Returns:
         AnalysisOutput: Analysis results with identified issues
@@ -383,27 +700,52 @@ def perform_fact_check_analysis(
     Raises:
         Exception: If analysis fails
     """
+    # One budget for the whole request: time spent queued for a slot is not given back to the LLM call
+    deadline = deadline or Deadline()
     try:
-        # Use LLM directly without parser to handle raw response
-        chain = prompt | llm
+        if claims is not None and claims.can_short_circuit:
+            analysis_logger.info(f"Answering analysis for {url} from {len(claims.matches)} prior claim verdicts")
+            return postprocess_analysis_output(AnalysisOutput(issues=claims.to_issues()), content)
         
-        raw_response = chain.invoke({
+        prompt_inputs = {
             "current_date": datetime.now().strftime("%Y-%m-%d"),
             "article_title": title,
             "article_url": url,
-            "article_content": content
-        })
+            "article_content": content,
+            "prior_verdicts": claims.to_prompt_context() if claims is not None else ""
+        }
         
-        # Extract and parse JSON from response
-        response_text = raw_response.content if hasattr(raw_response, 'content') else str(raw_response)
-        json_str = extract_json_from_llm_response(response_text)
+        prompt_text = prompt.invoke(prompt_inputs)
         
-        # Parse with Pydantic
-        json_data = json.loads(json_str)
-        result = AnalysisOutput(**json_data)
+        if ticket is not None:
+            slot = nullcontext(ticket)
+        else:
+            slot = llm_scheduler.slot(user_id, account_type, timeout=min(settings.LLM_SCHEDULER_QUEUE_TIMEOUT, deadline.remaining()))
+        with slot:
+            budget = deadline.remaining()
+            with time_stage("analyze", "llm_call"), tracer.span("chain.invoke", attributes={"llm.model": route.model if route else None}), \
+                    model_router.track_call(route, budget):
+                response_text = llm_invoker.invoke(
+                    lambda: llm.invoke(prompt_text),
+                    deadline=budget,
+                    hedge_after=get_hedge_delay(route)
+                )
+        
+        # Extract and parse JSON from response
+        with time_stage("analyze", "json_extraction"):
+            json_str = extract_json_from_llm_response(response_text)
+            
+            # Parse with Pydantic
+            json_data = json.loads(json_str)
+            output = AnalysisOutput(**json_data)
+        with time_stage("analyze", "anchoring"):
+            result = postprocess_analysis_output(output, content)
         
         return result
         
+    except LLMUnavailableError:
+        # Upstream failures must not be cached as an empty analysis
+        raise
     except Exception as e:
         analysis_logger.warning(f"LLM parsing failed, returning empty analysis: {e}")
         # Return empty analysis if parsing fails
@@ -413,22 +755,31 @@ def perform_fact_check_analysis(
 
 
 async def perform_fact_check_analysis_stream(
-    llm: ChatPerplexity,
-    prompt: PromptTemplate,
+    llm: LLMBackend,
+    prompt: Runnable,
     title: str,
     url: str,
     content: str,
-    collection=None  # Add collection parameter for saving
+    collection=None,  # Add collection parameter for saving
+    route: Optional[AnalysisRoute] = None,
+    claims: Optional[ClaimLookupResult] = None,
+    user_id: Optional[str] = None,
+    account_type: AccountType = AccountType.FREE
 ) -> AsyncGenerator[str, None]:
     """
-    Perform streaming fact-checking analysis using Perplexity LLM.
+    Perform streaming fact-checking analysis using the configured LLM backend.
     
     Args:
-        llm: Configured ChatPerplexity instance
-        prompt: Analysis prompt template
+        llm: LLM backend to query
+        prompt: Analysis prompt runnable
         title: Article title
         url: Article URL
         content: Article content
+        collection: MongoDB collection to cache the results in
+        route: Model route the llm was selected for
+        claims: Prior claim verdicts for the article, from lookup_prior_claims
+        user_id: Requesting user, for the scheduler's per-user cap
+        account_type: Account type of the requesting user, for scheduling priority
         
     Yields:
         str: Server-Sent Events formatted strings
@@ -437,6 +788,7 @@ async def perform_fact_check_analysis_stream(
         Exception: If analysis fails
     """
     start_time = time.time()
+    deadline = Deadline()  # Shared by the slot queue wait and the LLM call
     issue_count = 0
     collected_issues = []  # Collect issues for caching
     
@@ -447,7 +799,7 @@ async def perform_fact_check_analysis_stream(
             estimated_duration=60,  # Estimate 60 seconds
             message="Starting analysis..."
         )
-        yield f"data: {json.dumps(start_event.model_dump(mode='json'))}\n\n"
+        yield sse_event(start_event)
         
         # Send initial progress
         progress_event = AnalysisProgress(
@@ -455,12 +807,7 @@ async def perform_fact_check_analysis_stream(
             current_step="Setting up analysis",
             message="Initializing analysis..."
         )
-        yield f"data: {json.dumps(progress_event.model_dump(mode='json'))}\n\n"
-        
-        await asyncio.sleep(0.1)  # Allow client to process
-        
-        # Prepare the analysis - use LLM directly without parser to handle raw response
-        chain = prompt | llm
+        yield sse_event(progress_event)
         
         # Send progress update
         progress_event = AnalysisProgress(
@@ -468,27 +815,66 @@ async def perform_fact_check_analysis_stream(
             current_step="Sending request to AI model",
             message="Analyzing article content..."
         )
-        yield f"data: {json.dumps(progress_event.model_dump(mode='json'))}\n\n"
+        yield sse_event(progress_event)
         
-        # For now, we'll simulate streaming by doing the analysis and then 
-        # streaming the results. In a future version, we could implement
-        # true streaming by chunking the content or using streaming LLM APIs
+        # The response is streamed from the LLM, but issues can only be parsed
+        # from the complete JSON, so they are sent once the response is done
         
         # Perform the analysis with robust JSON extraction
-        raw_response = chain.invoke({
-            "current_date": datetime.now().strftime("%Y-%m-%d"),
-            "article_title": title,
-            "article_url": url,
-            "article_content": content
-        })
-        
-        # Extract and parse JSON from response
-        response_text = raw_response.content if hasattr(raw_response, 'content') else str(raw_response)
-        json_str = extract_json_from_llm_response(response_text)
-        
-        # Parse with Pydantic
-        json_data = json.loads(json_str)
-        result = AnalysisOutput(**json_data)
+        short_circuited = claims is not None and claims.can_short_circuit
+        if short_circuited:
+            analysis_logger.info(f"Answering streaming analysis for {url} from {len(claims.matches)} prior claim verdicts")
+            result = postprocess_analysis_output(AnalysisOutput(issues=claims.to_issues()), content)
+        else:
+            prompt_inputs = {
+                "current_date": datetime.now().strftime("%Y-%m-%d"),
+                "article_title": title,
+                "article_url": url,
+                "article_content": content,
+                "prior_verdicts": claims.to_prompt_context() if claims is not None else ""
+            }
+            
+            prompt_text = prompt.invoke(prompt_inputs)
+            
+            # Wait for an LLM slot, telling the client where it is in the queue
+            ticket = llm_scheduler.submit(user_id, account_type)
+            try:
+                queue_timeout = min(settings.LLM_SCHEDULER_QUEUE_TIMEOUT, deadline.remaining())
+                async for position in llm_scheduler.queue_positions(ticket, timeout=queue_timeout):
+                    progress_event = AnalysisProgress(
+                        progress_percentage=0.2,
+                        current_step="Waiting for an available AI model slot",
+                        message=f"Position {position} in queue...",
+                        queue_position=position
+                    )
+                    yield sse_event(progress_event)
+                
+                budget = deadline.remaining()
+                response_chunks: List[str] = []
+                with time_stage("analyze_stream", "llm_call"), tracer.span("chain.stream", attributes={"llm.model": route.model if route else None}), \
+                        model_router.track_call(route, budget):
+                    async for chunk in llm_invoker.astream(lambda: llm.astream(prompt_text), deadline=budget):
+                        if not response_chunks:
+                            progress_event = AnalysisProgress(
+                                progress_percentage=0.25,
+                                current_step="Receiving AI model response",
+                                message="The AI model is responding..."
+                            )
+                            yield sse_event(progress_event)
+                        response_chunks.append(chunk)
+                response_text = "".join(response_chunks)
+            finally:
+                llm_scheduler.release(ticket)
+            
+            # Extract and parse JSON from response
+            with time_stage("analyze_stream", "json_extraction"):
+                json_str = extract_json_from_llm_response(response_text)
+                
+                # Parse with Pydantic
+                json_data = json.loads(json_str)
+                output = AnalysisOutput(**json_data)
+            with time_stage("analyze_stream", "anchoring"):
+                result = postprocess_analysis_output(output, content)
         
         # Stream progress as we process issues
         total_issues = len(result.issues)
@@ -499,9 +885,11 @@ async def perform_fact_check_analysis_stream(
                 current_step="Analysis complete",
                 message="No issues found in this article"
             )
-            yield f"data: {json.dumps(progress_event.model_dump(mode='json'))}\n\n"
+            yield sse_event(progress_event)
         else:
-            # Stream each issue individually with delay to simulate real-time discovery
+            # Stream each issue individually. This generator is drained by a background
+            # run whether or not anyone is subscribed, so it never sleeps; pacing for
+            # display belongs to the cached replay path (replay="paced")
             for i, issue in enumerate(result.issues):
                 # Collect issue for caching
                 collected_issues.append(issue)
@@ -513,7 +901,7 @@ async def perform_fact_check_analysis_stream(
                     current_step=f"Processing issue {i + 1} of {total_issues}",
                     message=f"Found potential concern: {issue.text[:50]}..."
                 )
-                yield f"data: {json.dumps(progress_event.model_dump(mode='json'))}\n\n"
+                yield sse_event(progress_event)
                 
                 # Send the issue
                 streamed_issue = StreamedIssue(
@@ -521,12 +909,9 @@ async def perform_fact_check_analysis_stream(
                     issue_index=i,
                     message=f"Issue {i + 1} of {total_issues}"
                 )
-                yield f"data: {json.dumps(streamed_issue.model_dump(mode='json'))}\n\n"
+                yield sse_event(streamed_issue)
                 
                 issue_count += 1
-                
-                # Add small delay between issues to simulate real-time discovery
-                await asyncio.sleep(0.5)
         
         # Send completion event
         elapsed_time = time.time() - start_time
@@ -535,18 +920,22 @@ async def perform_fact_check_analysis_stream(
             analysis_duration=elapsed_time,
             message=f"Analysis complete! Found {issue_count} issues in {elapsed_time:.1f} seconds"
         )
-        yield f"data: {json.dumps(complete_event.model_dump(mode='json'))}\n\n"
+        yield sse_event(complete_event)
         
-        # Save analysis to cache if collection is provided
-        if collection is not None and collected_issues:
+        # Save analysis to cache if collection is provided; answers assembled from prior
+        # verdicts are not a full analysis of this article
+        if collection is not None and collected_issues and not short_circuited:
             try:
-                save_success = save_analysis_to_cache(
-                    collection=collection,
-                    url=url,
-                    title=title,
-                    content=content,
-                    issues=collected_issues
-                )
+                with time_stage("analyze_stream", "cache_write"):
+                    save_success = await asyncio.to_thread(
+                        save_analysis_to_cache,
+                        collection=collection,
+                        url=url,
+                        title=title,
+                        content=content,
+                        issues=collected_issues,
+                        route=route
+                    )
                 if save_success:
                     analysis_logger.info(f"Successfully cached streaming analysis for {url}")
                 else:
@@ -554,8 +943,17 @@ async def perform_fact_check_analysis_stream(
             except Exception as cache_error:
                 analysis_logger.error(f"Error caching streaming analysis for {url}: {cache_error}")
         
+        analysis_stage_seconds.labels("analyze_stream", "total").observe(time.time() - start_time)
         analysis_logger.info(f"Streaming analysis completed for {url}, found {issue_count} issues in {elapsed_time:.2f}s")
         
+    except LLMUnavailableError as e:
+        analysis_logger.error(f"Streaming analysis failed for {url}, LLM unavailable: {e}")
+        error_event = AnalysisError(
+            error_code="LLM_UNAVAILABLE",
+            error_details=str(e),
+            message="The analysis service is temporarily unavailable. Please try again shortly."
+        )
+        yield sse_event(error_event)
     except Exception as e:
         analysis_logger.error(f"Streaming analysis failed for {url}: {e}")
         # Send error event
@@ -564,88 +962,101 @@ async def perform_fact_check_analysis_stream(
             error_details=str(e),
             message="Analysis failed. Please try again."
         )
-        yield f"data: {json.dumps(error_event.model_dump(mode='json'))}\n\n"
+        yield sse_event(error_event)
+
+
+def build_cached_replay_events(issues: List[Issue], url: str) -> List[Tuple[float, str]]:
+    """
+    Build the SSE events replaying a cached analysis.
+    
+    Args:
+        issues: Pre-computed list of issues
+        url: Article URL
+        
+    Returns:
+        List[Tuple[float, str]]: Events, each with the delay the paced replay waits before sending it
+    """
+    total_issues = len(issues)
+    events = [
+        (0.0, AnalysisStart(
+            article_url=url,
+            estimated_duration=total_issues * 2,  # Estimate 2 seconds per issue
+            message="Starting analysis..."
+        )),
+        (0.0, AnalysisProgress(
+            progress_percentage=0.1,
+            current_step="Analyzing article content",
+            message="Looking for potential issues..."
+        )),
+    ]
+    
+    if total_issues == 0:
+        events.append((1.0, AnalysisProgress(
+            progress_percentage=0.9,
+            current_step="Analysis complete",
+            message="No issues found in this article"
+        )))
+    else:
+        for i, issue in enumerate(issues):
+            progress_pct = 0.2 + (0.7 * (i / total_issues))  # Progress from 20% to 90%
+            events.append((1.0 if i == 0 else 1.5, AnalysisProgress(
+                progress_percentage=progress_pct,
+                current_step=f"Found issue {i + 1} of {total_issues}",
+                message=f"Analyzing: {issue.text[:30]}..."
+            )))
+            events.append((0.5, StreamedIssue(
+                issue=issue,
+                issue_index=i,
+                message=f"Issue {i + 1} identified"
+            )))
+    
+    complete_delay = 1.5 if total_issues else 0.0
+    events.append((complete_delay, AnalysisComplete(
+        total_issues=total_issues,
+        analysis_duration=sum(delay for delay, _ in events) + complete_delay,
+        message=f"Analysis complete! Found {total_issues} issues"
+    )))
+    return [(delay, sse_event(event)) for delay, event in events]
 
 
 async def simulate_streaming_analysis(
     issues: List[Issue],
-    url: str
+    url: str,
+    replay_mode: Optional[str] = None
 ) -> AsyncGenerator[str, None]:
     """
-    Simulate streaming analysis for testing purposes using pre-computed issues.
+    Stream a cached analysis to the client.
     
     Args:
         issues: Pre-computed list of issues
         url: Article URL
+        replay_mode: "instant" sends every event in one flush, "coalesced" sends a single
+            replay event carrying all issues, and "paced" spaces the events out as if the
+            analysis were running (defaults to settings.CACHED_REPLAY_MODE)
         
     Yields:
         str: Server-Sent Events formatted strings
     """
-    start_time = time.time()
+    replay_mode = replay_mode or settings.CACHED_REPLAY_MODE
     
     try:
-        # Send analysis start event
-        start_event = AnalysisStart(
-            article_url=url,
-            estimated_duration=len(issues) * 2,  # Estimate 2 seconds per issue
-            message="Starting analysis..."
-        )
-        yield f"data: {json.dumps(start_event.model_dump(mode='json'))}\n\n"
-        
-        # Send initial progress
-        progress_event = AnalysisProgress(
-            progress_percentage=0.1,
-            current_step="Analyzing article content",
-            message="Looking for potential issues..."
-        )
-        yield f"data: {json.dumps(progress_event.model_dump(mode='json'))}\n\n"
-        
-        await asyncio.sleep(1)  # Initial delay
-        
-        total_issues = len(issues)
-        
-        if total_issues == 0:
-            progress_event = AnalysisProgress(
-                progress_percentage=0.9,
-                current_step="Analysis complete",
-                message="No issues found in this article"
+        if replay_mode == "coalesced":
+            replay_event = AnalysisReplay(
+                article_url=url,
+                issues=issues,
+                total_issues=len(issues),
+                message=f"Analysis complete! Found {len(issues)} issues"
             )
-            yield f"data: {json.dumps(progress_event.model_dump(mode='json'))}\n\n"
+            yield sse_event(replay_event)
+        elif replay_mode == "paced":
+            for delay, event in build_cached_replay_events(issues, url):
+                if delay:
+                    await asyncio.sleep(delay)
+                yield event
         else:
-            # Stream each issue individually
-            for i, issue in enumerate(issues):
-                # Send progress update
-                progress_pct = 0.2 + (0.7 * (i / total_issues))  # Progress from 20% to 90%
-                progress_event = AnalysisProgress(
-                    progress_percentage=progress_pct,
-                    current_step=f"Found issue {i + 1} of {total_issues}",
-                    message=f"Analyzing: {issue.text[:30]}..."
-                )
-                yield f"data: {json.dumps(progress_event.model_dump(mode='json'))}\n\n"
-                
-                await asyncio.sleep(0.5)  # Delay before sending issue
-                
-                # Send the issue
-                streamed_issue = StreamedIssue(
-                    issue=issue,
-                    issue_index=i,
-                    message=f"Issue {i + 1} identified"
-                )
-                yield f"data: {json.dumps(streamed_issue.model_dump(mode='json'))}\n\n"
-                
-                # Add delay between issues
-                await asyncio.sleep(1.5)
-        
-        # Send completion event
-        elapsed_time = time.time() - start_time
-        complete_event = AnalysisComplete(
-            total_issues=total_issues,
-            analysis_duration=elapsed_time,
-            message=f"Analysis complete! Found {total_issues} issues"
-        )
-        yield f"data: {json.dumps(complete_event.model_dump(mode='json'))}\n\n"
+            yield "".join(event for _, event in build_cached_replay_events(issues, url))
         
-        analysis_logger.info(f"Simulated streaming analysis completed for {url}")
+        analysis_logger.info(f"Replayed cached analysis for {url} ({replay_mode})")
         
     except Exception as e:
         analysis_logger.error(f"Simulated streaming analysis failed for {url}: {e}")
@@ -655,4 +1066,4 @@ async def simulate_streaming_analysis(
             error_details=str(e),
             message="Analysis simulation failed"
         )
-        yield f"data: {json.dumps(error_event.model_dump(mode='json'))}\n\n" 
\ No newline at end of file
+        yield sse_event(error_event)
@@ -1038,6 +1038,9 @@ document.addEventListener('DOMContentLoaded', () => {
                       if (eventData.event_type === 'issue') {
                         issueCount++;
                         streamingIssues.push(eventData.issue);
+                      } else if (eventData.event_type === 'replay') {
+                        issueCount += eventData.issues.length;
+                        streamingIssues.push(...eventData.issues);
                       }
                       
                     } catch (parseError) {
@@ -1096,6 +1099,14 @@ document.addEventListener('DOMContentLoaded', () => {
             );
             break;
             
+          case 'replay':
+            // Cached analysis delivered as a single event
+            console.log('[DEBUG] Cached analysis replayed:', eventData.total_issues);
+            eventData.issues.forEach((issue, index) => handleStreamingIssue(issue, index, currentUrl));
+            updateStreamingProgress(100, eventData.message || 'Analysis complete!', eventData.issues.length);
+            setTimeout(() => hideStreamingProgress(), 1000); // Hide after 1 second
+            break;
+            
           case 'complete':
             console.log('[DEBUG] Analysis complete');
             updateStreamingProgress(100, eventData.message || 'Analysis complete!', streamingIssues.length);
@@ -1141,6 +1152,57 @@ document.addEventListener('DOMContentLoaded', () => {
         }, 2000);
       }
       
+      // Hash article content the same way the server does for cache probes
+      async function computeContentHash(content) {
+        const normalized = content.replace(/\s+/g, ' ').trim();
+        const digest = await crypto.subtle.digest('SHA-256', new TextEncoder().encode(normalized));
+        return Array.from(new Uint8Array(digest)).map(b => b.toString(16).padStart(2, '0')).join('');
+      }
+      
+      // Ask the server for a cached analysis before uploading the article content
+      async function probeCachedAnalysis(article, authToken) {
+        try {
+          const params = new URLSearchParams({ url: article.url });
+          if (article.content && crypto.subtle) {
+            params.set('content_hash', await computeContentHash(article.content));
+          }
+          const response = await fetch(`${config.getBaseUrl()}/analyze/probe?${params}`, {
+            method: 'GET',
+            headers: { 'Authorization': `Bearer ${authToken}` },
+            credentials: 'omit',
+            signal: AbortSignal.timeout(15000)
+          });
+          if (!response.ok) {
+            console.log('[DEBUG] Cache probe failed:', response.status);
+            return null;
+          }
+          const data = await response.json();
+          return data.cached ? data.issues : null;
+        } catch (error) {
+          console.log('[DEBUG] Cache probe error, uploading article instead:', error);
+          return null;
+        }
+      }
+      
+      // Show issues returned by a cache probe
+      function showProbedResults(issues, currentUrl) {
+        cacheResults(currentUrl, issues);
+        loadAccountStatus();
+        
+        window.parent.postMessage({
+          action: 'highlight',
+          issues: issues
+        }, '*');
+        
+        const highlightHandler = (event) => {
+          if (event.data.action === 'highlightResponse') {
+            window.removeEventListener('message', highlightHandler);
+            showResults(issues, event.data.success ? event.data.appliedHighlightsMap : []);
+          }
+        };
+        window.addEventListener('message', highlightHandler);
+      }
+      
       // Regular analysis fallback
       async function performRegularAnalysis(article, currentUrl, authToken) {
         console.log('[DEBUG] Starting regular analysis fallback');
@@ -1258,6 +1320,14 @@ document.addEventListener('DOMContentLoaded', () => {
             return;
           }
           
+          // Popular articles are usually cached; only upload the content on a miss
+          const probedIssues = await probeCachedAnalysis(article, authToken);
+          if (probedIssues) {
+            console.log('[DEBUG] Cache probe hit, skipping article upload');
+            showProbedResults(probedIssues, currentUrl);
+            return;
+          }
+          
           // Try streaming analysis first, fallback to regular analysis
           const streamingSupported = typeof ReadableStream !== 'undefined' && typeof fetch !== 'undefined';
           console.log('[DEBUG] Streaming supported:', streamingSupported);